@@ -0,0 +1,190 @@
+# src/core/ab_reader.py
+"""
+ADB Backup Reader - Streaming reader/indexer for 'adb backup' (.ab) archives
+Đọc header, giải nén zlib từng phần và duyệt tar bên trong mà không giải nén
+ra đĩa: bộ nhớ không đổi kể cả với file backup nhiều GB.
+"""
+import os
+import shutil
+import tarfile
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+AB_MAGIC = b"ANDROID BACKUP"
+CHUNK_SIZE = 256 * 1024
+
+
+class AdbBackupError(Exception):
+    pass
+
+
+@dataclass
+class AbEntry:
+    path: str       # path inside the archive, e.g. apps/<pkg>/f/file.txt
+    size: int
+    mtime: int
+    is_dir: bool
+
+    @property
+    def package(self) -> str:
+        """'apps/<pkg>/...' -> <pkg>; shared storage is grouped as 'shared'"""
+        parts = self.path.split("/")
+        if parts[0] == "apps" and len(parts) > 1:
+            return parts[1]
+        return parts[0]
+
+
+@dataclass
+class PackageSummary:
+    package: str
+    files: int = 0
+    size: int = 0
+    entries: List[AbEntry] = field(default_factory=list)
+
+
+class _InflateStream:
+    """Minimal read-only file object inflating a zlib stream chunk by chunk"""
+
+    def __init__(self, raw, compressed: bool):
+        self.raw = raw
+        self.compressed = compressed
+        self._inflater = zlib.decompressobj() if compressed else None
+        self._buffer = bytearray()
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            want = CHUNK_SIZE if size < 0 else size - len(self._buffer)
+            if not self._inflater:
+                chunk = self.raw.read(want)
+                if not chunk:
+                    self._eof = True
+                self._buffer += chunk
+                continue
+            # max_length bounds the output of one call; the rest stays in unconsumed_tail
+            pending = self._inflater.unconsumed_tail or self.raw.read(CHUNK_SIZE)
+            if not pending:
+                self._buffer += self._inflater.flush()
+                self._eof = True
+                break
+            self._buffer += self._inflater.decompress(pending, want)
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+class AdbBackupReader:
+    """
+    Usage:
+        reader = AdbBackupReader("FullData.ab")
+        for entry in reader.entries(): ...
+        index = reader.index()
+        reader.extract("out/", packages={"com.whatsapp"})
+    Each call makes one sequential pass over the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = 0
+        self.compressed = False
+        self.encryption = "none"
+        self.error: Optional[str] = None  # set when the last pass hit a truncated/corrupt stream
+
+    def _open(self):
+        f = open(self.path, "rb")
+        try:
+            magic = f.readline().rstrip(b"\n")
+            if magic != AB_MAGIC:
+                raise AdbBackupError("Không phải file adb backup (.ab)")
+            self.version = int(f.readline().strip() or 0)
+            self.compressed = f.readline().strip() == b"1"
+            self.encryption = f.readline().strip().decode("ascii", errors="replace")
+            if self.encryption.lower() != "none":
+                raise AdbBackupError(f"Backup mã hóa ({self.encryption}) chưa được hỗ trợ")
+        except Exception:
+            f.close()
+            raise
+        return f, tarfile.open(fileobj=_InflateStream(f, self.compressed), mode="r|")
+
+    def _members(self) -> Iterator[tuple]:
+        self.error = None
+        f, tar = self._open()
+        try:
+            for member in tar:
+                yield tar, member
+        except (tarfile.ReadError, zlib.error, EOFError) as e:
+            # Truncated backups (cancelled on the phone) still index up to the break
+            self.error = f"Backup bị cắt ngang: {e}"
+        finally:
+            tar.close()
+            f.close()
+
+    def entries(self) -> Iterator[AbEntry]:
+        for _, m in self._members():
+            yield AbEntry(m.name, m.size, int(m.mtime), m.isdir())
+
+    def index(self, keep_entries: bool = True) -> Dict[str, PackageSummary]:
+        """Per-package file count and total size (optionally with file lists)"""
+        result: Dict[str, PackageSummary] = {}
+        for entry in self.entries():
+            if entry.is_dir:
+                continue
+            summary = result.setdefault(entry.package, PackageSummary(entry.package))
+            summary.files += 1
+            summary.size += entry.size
+            if keep_entries:
+                summary.entries.append(entry)
+        return result
+
+    def extract(self, dest: str, packages: Optional[set] = None,
+                predicate: Optional[Callable[[AbEntry], bool]] = None,
+                on_progress: Optional[Callable] = None) -> int:
+        """Extract selected regular files in one pass; returns number of files written"""
+        dest_root = os.path.abspath(dest)
+        written = 0
+        for tar, m in self._members():
+            if not m.isfile():
+                continue
+            entry = AbEntry(m.name, m.size, int(m.mtime), False)
+            if packages and entry.package not in packages:
+                continue
+            if predicate and not predicate(entry):
+                continue
+            target = os.path.abspath(os.path.join(dest_root, m.name))
+            if not target.startswith(dest_root + os.sep):
+                continue  # refuse path traversal
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            src = tar.extractfile(m)
+            if src is None:
+                continue
+            with open(target, "wb") as out:
+                shutil.copyfileobj(src, out, CHUNK_SIZE)
+            written += 1
+            if on_progress: on_progress(written, entry.path)
+        return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or extract an adb backup (.ab) archive")
+    parser.add_argument("backup")
+    parser.add_argument("--extract", metavar="DEST", help="extract files into DEST instead of listing")
+    parser.add_argument("--package", action="append", help="only this package (repeatable)")
+    args = parser.parse_args()
+
+    reader = AdbBackupReader(args.backup)
+    try:
+        if args.extract:
+            count = reader.extract(args.extract, packages=set(args.package or ()) or None)
+            print(f"Extracted {count} files to {args.extract}")
+        else:
+            for pkg, summary in sorted(reader.index(keep_entries=False).items()):
+                if args.package and pkg not in args.package: continue
+                print(f"{pkg:50} {summary.files:7} files {summary.size / (1024 * 1024):10.1f} MB")
+    except AdbBackupError as e:
+        raise SystemExit(str(e))
+    if reader.error: print(reader.error)
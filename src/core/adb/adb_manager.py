@@ -1,3 +1,4 @@
+import copy
 import subprocess
 import os
 import re
@@ -16,6 +17,28 @@ class DeviceStatus(Enum):
     UNKNOWN = auto()
 
 
+# adb sync compression (sendrecv_v2_*), best first
+SYNC_CODECS = ("zstd", "lz4", "brotli")
+# Already compressed: recompressing only burns CPU on both ends
+COMPRESSED_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.heic', '.gif', '.mp4', '.mkv', '.webm', '.3gp',
+                   '.mp3', '.m4a', '.aac', '.ogg', '.opus', '.apk', '.apks', '.xapk', '.zip', '.7z',
+                   '.rar', '.gz', '.xz', '.zst', '.lz4', '.br', '.obb')
+
+
+def parse_sync_stats(output):
+    """(bytes, seconds) from adb push/pull's '... (12345 bytes in 0.123s)' summary, or (0, 0.0)"""
+    m = re.search(r"\((\d+) bytes in ([\d.]+)s\)", output or "")
+    return (int(m.group(1)), float(m.group(2))) if m else (0, 0.0)
+
+
+def sync_error(output):
+    """adb push/pull failure text (its 'adb: error:' lines or execute()'s own 'Error:'), '' on success"""
+    output = output or ""
+    if output.startswith("Error:"):
+        return output
+    return "\n".join(l for l in output.splitlines() if l.startswith("adb: error:"))
+
+
 class ADBManager:
     def __init__(self):
         # Determine ADB Path
@@ -52,10 +75,17 @@ class ADBManager:
         print(f"ADBManager: Initialized with adb_path={self.adb_path}")
             
         self.current_device = None
+        self._features = {}  # serial -> sync features shared by host and device
         
     def select_device(self, serial):
         self.current_device = serial
-        
+
+    def for_device(self, serial):
+        """Shallow copy bound to another device (for concurrent multi-device work)"""
+        clone = copy.copy(self)
+        clone.current_device = serial
+        return clone
+
     def get_devices(self):
         """Get list of connected ADB devices: [(serial, status), ...]"""
         devices = []
@@ -152,7 +182,102 @@ class ADBManager:
         if not self.current_device:
             return "Error: No device connected"
         return self.execute(f"-s {self.current_device} shell {command}")
-        
+
+    def popen(self, args, stdin=None, stderr=subprocess.STDOUT):
+        """
+        Start a device-scoped adb process for streaming I/O (binary pipes).
+        Binary streams must pass stderr=subprocess.DEVNULL so adb's own messages stay out of the data.
+        """
+        cmd_list = [self.adb_path]
+        if self.current_device:
+            cmd_list += ["-s", self.current_device]
+        cmd_list += [str(arg) for arg in args]
+        return subprocess.Popen(
+            cmd_list,
+            stdin=stdin,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            creationflags=0x08000000 if os.name == 'nt' else 0
+        )
+
+    def _pipe_in(self, args, source, size=None, on_chunk=None, chunk_size=1024 * 1024):
+        """Feed a file-like `source` to an adb process' stdin; returns its decoded output"""
+        proc = self.popen(args, stdin=subprocess.PIPE)
+        remaining = size
+        try:
+            while remaining is None or remaining > 0:
+                want = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = source.read(want)
+                if not chunk:
+                    break
+                proc.stdin.write(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+                if on_chunk:
+                    on_chunk(len(chunk))
+            proc.stdin.close()
+            out = proc.stdout.read()
+            proc.wait()
+            return out.decode('utf-8', errors='replace').strip()
+        except (BrokenPipeError, OSError) as e:
+            # The device side stopped reading: its own message (if any) says why
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            out = proc.stdout.read().decode('utf-8', errors='replace').strip()
+            proc.wait()
+            return out or f"Error: {e}"
+
+    def exec_in(self, command, source, size=None, on_chunk=None, chunk_size=1024 * 1024):
+        """
+        Pipe bytes from a file-like `source` into a device command over exec-in
+        (raw stream, no shell/pty mangling). exec-in carries stdin only: the result
+        is adb's own (host-side) messages, never the device command's stdout.
+        on_chunk(n_bytes) is called after each chunk is written.
+        """
+        args = ["exec-in"] + (command.split() if isinstance(command, str) else list(command))
+        return self._pipe_in(args, source, size, on_chunk, chunk_size)
+
+    def shell_in(self, command, source, size=None, on_chunk=None, chunk_size=1024 * 1024):
+        """
+        Like exec_in, but over `adb shell -T` (no pty, binary-safe stdin) so the
+        device command's output comes back. `command` is one shell string.
+        """
+        return self._pipe_in(["shell", "-T", command], source, size, on_chunk, chunk_size)
+
+    def exec_out(self, command):
+        """
+        Run a device command over exec-out and return its raw stdout bytes (no pty mangling).
+        Pass one shell string in a list (["cmd {quoted} 2>/dev/null"]): adb escapes every
+        further argument, so quotes, redirects and && would reach the device literally.
+        """
+        args = ["exec-out"] + (command.split() if isinstance(command, str) else list(command))
+        proc = self.popen(args, stderr=subprocess.DEVNULL)
+        out, _ = proc.communicate()
+        return out
+
+    def stream_script(self, script):
+        """
+        Run a multi-line shell script in ONE adb shell session.
+        Yields output lines as they arrive; closing the generator kills the session.
+        The body runs with stdin from /dev/null so no command (cmd, content, md5sum...)
+        can read the rest of the script as its input.
+        """
+        if not self.current_device:
+            yield "Error: No device connected"
+            return
+        proc = self.popen(["shell", "sh"], stdin=subprocess.PIPE)
+        try:
+            proc.stdin.write(f"{{\n{script}\n}} </dev/null\n".encode('utf-8'))
+            proc.stdin.close()
+            for raw in proc.stdout:
+                yield raw.decode('utf-8', errors='replace').rstrip('\r\n')
+            proc.wait()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+
     def run_adb(self, args):
         """Run raw adb command with args list"""
         return self.execute(args)
@@ -179,6 +304,12 @@ class ADBManager:
         
     def is_online(self):
         return self.current_device is not None
+
+    def get_prop(self, name):
+        """Single system property ('' when offline or unset)"""
+        if not self.is_online(): return ""
+        out = self.shell(f"getprop {name}").strip()
+        return "" if out.startswith("Error") else out
         
     def get_detailed_system_info(self):
         """Fetch detailed device info (aggregated)"""
@@ -459,14 +590,52 @@ class ADBManager:
              
         return info
 
+    def features(self):
+        """adb features supported by both this adb host and the current device (cached per device)"""
+        serial = self.current_device
+        if serial not in self._features:
+            host = set(self.execute(["host-features"]).replace(",", " ").split())
+            args = (["-s", serial] if serial else []) + ["features"]
+            device = set(self.execute(args).replace(",", " ").split())
+            self._features[serial] = host & device
+        return self._features[serial]
+
+    def sync_compression(self, path):
+        """Compression flags for adb push/pull of `path`: ['-z', codec], ['-Z'] for compressed files, [] if unsupported"""
+        feats = self.features()
+        if "sendrecv_v2" not in feats:
+            return []
+        if path.lower().endswith(COMPRESSED_EXTS):
+            return ["-Z"]
+        for codec in SYNC_CODECS:
+            if f"sendrecv_v2_{codec}" in feats:
+                return ["-z", codec]
+        return []
+
+    def is_wireless(self):
+        """Connected over TCP/IP (ip:port) or mDNS wireless debugging"""
+        serial = self.current_device or ""
+        return ":" in serial or serial.startswith("adb-")
+
     def push_file(self, local, remote):
-        """Push file to device"""
-        result = self.execute(["push", local, remote])
+        """Push file to device (sync compression when both ends support it)"""
+        args = (["-s", self.current_device] if self.current_device else []) + ["push"]
+        result = self.execute(args + self.sync_compression(local) + [local, remote])
         return result
 
+    def push_many(self, locals_, remote_dir, batch=200):
+        """Push many files/folders into remote_dir with one adb invocation per batch"""
+        args = (["-s", self.current_device] if self.current_device else []) + ["push"]
+        flags = self.sync_compression("")  # mixed batch: compress whenever both ends can
+        outputs = []
+        for i in range(0, len(locals_), batch):
+            outputs.append(self.execute(args + flags + list(locals_[i:i + batch]) + [remote_dir.rstrip("/") + "/"]))
+        return "\n".join(outputs)
+
     def pull_file(self, remote, local):
-        """Pull file from device"""
-        result = self.execute(["pull", remote, local])
+        """Pull file from device, -a keeps the device timestamps"""
+        args = (["-s", self.current_device] if self.current_device else []) + ["pull", "-a"]
+        result = self.execute(args + self.sync_compression(remote) + [remote, local])
         return result
 
     # Cleaner Methods
@@ -0,0 +1,66 @@
+import subprocess
+import threading
+import uuid
+
+
+class ShellSession:
+    """
+    Persistent 'adb shell sh' process: each command is written to the same
+    session and its output is read up to a unique end marker, so there is no
+    adb process spawn per command. One session per worker lane.
+    Aborting mid-command kills the session; the next call starts a fresh one.
+    """
+
+    def __init__(self, adb_manager):
+        self.adb = adb_manager
+        self._proc = None
+        self._device = None
+        self._lock = threading.Lock()
+
+    def _ensure(self):
+        device = self.adb.current_device
+        if self._proc is None or self._proc.poll() is not None or self._device != device:
+            self.close()
+            self._proc = self.adb.popen(["shell", "sh"], stdin=subprocess.PIPE)
+            self._device = device
+        return self._proc
+
+    def stream_script(self, script):
+        """Same contract as ADBManager.stream_script, but reuses the session"""
+        if not self.adb.current_device:
+            yield "Error: No device connected"
+            return
+        with self._lock:
+            marker = f"@@EOC{uuid.uuid4().hex}"
+            finished = False
+            try:
+                proc = self._ensure()
+                # stdin closed for the command itself so it cannot eat the rest of the session input
+                proc.stdin.write(f"{{\n{script}\n}} </dev/null 2>&1\necho {marker}\n".encode("utf-8"))
+                proc.stdin.flush()
+                for raw in iter(proc.stdout.readline, b""):
+                    line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                    # Output without a trailing newline gets the marker glued to its last line
+                    if line.endswith(marker):
+                        finished = True
+                        if line != marker:
+                            yield line[:-len(marker)]
+                        return
+                    yield line
+            except (BrokenPipeError, OSError) as e:
+                yield f"Error: {e}"
+            finally:
+                if not finished:
+                    self.close()  # output of the aborted command is still in flight
+
+    def run(self, command):
+        """Run a command and return its output (like ADBManager.shell)"""
+        return "\n".join(self.stream_script(command)).strip()
+
+    def close(self):
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            try:
+                proc.kill()
+            except OSError:
+                pass
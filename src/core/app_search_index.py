@@ -0,0 +1,131 @@
+# src/core/app_search_index.py
+"""
+App Search Index - In-memory n-gram index for the app catalog
+Tìm kiếm tức thì trên hàng nghìn package (nhiều user) mà không quét tuyến tính.
+"""
+from typing import Dict, Iterator, List, Optional
+
+from src.data.app_data import AppInfo
+
+# Tab ids used by AppManagerWidget
+MODE_ALL = 1
+MODE_SYSTEM = 2
+MODE_USER = 3
+MODE_DISABLED = 4
+
+
+def _bits_from_rows(rows: List[int], count: int) -> int:
+    """Build an int bitset from row numbers (one pass over a bytearray)"""
+    bitmap = bytearray((count + 7) // 8)
+    for row in rows:
+        bitmap[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bitmap, "little")
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yield row numbers of set bits, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class AppSearchIndex:
+    """
+    Lowercase n-gram index (n = 1..3) over app labels and package names.
+
+    Every posting list is an int bitset over row numbers, so a query is a few
+    big-int ANDs. Queries longer than MAX_GRAM are answered by intersecting
+    their trigrams and then verifying the (small) candidate set. The
+    system/user/disabled tabs are bitsets too, and a query that extends the
+    previous one only searches inside the previous result.
+    """
+    MAX_GRAM = 3
+
+    def __init__(self, apps: Optional[List[AppInfo]] = None):
+        self.build(apps or [])
+
+    def build(self, apps: List[AppInfo]):
+        self._apps = list(apps)
+        self._texts: List[tuple] = []
+        count = len(self._apps)
+
+        postings: Dict[str, List[int]] = {}
+        system_rows, disabled_rows = [], []
+        for row, app in enumerate(self._apps):
+            name = (app.name or "").lower()
+            pkg = app.package.lower()
+            self._texts.append((name, pkg))
+            grams = set()
+            for text in (name, pkg):
+                for n in range(1, self.MAX_GRAM + 1):
+                    for i in range(len(text) - n + 1):
+                        grams.add(text[i:i + n])
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+            if app.is_system: system_rows.append(row)
+            if not app.is_enabled: disabled_rows.append(row)
+
+        self._grams: Dict[str, int] = {g: _bits_from_rows(rows, count) for g, rows in postings.items()}
+        self._all = (1 << count) - 1
+        self._system = _bits_from_rows(system_rows, count)
+        self._disabled = _bits_from_rows(disabled_rows, count)
+        self._reset_incremental()
+
+    def _reset_incremental(self):
+        self._last_query = None
+        self._last_text_mask = self._all
+
+    def __len__(self):
+        return len(self._apps)
+
+    def update_state(self, row: int, app: AppInfo):
+        """Refresh tab bitsets after an app was enabled/disabled in place"""
+        bit = 1 << row
+        if app.is_enabled: self._disabled &= ~bit
+        else: self._disabled |= bit
+        if app.is_system: self._system |= bit
+        else: self._system &= ~bit
+
+    def tab_mask(self, mode: int) -> int:
+        if mode == MODE_SYSTEM: return self._system
+        if mode == MODE_USER: return self._all & ~self._system
+        if mode == MODE_DISABLED: return self._disabled
+        return self._all
+
+    def text_mask(self, query: str) -> int:
+        """Bitset of rows whose label or package contains query (case-insensitive)"""
+        query = query.strip().lower()
+        if not query:
+            return self._all
+
+        # Incremental: typing more characters can only narrow the previous result
+        base = self._all
+        if self._last_query and query.startswith(self._last_query):
+            base = self._last_text_mask
+
+        if len(query) <= self.MAX_GRAM:
+            mask = base & self._grams.get(query, 0)
+        else:
+            mask = base
+            for i in range(len(query) - self.MAX_GRAM + 1):
+                mask &= self._grams.get(query[i:i + self.MAX_GRAM], 0)
+                if not mask: break
+            # Trigram hits are candidates only: verify the real substring
+            verified = 0
+            for row in iter_bits(mask):
+                name, pkg = self._texts[row]
+                if query in name or query in pkg:
+                    verified |= 1 << row
+            mask = verified
+
+        self._last_query = query
+        self._last_text_mask = mask
+        return mask
+
+    def search(self, query: str, mode: int = MODE_ALL) -> int:
+        """Bitset of rows matching both the query and the tab"""
+        return self.text_mask(query) & self.tab_mask(mode)
+
+    def rows(self, mask: int) -> List[int]:
+        return list(iter_bits(mask))
@@ -0,0 +1,201 @@
+# src/core/backup_store.py
+"""
+Backup Store - Content-addressed, incremental APK backups
+APK được lưu một lần theo hash tính trên máy (sha256sum/md5sum); mỗi lần sao lưu
+chỉ là một manifest nhỏ trỏ tới các blob dùng chung.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from src.core.bulk_actions import PACKAGE_RE
+
+MANIFEST_NAME = "manifest.json"
+
+
+@dataclass
+class RemoteApk:
+    package: str
+    remote_path: str
+    size: int
+    digest: str  # '<algo>-<hex>'
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.remote_path)
+
+
+def _hash_script(packages: List[str]) -> str:
+    """One device-side pass: pm path + size + hash for every split of every package"""
+    return (
+        "h=sha256sum; command -v sha256sum >/dev/null 2>&1 || h=md5sum\n"
+        'echo "@@ALGO $h"\n'
+        f"for p in {' '.join(packages)}; do\n"
+        "  pm path $p | while read l; do\n"
+        '    f="${l#package:}"\n'
+        '    echo "@@ $p $(stat -c %s "$f") $($h "$f")"\n'
+        "  done\n"
+        "done\n"
+    )
+
+
+def file_digest(path: str, algo: str) -> str:
+    """'<algo>-<hex>' of a local file, same form as the device-side digests"""
+    h = hashlib.new(algo)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return f"{algo}-{h.hexdigest()}"
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hard link when the filesystem allows it (no extra space), copy otherwise"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class BackupStore:
+    """
+    Layout:
+        <root>/blobs/<ab>/<algo>-<hex>.apk   shared APK blobs
+        <root>/Backup_<timestamp>/manifest.json
+        <root>/Backup_<timestamp>/<name>_<package>/*.apk   hard links to the blobs (restorable as-is)
+    """
+
+    def __init__(self, adb_manager, root: str, lanes: int = 4):
+        self.adb = adb_manager
+        self.root = root
+        self.lanes = max(1, lanes)
+        self.blob_dir = os.path.join(root, "blobs")
+
+    def blob_path(self, digest: str) -> str:
+        hexpart = digest.split("-", 1)[-1]
+        return os.path.join(self.blob_dir, hexpart[:2], f"{digest}.apk")
+
+    def has_blob(self, digest: str) -> bool:
+        return os.path.exists(self.blob_path(digest))
+
+    def scan(self, packages: List[str]) -> Dict[str, List[RemoteApk]]:
+        """Hash all APK splits on the device in one batched shell session"""
+        packages = [p for p in packages if PACKAGE_RE.match(p)]
+        result: Dict[str, List[RemoteApk]] = {p: [] for p in packages}
+        if not packages:
+            return result
+        algo = "sha256"
+        for line in self.adb.stream_script(_hash_script(packages)):
+            if line.startswith("@@ALGO "):
+                algo = "md5" if "md5" in line else "sha256"
+                continue
+            if not line.startswith("@@ "):
+                continue
+            parts = line.split(None, 4)  # @@ pkg size hash path
+            if len(parts) < 5 or not parts[2].isdigit() or not re.fullmatch(r"[0-9a-f]{32,64}", parts[3]):
+                continue
+            _, pkg, size, hexdigest, path = parts
+            if pkg in result:
+                result[pkg].append(RemoteApk(pkg, path.strip(), int(size), f"{algo}-{hexdigest}"))
+        return result
+
+    def _pull_blob(self, apk: RemoteApk) -> bool:
+        dst = self.blob_path(apk.digest)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = f"{dst}.part{threading.get_ident()}"
+        self.adb.pull_file(apk.remote_path, tmp)
+        # Content-addressed: only a blob whose hash matches its name may enter the store
+        algo = apk.digest.split("-", 1)[0]
+        if os.path.exists(tmp) and os.path.getsize(tmp) == apk.size and file_digest(tmp, algo) == apk.digest:
+            os.replace(tmp, dst)
+            return True
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+    def new_backup_folder(self) -> str:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        folder = os.path.join(self.root, f"Backup_{timestamp}")
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def backup(self, apps: List[tuple], folder: Optional[str] = None, on_progress: Optional[Callable] = None,
+               should_stop: Optional[Callable] = None) -> dict:
+        """
+        apps: (package, label) pairs. Pulls only blobs not already stored,
+        on several concurrent lanes, then writes a manifest.
+        Returns the manifest dict (with 'path', 'pulled', 'reused', 'failed').
+        """
+        labels = dict(apps)
+        scanned = self.scan(list(labels))
+
+        # Unique missing blobs (same APK may be shared by several entries)
+        missing: Dict[str, RemoteApk] = {}
+        reused = 0
+        for splits in scanned.values():
+            for apk in splits:
+                if self.has_blob(apk.digest): reused += 1
+                else: missing.setdefault(apk.digest, apk)
+
+        done = [0]
+        lock = threading.Lock()
+        failed_digests = set()
+
+        def pull(apk):
+            if should_stop and should_stop():
+                failed_digests.add(apk.digest)
+                return
+            ok = self._pull_blob(apk)
+            with lock:
+                done[0] += 1
+                if not ok: failed_digests.add(apk.digest)
+                if on_progress: on_progress(done[0], len(missing), labels.get(apk.package, apk.package))
+
+        with ThreadPoolExecutor(max_workers=self.lanes) as pool:
+            list(pool.map(pull, missing.values()))
+
+        folder = folder or self.new_backup_folder()
+        manifest = {"created": datetime.datetime.now().strftime("%Y%m%d_%H%M%S"), "apps": []}
+        failed = []
+        for pkg, splits in scanned.items():
+            if not splits or any(a.digest in failed_digests for a in splits):
+                failed.append(pkg)
+                continue
+            manifest["apps"].append({
+                "package": pkg,
+                "name": labels.get(pkg, pkg),
+                "splits": [{"name": a.name, "digest": a.digest, "size": a.size} for a in splits],
+            })
+        with open(os.path.join(folder, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        for entry in manifest["apps"]:
+            self.export_app(entry, folder)
+
+        manifest.update(path=folder, pulled=len(missing) - len(failed_digests), reused=reused, failed=failed)
+        return manifest
+
+    def load_manifest(self, folder: str) -> dict:
+        with open(os.path.join(folder, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def export_app(self, entry: dict, folder: str) -> str:
+        """Per-app folder of APKs linked from the blobs (base.apk for a single APK), as older backups had"""
+        safe = re.sub(r'[\\/:*?"<>|]', "_", f"{entry['name']}_{entry['package']}")
+        app_dir = os.path.join(folder, safe)
+        os.makedirs(app_dir, exist_ok=True)
+        splits = entry["splits"]
+        for split in splits:
+            dst = os.path.join(app_dir, split["name"] if len(splits) > 1 else "base.apk")
+            if not os.path.exists(dst):
+                _link_or_copy(self.blob_path(split["digest"]), dst)
+        return app_dir
+
+    def split_paths(self, entry: dict) -> List[str]:
+        """Local blob paths of one manifest app entry (ready for StreamingInstaller)"""
+        return [self.blob_path(s["digest"]) for s in entry["splits"]]
@@ -0,0 +1,190 @@
+# src/core/bulk_actions.py
+"""
+Bulk App Actions - Compile many package actions into one device-side script
+Toàn bộ cascade (disable-user → uninstall --user 0 → ...) chạy trong MỘT phiên
+adb shell; mỗi package trả về đúng một dòng kết quả để cập nhật tiến trình.
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+RESULT_PREFIX = "@@"
+
+# Valid Android package names only: keeps generated script injection-free
+PACKAGE_RE = re.compile(r"^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$")
+
+
+@dataclass
+class ActionStep:
+    """One cascade step: command template, label, success regex (grep -iE)"""
+    command: str
+    label: str
+    pattern: str
+    invert: bool = False  # success when pattern does NOT match (e.g. force-stop)
+    unsupported: str = ""  # (sequences) output meaning the command does not exist on this Android: skip it
+
+
+@dataclass
+class BulkActionResult:
+    package: str
+    ok: bool
+    label: str = ""
+    detail: str = ""
+
+
+# Same strategies as the former serial SmartAppActionThread cascade
+CASCADES = {
+    "disable_system": [
+        ActionStep("pm disable-user --user 0 {pkg}", "Disable User", "disabled|new state"),
+        ActionStep("pm uninstall -k --user 0 {pkg}", "Uninstall User", "success|uninstalled"),
+        ActionStep("pm disable {pkg}", "Disable (Root)", "disabled|new state"),
+        ActionStep("pm hide {pkg}", "Hide", "true|hidden"),
+        ActionStep("pm clear {pkg}", "Clear Data", "success"),
+        ActionStep("am force-stop {pkg}", "Force Stop", "error|exception", invert=True),
+    ],
+    "disable_user": [
+        ActionStep("pm uninstall {pkg}", "Uninstall", "success"),
+        ActionStep("pm uninstall -k --user 0 {pkg}", "Uninstall User", "success|uninstalled"),
+        ActionStep("pm disable-user --user 0 {pkg}", "Disable User", "disabled|new state"),
+    ],
+    "uninstall": [
+        ActionStep("pm uninstall {pkg}", "Uninstall", "success"),
+        ActionStep("pm uninstall -k --user 0 {pkg}", "Uninstall User", "success"),
+    ],
+    # Debloat: archive for user 0 (keeps APK for restore), disable as fallback
+    "archive": [
+        ActionStep("pm uninstall --user 0 {pkg}", "Uninstall User", "success|not installed"),
+        ActionStep("pm disable-user --user 0 {pkg}", "Disable User", "disabled|new state"),
+    ],
+    "disable_only": [
+        ActionStep("pm disable-user --user 0 {pkg}", "Disable User", "disabled|new state"),
+    ],
+    "enable": [
+        ActionStep("pm enable {pkg}", "Enable", "enabled|new state"),
+        ActionStep("cmd package install-existing {pkg}", "Install Existing", "installed"),
+    ],
+}
+
+# Sequences: EVERY step must succeed (in order), unlike a cascade where the first success wins
+SEQUENCES = {
+    # Undo a debloat: reinstall for user 0 first, then unsuspend and re-enable
+    "restore": [
+        ActionStep("cmd package install-existing --user 0 {pkg}", "Install Existing", "installed for user"),
+        ActionStep("cmd package unsuspend --user 0 {pkg}", "Unsuspend", "suspended state: false",
+                   unsupported="unknown command"),
+        ActionStep("pm enable {pkg}", "Enable", "enabled|new state"),
+    ],
+}
+SEQUENCE_LABELS = {"restore": "Restored"}
+
+# Commands run before the cascade whatever their output
+PRELUDES = {
+    "enable": ["cmd package unsuspend --user 0 {pkg}"],
+}
+
+
+def cascade_key(mode: str, is_system: bool) -> str:
+    if mode == "disable":
+        return "disable_system" if is_system else "disable_user"
+    return mode
+
+
+def _sequence_body(key: str) -> str:
+    lines = [f"act_{key}() {{", '  p="$1"']
+    for step in SEQUENCES[key]:
+        lines.append(f'  o=$({step.command.format(pkg="$p")} 2>&1)')
+        test = f'echo "$o" | grep -qiE \'{step.pattern}\''
+        if step.unsupported:
+            test += f' || echo "$o" | grep -qiE \'{step.unsupported}\''
+        lines.append(f'  if ! {{ {test}; }}; then echo "{RESULT_PREFIX}FAIL $p {step.label}: $(echo $o | head -c 150)"; return; fi')
+    lines.append(f'  echo "{RESULT_PREFIX}OK $p {SEQUENCE_LABELS.get(key, key)}"')
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def _function_body(key: str) -> str:
+    if key in SEQUENCES:
+        return _sequence_body(key)
+    lines = [f"act_{key}() {{", '  p="$1"']
+    for cmd in PRELUDES.get(key, []):
+        lines.append(f'  {cmd.format(pkg="$p")} >/dev/null 2>&1')
+    for step in CASCADES[key]:
+        lines.append(f'  o=$({step.command.format(pkg="$p")} 2>&1)')
+        test = f'echo "$o" | grep -qiE \'{step.pattern}\''
+        if step.invert:
+            test = f"! {test}"
+        lines.append(f'  if {test}; then echo "{RESULT_PREFIX}OK $p {step.label}"; return; fi')
+    lines.append(f'  echo "{RESULT_PREFIX}FAIL $p $(echo $o | head -c 150)"')
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def build_action_script(items: Iterable[tuple]) -> str:
+    """
+    Build one sh script for (package, cascade_key) pairs.
+    Each package prints exactly one '@@OK <pkg> <label>' or '@@FAIL <pkg> <detail>' line.
+    """
+    items = list(items)
+    keys = []
+    for _, key in items:
+        if key not in keys: keys.append(key)
+    parts = [_function_body(key) for key in keys]
+    parts += [f"act_{key} {pkg}" for pkg, key in items]
+    return "\n".join(parts) + "\n"
+
+
+def parse_result_line(line: str) -> Optional[BulkActionResult]:
+    if not line.startswith(RESULT_PREFIX):
+        return None
+    status, _, rest = line[len(RESULT_PREFIX):].partition(" ")
+    pkg, _, text = rest.partition(" ")
+    if status == "OK":
+        return BulkActionResult(pkg, True, label=text.strip())
+    if status == "FAIL":
+        return BulkActionResult(pkg, False, detail=text.strip())
+    return None
+
+
+class BulkActionEngine:
+    """Run a compiled action script over one adb shell session and stream results"""
+
+    def __init__(self, adb_manager):
+        self.adb = adb_manager
+
+    def run(self, items: Iterable[tuple], on_result: Callable = None,
+            should_stop: Callable = None) -> List[BulkActionResult]:
+        """
+        items: (package, cascade_key) pairs.
+        on_result(result, done, total) is called as each package line arrives.
+        """
+        results: List[BulkActionResult] = []
+        valid = []
+        for pkg, key in items:
+            if PACKAGE_RE.match(pkg or "") and (key in CASCADES or key in SEQUENCES):
+                valid.append((pkg, key))
+            else:
+                results.append(BulkActionResult(pkg, False, detail="Invalid package/action"))
+        total = len(results) + len(valid)
+        if not valid:
+            return results
+
+        pending = {pkg for pkg, _ in valid}
+        stream = self.adb.stream_script(build_action_script(valid))
+        try:
+            for line in stream:
+                if should_stop and should_stop():
+                    break
+                res = parse_result_line(line)
+                if res is None or res.package not in pending:
+                    continue
+                pending.discard(res.package)
+                results.append(res)
+                if on_result: on_result(res, len(results), total)
+        finally:
+            stream.close()
+
+        # Session dropped or cancelled: whatever did not report is a failure
+        for pkg, _ in valid:
+            if pkg in pending:
+                results.append(BulkActionResult(pkg, False, detail="No result (session ended)"))
+        return results
@@ -0,0 +1,116 @@
+# src/core/debloat_planner.py
+"""
+Debloat Planner - Fetch package state once, compute only the needed actions
+Chỉ thực thi phần chênh lệch: bỏ qua app không tồn tại hoặc đã gỡ/tắt trước đó.
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+from src.data.bloatware_data import get_bloatware, ADS_PACKAGES
+
+# Section markers for the one-shot state script
+_STATE_SCRIPT = (
+    "echo @@DEVICE; getprop ro.product.device\n"
+    "echo @@INSTALLED; pm list packages --user 0\n"
+    "echo @@DISABLED; pm list packages -d --user 0\n"
+    "echo @@ALL; pm list packages -u --user 0\n"
+)
+
+
+@dataclass
+class PackageStateIndex:
+    """Snapshot of package states for user 0"""
+    device: str = ""
+    installed: Set[str] = field(default_factory=set)  # installed for user 0
+    disabled: Set[str] = field(default_factory=set)   # installed but disabled
+    known: Set[str] = field(default_factory=set)      # incl. uninstalled-for-user (pm list -u)
+
+    @property
+    def uninstalled(self) -> Set[str]:
+        """Still on the system partition but removed for user 0"""
+        return self.known - self.installed
+
+    @classmethod
+    def fetch(cls, adb_manager) -> "PackageStateIndex":
+        """Read device codename and all package lists in one adb shell session"""
+        index = cls()
+        section = None
+        targets = {"@@INSTALLED": index.installed, "@@DISABLED": index.disabled, "@@ALL": index.known}
+        for line in adb_manager.stream_script(_STATE_SCRIPT):
+            line = line.strip()
+            if line.startswith("@@"):
+                section = line
+            elif section == "@@DEVICE" and line:
+                index.device = line
+            elif line.startswith("package:") and section in targets:
+                targets[section].add(line[8:].strip())
+        return index
+
+
+@dataclass
+class DebloatPlan:
+    """Dry-run result: what would be done and what is skipped"""
+    mode: str                                            # 'archive' or 'disable_only'
+    actions: List[str] = field(default_factory=list)     # packages that still need work
+    already_done: List[str] = field(default_factory=list)
+    absent: List[str] = field(default_factory=list)      # not on this device at all
+
+    def items(self):
+        """(package, cascade_key) pairs for BulkActionEngine"""
+        return [(pkg, self.mode) for pkg in self.actions]
+
+    def summary(self) -> str:
+        verb = "gỡ (user 0)" if self.mode == "archive" else "tắt"
+        lines = [
+            f"Cần {verb}: {len(self.actions)}",
+            f"Đã xử lý trước đó (bỏ qua): {len(self.already_done)}",
+            f"Không có trên máy (bỏ qua): {len(self.absent)}",
+        ]
+        if self.actions:
+            shown = self.actions[:15]
+            lines.append("")
+            lines += [f"  • {pkg}" for pkg in shown]
+            if len(self.actions) > len(shown):
+                lines.append(f"  … và {len(self.actions) - len(shown)} app khác")
+        return "\n".join(lines)
+
+
+class DebloatPlanner:
+    def __init__(self, adb_manager):
+        self.adb = adb_manager
+        self.state: Optional[PackageStateIndex] = None
+
+    def refresh(self) -> PackageStateIndex:
+        self.state = PackageStateIndex.fetch(self.adb)
+        return self.state
+
+    def plan(self, packages: Optional[List[str]] = None, mode: str = "archive") -> DebloatPlan:
+        """
+        packages: explicit targets; defaults to the whole per-model bloat database.
+        mode 'archive' removes for user 0, 'disable_only' runs disable-user.
+        """
+        state = self.state or self.refresh()
+        if packages is None:
+            packages = [p for pkgs in get_bloatware(state.device).values() for p in pkgs]
+        # Deduplicate but keep the caller's order
+        targets = list(dict.fromkeys(packages))
+        target_set = set(targets)
+
+        # Empty snapshot means the state fetch failed: plan everything, skip nothing
+        absent = target_set - state.known if state.known else set()
+        if mode == "archive":
+            done = target_set & state.uninstalled
+        else:
+            done = target_set & (state.disabled | state.uninstalled)
+        todo = target_set - absent - done
+
+        return DebloatPlan(
+            mode=mode,
+            actions=[p for p in targets if p in todo],
+            already_done=[p for p in targets if p in done],
+            absent=[p for p in targets if p in absent],
+        )
+
+    def plan_ads(self) -> DebloatPlan:
+        """Ad/analytics services, to be disabled"""
+        return self.plan(ADS_PACKAGES, mode="disable_only")
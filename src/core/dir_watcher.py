@@ -0,0 +1,172 @@
+# src/core/dir_watcher.py
+"""
+Dir Watcher - Live change notifications for a few device folders
+Một luồng `inotifyd -` duy nhất (toybox) báo tạo/xóa/sửa/di chuyển; chỉ các mục bị
+ảnh hưởng được stat lại. Không có inotifyd thì so sánh mtime thư mục định kỳ.
+"""
+import queue
+import shlex
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from src.core.listing_cache import norm_path
+from src.core.stat_listing import iter_listings
+from src.data.file_data import FileEntry
+
+# n create, w closed after write, d delete, m/y moved from/to, D/M watched folder deleted/moved
+WATCH_MASK = "nwdmyDM"
+UPSERT_EVENTS = set("nwy")
+REMOVE_EVENTS = set("dm")
+GONE_EVENTS = set("DM")
+COALESCE = 0.25      # seconds: events arriving together are applied as one change
+POLL_INTERVAL = 3.0  # seconds between mtime checks in the polling fallback
+
+
+@dataclass
+class DirChange:
+    path: str
+    upserts: List[FileEntry] = field(default_factory=list)   # created/modified entries
+    removed: List[str] = field(default_factory=list)         # names that disappeared
+    listing: Optional[List[FileEntry]] = None                # full listing (polling fallback)
+    gone: bool = False                                       # the watched folder itself vanished
+
+
+class DirWatcher:
+    """
+    run() blocks until should_stop(); set_paths() may be called from any thread and
+    restarts the stream with the new folder set. on_change(DirChange) runs on the run() thread.
+    """
+
+    def __init__(self, adb_manager, on_change: Callable):
+        self.adb = adb_manager
+        self.on_change = on_change
+        self._paths: List[str] = []
+        self._lock = threading.Lock()
+        self._proc = None
+        self._restart = threading.Event()
+        self.mode = None  # 'inotify' | 'poll'
+
+    def set_paths(self, paths: List[str]):
+        paths = list(dict.fromkeys(norm_path(p) for p in paths if p))
+        with self._lock:
+            if paths == self._paths:
+                return
+            self._paths = paths
+            proc = self._proc
+        self._restart.set()
+        if proc is not None and proc.poll() is None:
+            proc.kill()  # unblocks the reader; run() respawns with the new set
+
+    def _current(self) -> List[str]:
+        with self._lock:
+            return list(self._paths)
+
+    def has_inotifyd(self) -> bool:
+        out = self.adb.exec_out(["command -v inotifyd 2>/dev/null"])
+        return b"inotifyd" in out
+
+    def run(self, should_stop: Callable):
+        self.mode = "inotify" if self.has_inotifyd() else "poll"
+        loop = self._run_inotify if self.mode == "inotify" else self._run_poll
+        while not should_stop():
+            self._restart.clear()
+            paths = self._current()
+            if not paths:
+                self._restart.wait(0.5)
+                continue
+            loop(paths, should_stop)
+
+    # --- inotifyd ---
+    def _run_inotify(self, paths: List[str], should_stop: Callable):
+        args = " ".join(shlex.quote(f"{p}:{WATCH_MASK}") for p in paths)
+        # adb's own stderr must not be mixed into the event lines
+        proc = self.adb.popen(["exec-out", f"inotifyd - {args} 2>/dev/null"], stderr=subprocess.DEVNULL)
+        with self._lock:
+            self._proc = proc
+        lines = queue.Queue()
+
+        def reader():
+            for raw in iter(proc.stdout.readline, b""):
+                lines.put(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+            lines.put(None)
+
+        threading.Thread(target=reader, daemon=True).start()
+        pending: Dict[str, Dict[str, str]] = {}  # dir -> name -> last event
+        started = time.time()
+        try:
+            while not should_stop() and not self._restart.is_set():
+                try:
+                    line = lines.get(timeout=COALESCE)
+                except queue.Empty:
+                    line = ""
+                if line is None:
+                    # Stream ended (device gone / inotifyd exited): back off, then respawn
+                    if time.time() - started < 2: time.sleep(2)
+                    break
+                if line:
+                    event, _, rest = line.partition("\t")
+                    folder, _, name = rest.partition("\t")
+                    for ch in event:
+                        pending.setdefault(norm_path(folder), {})[name] = ch
+                    continue
+                if pending:
+                    self._apply(pending)
+                    pending = {}
+        finally:
+            if pending:
+                self._apply(pending)
+            if proc.poll() is None:
+                proc.kill()
+            with self._lock:
+                self._proc = None
+
+    def _apply(self, pending: Dict[str, Dict[str, str]]):
+        """Stat only the touched names (one shell session for all folders)"""
+        changes, to_stat = {}, {}
+        for folder, events in pending.items():
+            change = changes.setdefault(folder, DirChange(folder))
+            if any(ev in GONE_EVENTS for ev in events.values()):
+                change.gone = True
+                continue
+            for name, ev in events.items():
+                if not name:
+                    continue
+                if ev in REMOVE_EVENTS:
+                    change.removed.append(name)
+                elif ev in UPSERT_EVENTS:
+                    to_stat.setdefault(folder, []).append(name)
+        if to_stat:
+            for folder, entries in iter_listings(self.adb, list(to_stat), names=to_stat):
+                changes[folder].upserts = entries
+                # Created then deleted before the stat ran
+                found = {e.name for e in entries}
+                changes[folder].removed += [n for n in to_stat[folder] if n not in found]
+        for change in changes.values():
+            if change.gone or change.upserts or change.removed:
+                self.on_change(change)
+
+    # --- polling fallback ---
+    def _mtimes(self, paths: List[str]) -> Dict[str, int]:
+        out = self.adb.exec_out([f"stat -c '%Y %n' -- {' '.join(shlex.quote(p) for p in paths)} 2>/dev/null"])
+        result = {}
+        for line in out.decode("utf-8", errors="replace").splitlines():
+            mtime, sep, path = line.partition(" ")
+            if sep and mtime.isdigit():
+                result[norm_path(path)] = int(mtime)
+        return result
+
+    def _run_poll(self, paths: List[str], should_stop: Callable):
+        known = self._mtimes(paths)
+        while not should_stop() and not self._restart.wait(POLL_INTERVAL):
+            current = self._mtimes(paths)
+            changed = [p for p in paths if p in current and current[p] != known.get(p)]
+            for p in paths:
+                if p in known and p not in current:
+                    self.on_change(DirChange(p, gone=True))
+            if changed:
+                for folder, entries in iter_listings(self.adb, changed):
+                    self.on_change(DirChange(folder, listing=entries))
+            known = current
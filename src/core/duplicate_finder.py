@@ -0,0 +1,129 @@
+# src/core/duplicate_finder.py
+"""
+Duplicate Finder - Find duplicate files without pulling any content to the PC
+Gom nhóm theo kích thước trên PC, rồi chỉ băm các ứng viên cùng kích thước ngay
+trên thiết bị: md5 64 KiB đầu trước, md5 toàn bộ sau (theo lô, một phiên shell mỗi lô).
+"""
+import shlex
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from src.core.file_index import DEFAULT_ROOT
+
+PARTIAL_BYTES = 64 * 1024
+HASH_BATCH = 100        # files per shell session
+MIN_SIZE = 1024         # tiny files are not worth reclaiming
+
+
+@dataclass
+class DuplicateGroup:
+    size: int
+    md5: str
+    paths: List[str] = field(default_factory=list)
+
+    @property
+    def reclaimable(self) -> int:
+        return self.size * (len(self.paths) - 1)
+
+
+def _groups(items: Dict[str, str]) -> List[List[str]]:
+    """paths grouped by value, only groups with 2+ members"""
+    by_value = defaultdict(list)
+    for path, value in items.items():
+        by_value[value].append(path)
+    return [paths for paths in by_value.values() if len(paths) > 1]
+
+
+class DuplicateFinder:
+    """
+    scan(root) -> groups sorted by reclaimable bytes.
+    on_progress(stage, done, total): stage is 'scan', 'partial' or 'full'.
+    """
+
+    def __init__(self, adb_manager, min_size: int = MIN_SIZE):
+        self.adb = adb_manager
+        self.min_size = max(1, min_size)
+
+    def _stopped(self, should_stop) -> bool:
+        return bool(should_stop and should_stop())
+
+    def size_buckets(self, root: str, on_progress=None, should_stop=None) -> Dict[int, List[str]]:
+        """One streamed find pass; same-size files grouped, hard links to one inode counted once"""
+        script = (f"find {shlex.quote(root)} -type f -size +{self.min_size - 1}c "
+                  f"-exec stat -c '%s %i %n' {{}} + 2>/dev/null\n")
+        buckets = defaultdict(dict)  # size -> inode -> path
+        seen = 0
+        stream = self.adb.stream_script(script)
+        try:
+            for line in stream:
+                if self._stopped(should_stop):
+                    break
+                parts = line.split(" ", 2)
+                if len(parts) != 3 or not parts[0].isdigit() or not parts[2].startswith("/"):
+                    continue
+                size = int(parts[0])
+                if size >= self.min_size:
+                    buckets[size].setdefault(parts[1], parts[2])
+                seen += 1
+                if on_progress and seen % 500 == 0:
+                    on_progress("scan", seen, 0)
+        finally:
+            stream.close()
+        return {size: list(inodes.values()) for size, inodes in buckets.items() if len(inodes) > 1}
+
+    def _hash(self, paths: List[str], partial: bool, stage: str, on_progress, should_stop,
+              sizes: Optional[Dict[str, int]] = None) -> Dict[str, str]:
+        """
+        path -> md5. Unreadable files are left out; a partial digest is only kept when
+        head read exactly min(size, PARTIAL_BYTES) bytes (sizes is required for partial).
+        """
+        result = {}
+        for i in range(0, len(paths), HASH_BATCH):
+            if self._stopped(should_stop):
+                break
+            batch = paths[i:i + HASH_BATCH]
+            if partial:
+                # '<md5> <bytes read> <path>' per file, nothing when the file can't be read
+                script = "".join(
+                    f"[ -r {q} ] && n=$(head -c {PARTIAL_BYTES} {q} 2>/dev/null | wc -c) && "
+                    f"d=$(head -c {PARTIAL_BYTES} {q} 2>/dev/null | md5sum) && "
+                    f"echo \"${{d%% *}} $((n)) \"{q}\n"
+                    for q in map(shlex.quote, batch))
+                for line in self.adb.stream_script(script):
+                    parts = line.split(" ", 2)
+                    if len(parts) != 3 or len(parts[0]) != 32 or not parts[1].isdigit():
+                        continue
+                    path = parts[2]
+                    if path in sizes and int(parts[1]) == min(sizes[path], PARTIAL_BYTES):
+                        result[path] = parts[0]
+            else:
+                script = "md5sum " + " ".join(shlex.quote(p) for p in batch) + " 2>/dev/null\n"
+                for line in self.adb.stream_script(script):
+                    digest, _, path = line.partition("  ")
+                    if len(digest) == 32 and path:
+                        result[path] = digest
+            if on_progress: on_progress(stage, min(i + HASH_BATCH, len(paths)), len(paths))
+        return result
+
+    def scan(self, root: str = DEFAULT_ROOT, on_progress: Optional[Callable] = None,
+             should_stop: Optional[Callable] = None) -> List[DuplicateGroup]:
+        buckets = self.size_buckets(root, on_progress, should_stop)
+        sizes = {p: size for size, paths in buckets.items() for p in paths}
+
+        candidates = list(sizes)
+        partial = self._hash(candidates, True, "partial", on_progress, should_stop, sizes)
+        # Same size + same first 64 KiB; files no larger than that were read whole
+        # (_hash drops short reads), so their partial digest is the full one
+        groups, need_full = [], []
+        for paths in _groups({p: f"{sizes[p]}:{d}" for p, d in partial.items()}):
+            if sizes[paths[0]] <= PARTIAL_BYTES:
+                groups.append(DuplicateGroup(sizes[paths[0]], partial[paths[0]], sorted(paths)))
+            else:
+                need_full.extend(paths)
+
+        full = self._hash(need_full, False, "full", on_progress, should_stop)
+        for paths in _groups({p: f"{sizes[p]}:{d}" for p, d in full.items()}):
+            groups.append(DuplicateGroup(sizes[paths[0]], full[paths[0]], sorted(paths)))
+        groups.sort(key=lambda g: g.reclaimable, reverse=True)
+        return groups
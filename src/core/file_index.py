@@ -0,0 +1,178 @@
+# src/core/file_index.py
+"""
+File Index - Whole-storage file index per device (SQLite FTS5)
+Quét lại chỉ những thư mục có mtime thay đổi; tìm theo tên/đuôi file trả kết quả
+trong vài ms và hoạt động cả khi đã ngắt kết nối thiết bị.
+"""
+import os
+import re
+import shlex
+import sqlite3
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional
+
+from src.core.listing_cache import norm_path
+from src.core.stat_listing import iter_listings, format_size, format_mtime
+from src.data.file_data import FileEntry
+
+INDEX_DIR = os.path.join(tempfile.gettempdir(), "xiaomi_adb_cache")
+DEFAULT_ROOT = "/storage/emulated/0"
+BATCH_DIRS = 40  # folders listed per shell session
+
+
+def index_path(device: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", device or "unknown")
+    return os.path.join(INDEX_DIR, f"file_index_{safe}.db")
+
+
+class FileIndex:
+    """SQLite store: dirs(path, mtime), files(dir, name, ext, size, mtime, mode) + FTS on name"""
+
+    def __init__(self, device: str, db_path: Optional[str] = None):
+        self.device = device
+        self.db_path = db_path or index_path(device)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs(path TEXT PRIMARY KEY, mtime INTEGER);
+            CREATE TABLE IF NOT EXISTS files(
+                id INTEGER PRIMARY KEY, dir TEXT, name TEXT, ext TEXT,
+                size INTEGER, mtime INTEGER, mode INTEGER, is_dir INTEGER);
+            CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+            CREATE INDEX IF NOT EXISTS files_ext ON files(ext);
+        """)
+        self.fts = self._create_fts()
+
+    def _create_fts(self) -> bool:
+        """Trigram FTS (substring match) when available, word tokens otherwise, LIKE as last resort"""
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                self.conn.executescript(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+                        name, content='files', content_rowid='id', tokenize='{tokenizer}');
+                    CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+                        INSERT INTO files_fts(rowid, name) VALUES (new.id, new.name);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+                        INSERT INTO files_fts(files_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                    END;
+                """)
+                row = self.conn.execute("SELECT sql FROM sqlite_master WHERE name='files_fts'").fetchone()
+                self.trigram = bool(row and "trigram" in row[0])
+                return True
+            except sqlite3.OperationalError:
+                continue
+        self.trigram = False
+        return False
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    # --- write side (indexer) ---
+    def dir_mtimes(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute("SELECT path, mtime FROM dirs"))
+
+    def replace_dir(self, path: str, mtime: int, entries: List[FileEntry]):
+        rows = [(path, e.name, os.path.splitext(e.name)[1][1:].lower(), e.size_bytes, e.mtime, e.mode, int(e.is_dir))
+                for e in entries]
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM files WHERE dir=?", (path,))
+            self.conn.executemany(
+                "INSERT INTO files(dir, name, ext, size, mtime, mode, is_dir) VALUES (?,?,?,?,?,?,?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO dirs(path, mtime) VALUES (?,?)", (path, mtime))
+
+    def remove_dirs(self, paths: List[str]):
+        with self._lock, self.conn:
+            for path in paths:
+                self.conn.execute("DELETE FROM files WHERE dir=?", (path,))
+                self.conn.execute("DELETE FROM dirs WHERE path=?", (path,))
+
+    # --- read side ---
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def search(self, query: str, limit: int = 300) -> List[FileEntry]:
+        """'*.jpg' / '.jpg' -> by extension; otherwise every word must appear in the name"""
+        query = query.strip()
+        if not query:
+            return []
+        cols = "dir, name, size, mtime, mode, is_dir"
+        ext = re.fullmatch(r"\*?\.(\w+)", query)
+        if ext:
+            sql = f"SELECT {cols} FROM files WHERE ext=? ORDER BY mtime DESC LIMIT ?"
+            args = (ext.group(1).lower(), limit)
+        else:
+            words = query.split()
+            short = [w for w in words if len(w) < 3]
+            if self.fts and (not self.trigram or not short):
+                # Quoted terms (FTS syntax-safe); prefix match for word tokenizer
+                star = "" if self.trigram else "*"
+                match = " AND ".join('"' + w.replace('"', '""') + '"' + star for w in words)
+                sql = (f"SELECT {cols} FROM files WHERE id IN "
+                       f"(SELECT rowid FROM files_fts WHERE files_fts MATCH ?) ORDER BY mtime DESC LIMIT ?")
+                args = (match, limit)
+            else:
+                like = " AND ".join("name LIKE ? ESCAPE '\\'" for _ in words)
+                sql = f"SELECT {cols} FROM files WHERE {like} ORDER BY mtime DESC LIMIT ?"
+                args = tuple("%" + re.sub(r"([%_\\])", r"\\\1", w) + "%" for w in words) + (limit,)
+        with self._lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [FileEntry(
+            name=name, path=f"{d.rstrip('/')}/{name}", is_dir=bool(is_dir),
+            size="" if is_dir else format_size(size), date=format_mtime(mtime),
+            size_bytes=size, mtime=mtime, mode=mode
+        ) for d, name, size, mtime, mode, is_dir in rows]
+
+
+class FileIndexer:
+    """Incremental refresh: one find pass for folder mtimes, then re-list only changed folders"""
+
+    def __init__(self, adb_manager, index: FileIndex):
+        self.adb = adb_manager
+        self.index = index
+
+    def _scan_dirs(self, root: str, should_stop: Optional[Callable]) -> Dict[str, int]:
+        script = f"find {shlex.quote(root)} -type d -exec stat -c '%Y %n' {{}} + 2>/dev/null\n"
+        dirs = {}
+        stream = self.adb.stream_script(script)
+        try:
+            for line in stream:
+                if should_stop and should_stop():
+                    break
+                mtime, sep, path = line.partition(" ")
+                if sep and mtime.isdigit() and path.startswith("/"):
+                    dirs[norm_path(path)] = int(mtime)
+        finally:
+            stream.close()
+        return dirs
+
+    def refresh(self, root: str = DEFAULT_ROOT, on_progress: Optional[Callable] = None,
+                should_stop: Optional[Callable] = None) -> dict:
+        """Returns counts: scanned dirs, changed, removed. on_progress(done, total)."""
+        current = self._scan_dirs(root, should_stop)
+        if should_stop and should_stop():
+            return {"dirs": len(current), "changed": 0, "removed": 0}
+        known = self.index.dir_mtimes()
+        root_n = norm_path(root)
+        prefix = root_n.rstrip("/") + "/"
+        in_root = {p for p in known if p == root_n or p.startswith(prefix)}
+        removed = [p for p in in_root if p not in current] if current else []
+        changed = [p for p, m in current.items() if known.get(p) != m]
+        self.index.remove_dirs(removed)
+
+        done = 0
+        for i in range(0, len(changed), BATCH_DIRS):
+            batch = changed[i:i + BATCH_DIRS]
+            for path, entries in iter_listings(self.adb, batch, should_stop):
+                self.index.replace_dir(path, current[path], entries)
+            done += len(batch)
+            if on_progress: on_progress(done, len(changed))
+            if should_stop and should_stop():
+                break
+        return {"dirs": len(current), "changed": len(changed), "removed": len(removed)}
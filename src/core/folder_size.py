@@ -0,0 +1,96 @@
+# src/core/folder_size.py
+"""
+Folder Size - Recursive folder sizes via 'du -k -d N', streamed per subtree
+du in kết quả theo thứ tự hậu tố (thư mục con xong trước), nên mỗi dòng đọc
+được là một thư mục đã tính xong và có thể hiển thị ngay.
+"""
+import shlex
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from src.core.listing_cache import norm_path, parent_path
+
+
+def du_script(path: str, depth: int = 1) -> str:
+    return f"du -k -d {int(depth)} {shlex.quote(path)} 2>/dev/null\n"
+
+
+def parse_du_line(line: str) -> Optional[Tuple[str, int]]:
+    """'<kb>\\t<path>' -> (path, bytes)"""
+    kb, sep, path = line.partition("\t")
+    if not sep or not kb.strip().isdigit():
+        return None
+    return norm_path(path), int(kb) * 1024
+
+
+class FolderSizeCache:
+    """(device, path) -> bytes. A change under a folder invalidates it, its subtree and all ancestors."""
+
+    def __init__(self):
+        self._data: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, device: str, path: str) -> Optional[int]:
+        with self._lock:
+            return self._data.get((device, norm_path(path)))
+
+    def put(self, device: str, path: str, size: int):
+        with self._lock:
+            self._data[(device, norm_path(path))] = size
+
+    def children(self, device: str, path: str) -> Dict[str, int]:
+        """Cached sizes of the direct subfolders of path"""
+        root = norm_path(path)
+        with self._lock:
+            return {p: s for (d, p), s in self._data.items() if d == device and p != root and parent_path(p) == root}
+
+    def invalidate(self, device: str, *paths: str):
+        with self._lock:
+            for path in paths:
+                path = norm_path(path)
+                prefix = path.rstrip("/") + "/"
+                doomed = [k for k in self._data if k[0] == device and (k[1] == path or k[1].startswith(prefix))]
+                # Ancestors: their totals include this path
+                node = path
+                while node != "/":
+                    node = parent_path(node)
+                    doomed.append((device, node))
+                for key in doomed:
+                    self._data.pop(key, None)
+
+    def clear(self, device: Optional[str] = None):
+        with self._lock:
+            if device is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k[0] == device]:
+                    self._data.pop(key, None)
+
+
+class FolderSizeEngine:
+    """Runs du over one adb shell session; results are cached and streamed"""
+
+    def __init__(self, adb_manager, cache: Optional[FolderSizeCache] = None):
+        self.adb = adb_manager
+        self.cache = cache or FolderSizeCache()
+
+    def scan(self, path: str, depth: int = 1, on_result: Optional[Callable] = None,
+             should_stop: Optional[Callable] = None) -> Dict[str, int]:
+        """on_result(path, bytes) fires as each subtree completes"""
+        device = self.adb.current_device
+        results = {}
+        stream = self.adb.stream_script(du_script(path, depth))
+        try:
+            for line in stream:
+                if should_stop and should_stop():
+                    break
+                parsed = parse_du_line(line)
+                if not parsed:
+                    continue
+                folder, size = parsed
+                results[folder] = size
+                self.cache.put(device, folder, size)
+                if on_result: on_result(folder, size)
+        finally:
+            stream.close()
+        return results
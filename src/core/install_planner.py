@@ -0,0 +1,142 @@
+# src/core/install_planner.py
+"""
+Install Planner - Skip APKs whose package/versionCode already matches the device
+Khi cài lại hàng loạt APK: chỉ cài file khác phiên bản, file lớn chạy trước,
+chia đều ra nhiều luồng cài song song.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.core.apk_parser import APKParser
+
+CACHE_FILE = os.path.join(tempfile.gettempdir(), "xiaomi_adb_cache", "apk_meta.json")
+
+
+@dataclass
+class LocalApk:
+    path: str
+    size: int
+    package: str = "Unknown"
+    version_code: str = "Unknown"
+
+
+@dataclass
+class InstallPlan:
+    lanes: List[List[LocalApk]] = field(default_factory=list)  # largest-first, balanced by bytes
+    skipped: List[LocalApk] = field(default_factory=list)      # same versionCode already installed
+
+    @property
+    def to_install(self) -> List[LocalApk]:
+        return [apk for lane in self.lanes for apk in lane]
+
+    @property
+    def bytes_saved(self) -> int:
+        return sum(apk.size for apk in self.skipped)
+
+    @property
+    def bytes_to_install(self) -> int:
+        return sum(apk.size for apk in self.to_install)
+
+
+def _parsed(meta: dict) -> bool:
+    return meta.get("package", "Unknown") != "Unknown" and meta.get("version_code", "Unknown") != "Unknown"
+
+
+class ApkMetaCache:
+    """APK metadata cached by content hash; (path, size, mtime) avoids re-hashing"""
+    _lock = threading.Lock()
+
+    def __init__(self, cache_file: str = CACHE_FILE):
+        self.cache_file = cache_file
+        self._by_hash: Dict[str, dict] = {}
+        self._by_stat: Dict[str, str] = {}
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._by_hash = data.get("by_hash", {})
+            self._by_stat = data.get("by_stat", {})
+        except Exception:
+            pass
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def lookup(self, path: str) -> LocalApk:
+        st = os.stat(path)
+        stat_key = f"{os.path.abspath(path)}|{st.st_size}|{int(st.st_mtime)}"
+        digest = self._by_stat.get(stat_key) or self.file_hash(path)
+        meta = self._by_hash.get(digest)
+        if meta is None or not _parsed(meta):
+            parser = APKParser(path)
+            parser.parse()
+            meta = {"package": parser.package_name, "version_code": str(parser.version_code)}
+        with self._lock:
+            self._by_stat[stat_key] = digest
+            # A failed parse is not remembered: the next lookup parses the file again
+            if _parsed(meta):
+                self._by_hash[digest] = meta
+            else:
+                self._by_hash.pop(digest, None)
+        return LocalApk(path, st.st_size, meta["package"], meta["version_code"])
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with self._lock:
+                data = {"by_hash": self._by_hash, "by_stat": self._by_stat}
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        except Exception as e:
+            print(f"ApkMetaCache: save failed: {e}")
+
+
+def fetch_installed_versions(adb_manager) -> Dict[str, str]:
+    """All installed packages with versionCode in one 'pm list packages' call"""
+    versions = {}
+    out = adb_manager.shell("pm list packages --show-versioncode")
+    for line in out.splitlines():
+        line = line.strip()
+        if not line.startswith("package:"):
+            continue
+        pkg, _, ver = line[8:].partition(" versionCode:")
+        versions[pkg.strip()] = ver.strip()
+    return versions
+
+
+class InstallPlanner:
+    def __init__(self, adb_manager, cache: Optional[ApkMetaCache] = None):
+        self.adb = adb_manager
+        self.cache = cache or ApkMetaCache()
+
+    def plan(self, paths: List[str], lanes: int = 3) -> InstallPlan:
+        apks = [self.cache.lookup(p) for p in paths]
+        self.cache.save()
+        installed = fetch_installed_versions(self.adb)
+
+        plan = InstallPlan(lanes=[[] for _ in range(max(1, lanes))])
+        todo = []
+        for apk in apks:
+            known = apk.package != "Unknown" and apk.version_code != "Unknown"
+            if known and installed.get(apk.package) == apk.version_code:
+                plan.skipped.append(apk)
+            else:
+                todo.append(apk)
+
+        # Largest-first onto the least loaded lane (LPT scheduling)
+        loads = [0] * len(plan.lanes)
+        for apk in sorted(todo, key=lambda a: a.size, reverse=True):
+            i = loads.index(min(loads))
+            plan.lanes[i].append(apk)
+            loads[i] += apk.size
+        plan.lanes = [lane for lane in plan.lanes if lane]
+        return plan
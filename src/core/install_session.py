@@ -0,0 +1,130 @@
+# src/core/install_session.py
+"""
+Streaming APK Install - pm install sessions fed directly over exec-in
+Mỗi split được stream thẳng vào session (như adb install-multiple), không
+push tạm vào /data/local/tmp nên mỗi byte chỉ ghi xuống flash một lần.
+"""
+import os
+import re
+import shlex
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+
+BUNDLE_EXTS = ('.apks', '.xapk')  # zip bundles of split APKs
+
+
+class InstallError(Exception):
+    pass
+
+
+def extract_bundle(bundle_path: str, dest: str) -> List[str]:
+    """Split APKs of an .apks/.xapk bundle, extracted into dest (obb files and standalone builds skipped)"""
+    try:
+        with zipfile.ZipFile(bundle_path) as zf:
+            names = [n for n in zf.namelist() if n.lower().endswith('.apk')]
+            # bundletool output: splits/ is the split set, standalones/ are alternatives to it
+            splits = [n for n in names if n.startswith('splits/')]
+            names = splits or [n for n in names if not n.startswith('standalones/')]
+            paths = []
+            for name in names:
+                target = os.path.join(dest, f"{len(paths)}_{os.path.basename(name)}")
+                with zf.open(name) as src, open(target, 'wb') as out:
+                    shutil.copyfileobj(src, out)
+                paths.append(target)
+    except (OSError, zipfile.BadZipFile) as e:
+        raise InstallError(f"{os.path.basename(bundle_path)}: {e}")
+    if not paths:
+        raise InstallError(f"{os.path.basename(bundle_path)}: no APK inside")
+    return paths
+
+
+class StreamingInstaller:
+    """
+    Install one or several packages (each a list of split APK paths).
+    Several packages are grouped into one --multi-package session so they
+    commit atomically; splits are written concurrently on `lanes` streams.
+    """
+
+    def __init__(self, adb_manager, lanes: int = 3,
+                 on_progress: Optional[Callable] = None, should_stop: Optional[Callable] = None):
+        self.adb = adb_manager
+        self.lanes = max(1, lanes)
+        self.on_progress = on_progress    # (done_bytes, total_bytes, label)
+        self.should_stop = should_stop
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+
+    # --- pm session helpers ---
+    def _create(self, extra: str = "") -> str:
+        out = self.adb.shell(f"pm install-create -r {extra}".strip())
+        match = re.search(r'\[(\d+)\]', out) or re.search(r'(\d+)', out)
+        if not match:
+            raise InstallError(f"Failed to create session: {out}")
+        return match.group(1)
+
+    def _abandon(self, session_id: str):
+        self.adb.shell(f"pm install-abandon {session_id}")
+
+    def _write(self, session_id: str, index: int, local_path: str):
+        if self.should_stop and self.should_stop():
+            raise InstallError("Cancelled")
+        size = os.path.getsize(local_path)
+        name = f"{index}_{os.path.basename(local_path)}".replace(' ', '_')
+        label = os.path.basename(local_path)
+
+        def on_chunk(n):
+            with self._lock:
+                self._done += n
+                done, total = self._done, self._total
+            if self.on_progress: self.on_progress(done, total, label)
+
+        # adb shell (not exec-in) so pm's "Success: streamed N bytes" comes back
+        with open(local_path, 'rb') as f:
+            out = self.adb.shell_in(
+                f"cmd package install-write -S {size} {session_id} {shlex.quote(name)} -",
+                f, size=size, on_chunk=on_chunk
+            )
+        if "Success" not in out:
+            raise InstallError(f"{label}: {out}")
+
+    # --- public API ---
+    def install(self, packages: List[List[str]]) -> str:
+        """packages: list of split groups. Returns the commit output on success."""
+        packages = [group for group in packages if group]
+        if not packages:
+            raise InstallError("No files provided")
+        self._done = 0
+        self._total = sum(os.path.getsize(p) for group in packages for p in group)
+
+        multi = len(packages) > 1
+        parent = self._create("--multi-package") if multi else None
+        sessions = []
+        try:
+            writes = []
+            for group in packages:
+                sid = self._create()
+                sessions.append(sid)
+                writes += [(sid, i, path) for i, path in enumerate(group)]
+
+            with ThreadPoolExecutor(max_workers=self.lanes) as pool:
+                # Consume results so the first failure propagates
+                for _ in pool.map(lambda w: self._write(*w), writes):
+                    pass
+
+            if multi:
+                self.adb.shell(f"pm install-add-session {parent} {' '.join(sessions)}")
+                res = self.adb.shell(f"pm install-commit {parent}")
+            else:
+                res = self.adb.shell(f"pm install-commit {sessions[0]}")
+            if "Success" not in res:
+                raise InstallError(res)
+            return res
+        except Exception:
+            for sid in sessions + ([parent] if parent else []):
+                self._abandon(sid)
+            raise
@@ -0,0 +1,85 @@
+# src/core/listing_cache.py
+"""
+Listing Cache - Per-device directory listing cache (TTL + stale-while-revalidate)
+Listing còn mới được trả ngay; listing đã cũ vẫn được hiển thị ngay trong khi
+worker liệt kê lại ở nền. Thao tác ghi chỉ xóa đúng các thư mục bị ảnh hưởng.
+"""
+import posixpath
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.data.file_data import FileEntry
+
+
+def norm_path(path: str) -> str:
+    path = posixpath.normpath((path or "/").replace("//", "/"))
+    return "/" if path in (".", "//") else path
+
+
+def parent_path(path: str) -> str:
+    return posixpath.dirname(norm_path(path)) or "/"
+
+
+class ListingCache:
+    """(device, path) -> (timestamp, entries). Thread-safe."""
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: Dict[Tuple[str, str], Tuple[float, List[FileEntry]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, device: str, path: str) -> Tuple[Optional[List[FileEntry]], bool]:
+        """Returns (entries or None, is_fresh)"""
+        with self._lock:
+            hit = self._data.get((device, norm_path(path)))
+        if hit is None:
+            return None, False
+        stamp, entries = hit
+        return list(entries), time.time() - stamp <= self.ttl
+
+    def put(self, device: str, path: str, entries: List[FileEntry]):
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                oldest = min(self._data.items(), key=lambda kv: kv[1][0])[0]
+                self._data.pop(oldest, None)
+            self._data[(device, norm_path(path))] = (time.time(), list(entries))
+
+    def patch(self, device: str, path: str, upserts: List[FileEntry] = (),
+              removed: List[str] = ()) -> Optional[List[FileEntry]]:
+        """
+        Apply a change notification to a cached listing (entries replaced/added by name,
+        removed names dropped) and mark it fresh. Returns the new listing, None if not cached.
+        """
+        key = (device, norm_path(path))
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            drop = set(removed) | {e.name for e in upserts}
+            entries = [e for e in hit[1] if e.name not in drop] + list(upserts)
+            entries.sort(key=lambda x: (not x.is_dir, x.name.lower()))
+            self._data[key] = (time.time(), entries)
+            return list(entries)
+
+    def invalidate(self, device: str, *paths: str):
+        with self._lock:
+            for path in paths:
+                self._data.pop((device, norm_path(path)), None)
+
+    def invalidate_tree(self, device: str, path: str):
+        """Drop a directory and every cached descendant (delete/move of a folder)"""
+        root = norm_path(path)
+        prefix = root.rstrip("/") + "/"
+        with self._lock:
+            for key in [k for k in self._data if k[0] == device and (k[1] == root or k[1].startswith(prefix))]:
+                self._data.pop(key, None)
+
+    def clear(self, device: Optional[str] = None):
+        with self._lock:
+            if device is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k[0] == device]:
+                    self._data.pop(key, None)
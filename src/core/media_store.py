@@ -0,0 +1,142 @@
+# src/core/media_store.py
+"""
+Media Store - Gallery data source backed by Android's MediaStore
+Một lệnh `content query` cho ảnh và một cho video trả về kích thước, ngày chụp,
+loại media của toàn bộ thư viện; sau đó phân trang/sắp xếp hoàn toàn trên PC.
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from src.core.listing_cache import norm_path
+from src.core.stat_listing import format_size, format_mtime
+from src.data.file_data import FileEntry
+
+IMAGES_URI = "content://media/external/images/media"
+VIDEOS_URI = "content://media/external/video/media"
+COLUMNS = ["_id", "_data", "_size", "width", "height", "datetaken", "date_modified", "mime_type"]
+KIND_MARKER = "@@KIND "
+SORT_KEYS = {
+    "date": lambda m: m.date_taken,
+    "size": lambda m: m.size,
+    "name": lambda m: m.name.lower(),
+}
+
+
+@dataclass
+class MediaItem:
+    id: int
+    path: str
+    size: int
+    width: int
+    height: int
+    date_taken: int     # ms since epoch; falls back to date_modified
+    mtime: int          # s since epoch (date_modified)
+    mime: str
+    kind: str           # 'image' | 'video'
+    duration: int = 0   # ms, videos only
+
+    @property
+    def name(self) -> str:
+        return self.path.rsplit("/", 1)[-1]
+
+    @property
+    def folder(self) -> str:
+        return self.path.rsplit("/", 1)[0] or "/"
+
+    def to_entry(self) -> FileEntry:
+        """FileEntry for the file manager views (date column shows the date taken)"""
+        return FileEntry(
+            name=self.name, path=self.path, is_dir=False,
+            size=format_size(self.size), date=format_mtime(self.date_taken // 1000),
+            permissions="", size_bytes=self.size, mtime=self.mtime
+        )
+
+
+def _row_pattern(columns: List[str]):
+    # Values may contain ', ' themselves, so anchor on the known column sequence
+    body = ", ".join(f"{re.escape(c)}=(.*?)" for c in columns)
+    return re.compile(rf"^Row: \d+ {body}$")
+
+
+def _int(value: str) -> int:
+    return int(value) if value.isdigit() else 0
+
+
+def query_script() -> str:
+    image_cols = ":".join(COLUMNS)
+    video_cols = ":".join(COLUMNS + ["duration"])
+    return (f"echo '{KIND_MARKER}image'\n"
+            f"content query --uri {IMAGES_URI} --projection {image_cols} 2>/dev/null\n"
+            f"echo '{KIND_MARKER}video'\n"
+            f"content query --uri {VIDEOS_URI} --projection {video_cols} 2>/dev/null\n")
+
+
+def parse_rows(lines) -> List[MediaItem]:
+    patterns = {"image": _row_pattern(COLUMNS), "video": _row_pattern(COLUMNS + ["duration"])}
+    items, kind = [], "image"
+    for line in lines:
+        if line.startswith(KIND_MARKER):
+            kind = line[len(KIND_MARKER):].strip()
+            continue
+        m = patterns.get(kind, patterns["image"]).match(line)
+        if not m:
+            continue
+        v = m.groups()
+        path = v[1]
+        if not path.startswith("/"):
+            continue  # pending/trashed rows without a file
+        mtime = _int(v[6])
+        items.append(MediaItem(
+            id=_int(v[0]), path=path, size=_int(v[2]), width=_int(v[3]), height=_int(v[4]),
+            date_taken=_int(v[5]) or mtime * 1000, mtime=mtime,
+            mime="" if v[7] == "NULL" else v[7], kind=kind,
+            duration=_int(v[8]) if len(v) > 8 else 0
+        ))
+    return items
+
+
+class MediaStoreSource:
+    """
+    load() queries the device once; page()/count() then work on the host-side table.
+    Pages are filtered by folder prefix and sorted by date taken (newest first) by default.
+    """
+
+    def __init__(self, adb_manager):
+        self.adb = adb_manager
+        self.device = None
+        self.items: List[MediaItem] = []
+        self._view_key = None
+        self._view: List[MediaItem] = []
+
+    def load(self, should_stop: Optional[Callable] = None) -> int:
+        lines = []
+        stream = self.adb.stream_script(query_script())
+        try:
+            for line in stream:
+                if should_stop and should_stop():
+                    break
+                lines.append(line)
+        finally:
+            stream.close()
+        self.items = parse_rows(lines)
+        self.device = self.adb.current_device
+        self._view_key = None
+        return len(self.items)
+
+    def _select(self, folder: str, sort: str, descending: bool, kinds) -> List[MediaItem]:
+        key = (norm_path(folder) if folder else "", sort, descending, tuple(kinds))
+        if key != self._view_key:
+            prefix = key[0].rstrip("/") + "/" if key[0] else ""
+            view = [m for m in self.items if m.kind in kinds and (not prefix or m.path.startswith(prefix))]
+            view.sort(key=SORT_KEYS.get(sort, SORT_KEYS["date"]), reverse=descending)
+            self._view_key, self._view = key, view
+        return self._view
+
+    def count(self, folder: str = "", kinds=("image", "video")) -> int:
+        prefix = norm_path(folder).rstrip("/") + "/" if folder else ""
+        return sum(1 for m in self.items if m.kind in kinds and m.path.startswith(prefix))
+
+    def page(self, offset: int, limit: int, folder: str = "", sort: str = "date",
+             descending: bool = True, kinds=("image", "video")) -> List[MediaItem]:
+        return self._select(folder, sort, descending, kinds)[offset:offset + limit]
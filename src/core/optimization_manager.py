@@ -86,20 +86,12 @@ class OptimizationManager:
     # ================== Xiaomi Specific ==================
 
     def disable_miui_ads(self):
-        """Disable standard MSA and Analytics"""
-        # Disable MSA
-        self.adb.shell("pm disable-user --user 0 com.miui.msa.global")
-        # Disable Analytics
-        self.adb.shell("pm disable-user --user 0 com.miui.analytics")
-        self.adb.shell("pm disable-user --user 0 com.miui.systemadsolution")
-        
-        # Add more ad packages
-        ads = [
-            "com.xiaomi.joyose", 
-            "com.google.android.gms.location.history"
-        ]
-        for pkg in ads:
-            self.adb.shell(f"pm disable-user --user 0 {pkg}")
+        """Disable MSA, Analytics and other ad services (only those still enabled)"""
+        from src.core.debloat_planner import DebloatPlanner
+        from src.core.bulk_actions import BulkActionEngine
+        plan = DebloatPlanner(self.adb).plan_ads()
+        BulkActionEngine(self.adb).run(plan.items())
+        return plan
 
     def fix_eu_region(self):
         """Fix region issues on EU ROMs"""
@@ -0,0 +1,128 @@
+# src/core/stat_listing.py
+"""
+Stat Listing - Machine-readable directory listing via toybox stat
+Mỗi bản ghi là 'mode/size/mtime/name//': tên file không thể chứa '/', nên tách
+một lần theo '//\n' là an toàn với mọi ký tự (kể cả dấu cách, xuống dòng).
+"""
+import shlex
+import stat
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.data.file_data import FileEntry
+
+RECORD_END = "//\n"
+LINKS_MARKER = "@@LINKS"
+NOSTAT_MARKER = "@@NOSTAT"
+DIR_MARKER = "@@DIR "
+END_MARKER = "@@END"
+
+_GLOBS = "* .[!.]* ..?*"  # every entry except . and ..
+
+
+def format_size(n: int) -> str:
+    if n < 1024: return f"{n} B"
+    if n < 1024 * 1024: return f"{n / 1024:.1f} KB"
+    if n < 1024 * 1024 * 1024: return f"{n / (1024 * 1024):.1f} MB"
+    return f"{n / (1024 * 1024 * 1024):.1f} GB"
+
+
+def format_mtime(mtime: int) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime)) if mtime else ""
+
+
+def listing_script(path: str, names: Optional[List[str]] = None) -> str:
+    """
+    Shell snippet (runs in a subshell) listing one folder, or only `names` inside it;
+    symlinks resolved after the marker
+    """
+    targets = " ".join(shlex.quote(n) for n in names) if names else _GLOBS
+    return (
+        f"( cd {shlex.quote(path)} 2>/dev/null || exit 0\n"
+        f"  command -v stat >/dev/null 2>&1 || {{ echo '{NOSTAT_MARKER}'; exit 0; }}\n"
+        f"  stat -c '%f/%s/%Y/%n//' -- {targets} 2>/dev/null\n"
+        f"  echo '{LINKS_MARKER}'\n"
+        f"  for f in {targets}; do\n"
+        f'    [ -L "$f" ] || continue\n'
+        f'    if [ -d "$f" ]; then t=d; else t=f; fi\n'
+        f'    echo "$t/$f/$(readlink "$f")//"\n'
+        f"  done )\n"
+    )
+
+
+def parse_listing(path: str, output: str) -> Optional[List[FileEntry]]:
+    """Parse listing_script output. Returns None when stat is unavailable (use ls -l)."""
+    if NOSTAT_MARKER in output:
+        return None
+    body, _, links_part = output.partition(LINKS_MARKER)
+
+    # Symlinks: '<d|f>/<name>/<target>//'
+    links = {}
+    for rec in links_part.split(RECORD_END):
+        kind, sep, rest = rec.strip("\n").partition("/")
+        if not sep: continue
+        name, _, target = rest.partition("/")
+        links[name] = (kind == "d", target)
+
+    base = path.rstrip("/")
+    entries = []
+    for rec in body.split(RECORD_END):
+        fields = rec.lstrip("\n").split("/", 3)
+        if len(fields) != 4: continue
+        try:
+            mode = int(fields[0], 16)
+            size = int(fields[1])
+            mtime = int(fields[2])
+        except ValueError:
+            continue
+        name = fields[3]
+        if name in (".", "..") or not name: continue
+        link_target = ""
+        if stat.S_ISLNK(mode):
+            is_dir, link_target = links.get(name, (False, ""))
+            link_target = link_target or "?"
+        else:
+            is_dir = stat.S_ISDIR(mode)
+        entries.append(FileEntry(
+            name=name,
+            path=f"{base}/{name}",
+            is_dir=is_dir,
+            size="" if is_dir else format_size(size),
+            date=format_mtime(mtime),
+            permissions=stat.filemode(mode),
+            size_bytes=size,
+            mtime=mtime,
+            mode=mode,
+            link_target=link_target,
+        ))
+    entries.sort(key=lambda x: (not x.is_dir, x.name.lower()))
+    return entries
+
+
+def iter_listings(adb_manager, paths: List[str], should_stop: Optional[Callable] = None,
+                  names: Optional[Dict[str, List[str]]] = None) -> Iterator[Tuple[str, List[FileEntry]]]:
+    """
+    List several folders in ONE shell session; yields (path, entries) as each completes.
+    names: optionally only stat these entries of a folder (path -> names).
+    """
+    names = names or {}
+    script = "".join(f"echo '{DIR_MARKER}{i}'\n{listing_script(p, names.get(p))}" for i, p in enumerate(paths))
+    script += f"echo '{END_MARKER}'\n"
+    stream = adb_manager.stream_script(script)
+    current, lines = None, []
+    try:
+        for line in stream:
+            if should_stop and should_stop():
+                break
+            if line.startswith(DIR_MARKER) or line == END_MARKER:
+                # Unreadable folders print nothing (no links marker) and are skipped
+                if current is not None and LINKS_MARKER in lines:
+                    entries = parse_listing(paths[current], "\n".join(lines) + "\n")
+                    if entries is not None:
+                        yield paths[current], entries
+                current = int(line[len(DIR_MARKER):]) if line.startswith(DIR_MARKER) else None
+                lines = []
+            elif current is not None:
+                lines.append(line)
+    finally:
+        stream.close()
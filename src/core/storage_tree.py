@@ -0,0 +1,220 @@
+# src/core/storage_tree.py
+"""
+Storage Tree - Hierarchical storage usage per device, aggregated as the scan streams in
+Mỗi thư mục lưu (mtime, dung lượng file trực tiếp); tổng của cây con được cộng dồn
+ngay khi từng dòng đến. Lần làm mới chỉ liệt kê lại thư mục có mtime thay đổi.
+"""
+import json
+import os
+import re
+import shlex
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.core.file_index import INDEX_DIR, DEFAULT_ROOT, BATCH_DIRS
+from src.core.listing_cache import norm_path, parent_path
+
+DIR_MARKER = "@@DIR "
+UPDATE_EVERY = 0.3  # seconds between on_update callbacks while streaming
+
+
+def tree_path(device: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", device or "unknown")
+    return os.path.join(INDEX_DIR, f"storage_tree_{safe}.json")
+
+
+class StorageTree:
+    """
+    dirs: path -> [mtime, own_bytes] (files directly inside). totals: path -> subtree bytes,
+    kept up to date incrementally. Thread-safe: the scanner writes while the UI reads.
+    """
+
+    def __init__(self, device: str, root: str = DEFAULT_ROOT):
+        self.device = device
+        self.root = norm_path(root)
+        self.dirs: Dict[str, list] = {}
+        self.totals: Dict[str, int] = defaultdict(int)
+        self.kids: Dict[str, set] = defaultdict(set)
+        self.scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    # --- mutation (scanner thread) ---
+    def _ancestors(self, path: str):
+        while True:
+            yield path
+            if path == self.root or path == "/":
+                return
+            path = parent_path(path)
+
+    def _ensure_dir(self, path: str):
+        if path in self.dirs:
+            return
+        self.dirs[path] = [0, 0]
+        child = path
+        for parent in self._ancestors(parent_path(path)) if path != self.root else ():
+            self.kids[parent].add(child)
+            if parent in self.dirs:
+                break
+            self.dirs[parent] = [0, 0]
+            child = parent
+
+    def set_dir(self, path: str, mtime: Optional[int] = None):
+        """Register a folder; mtime is recorded only once its files have been counted"""
+        with self._lock:
+            self._ensure_dir(path)
+            if mtime is not None:
+                self.dirs[path][0] = mtime
+
+    def add_bytes(self, path: str, delta: int):
+        """Add to a folder's own bytes and every ancestor's subtree total"""
+        with self._lock:
+            self._ensure_dir(path)
+            self.dirs[path][1] += delta
+            for p in self._ancestors(path):
+                self.totals[p] += delta
+
+    def remove_dir(self, path: str):
+        with self._lock:
+            if path not in self.dirs:
+                return
+            own = self.dirs.pop(path)[1]
+            for p in self._ancestors(path):
+                self.totals[p] -= own
+            self.totals.pop(path, None)
+            self.kids.pop(path, None)
+            self.kids[parent_path(path)].discard(path)
+
+    # --- queries (UI thread) ---
+    def size(self, path: str) -> int:
+        with self._lock:
+            return self.totals.get(norm_path(path), 0)
+
+    def children(self, path: str) -> List[Tuple[str, int]]:
+        """[(child folder, subtree bytes)] largest first, plus ('<path>/', own files) if any"""
+        path = norm_path(path)
+        with self._lock:
+            items = [(c, self.totals.get(c, 0)) for c in self.kids.get(path, ())]
+            own = self.dirs.get(path, [0, 0])[1]
+        if own > 0:
+            items.append((path.rstrip("/") + "/", own))
+        return sorted(items, key=lambda kv: kv[1], reverse=True)
+
+    # --- persistence ---
+    def save(self, file_path: Optional[str] = None):
+        file_path = file_path or tree_path(self.device)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with self._lock:
+            data = {"root": self.root, "scanned_at": self.scanned_at, "dirs": self.dirs}
+            tmp = file_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        os.replace(tmp, file_path)
+
+    @classmethod
+    def load(cls, device: str, root: str = DEFAULT_ROOT, file_path: Optional[str] = None) -> "StorageTree":
+        tree = cls(device, root)
+        try:
+            with open(file_path or tree_path(device), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return tree
+        if data.get("root") != tree.root:
+            return tree
+        for path, (mtime, own) in data.get("dirs", {}).items():
+            tree.set_dir(path, mtime)
+            if own: tree.add_bytes(path, own)
+        tree.scanned_at = data.get("scanned_at", 0.0)
+        return tree
+
+
+class StorageScanner:
+    """
+    scan(tree): first run streams every file once; later runs list directory mtimes and
+    re-read only the folders whose mtime changed (plus new ones); removed folders drop out.
+    on_update() is called periodically while results stream in.
+    """
+
+    def __init__(self, adb_manager):
+        self.adb = adb_manager
+
+    def _dir_mtimes(self, root: str, should_stop) -> Dict[str, int]:
+        script = f"find {shlex.quote(root)} -type d -exec stat -c '%Y %n' {{}} + 2>/dev/null\n"
+        dirs = {}
+        stream = self.adb.stream_script(script)
+        try:
+            for line in stream:
+                if should_stop and should_stop():
+                    break
+                mtime, sep, path = line.partition(" ")
+                if sep and mtime.isdigit() and path.startswith("/"):
+                    dirs[norm_path(path)] = int(mtime)
+        finally:
+            stream.close()
+        return dirs
+
+    def _stream_files(self, script: str, tree: StorageTree, on_update, should_stop, per_dir: bool):
+        """'<size> <path>' lines (or '@@DIR <dir>' headers when per_dir) added to the tree as they arrive"""
+        last = time.time()
+        current = None
+        stream = self.adb.stream_script(script)
+        try:
+            for line in stream:
+                if should_stop and should_stop():
+                    break
+                if per_dir and line.startswith(DIR_MARKER):
+                    current = norm_path(line[len(DIR_MARKER):])
+                    continue
+                size, sep, path = line.partition(" ")
+                if not sep or not size.isdigit():
+                    continue
+                folder = current if per_dir else parent_path(path)
+                if folder:
+                    tree.add_bytes(folder, int(size))
+                if on_update and time.time() - last > UPDATE_EVERY:
+                    on_update()
+                    last = time.time()
+        finally:
+            stream.close()
+
+    def scan(self, tree: StorageTree, on_update: Optional[Callable] = None,
+             should_stop: Optional[Callable] = None) -> dict:
+        root = tree.root
+        current = self._dir_mtimes(root, should_stop)
+        if should_stop and should_stop():
+            return {"dirs": len(current), "changed": 0, "removed": 0}
+        first = not tree.dirs
+        removed = [p for p in list(tree.dirs) if p not in current] if current else []
+        changed = [p for p, m in current.items() if p not in tree.dirs or tree.dirs[p][0] != m]
+        for path in sorted(removed, key=len, reverse=True):
+            tree.remove_dir(path)
+        for path in sorted(changed, key=len):
+            tree.set_dir(path)
+
+        stopped = lambda: bool(should_stop and should_stop())
+        if first:
+            script = f"find {shlex.quote(root)} -type f -exec stat -c '%s %n' {{}} + 2>/dev/null\n"
+            self._stream_files(script, tree, on_update, should_stop, per_dir=False)
+            if not stopped():
+                for path in changed:
+                    tree.set_dir(path, current[path])
+        else:
+            for i in range(0, len(changed), BATCH_DIRS):
+                batch = changed[i:i + BATCH_DIRS]
+                for path in batch:
+                    tree.add_bytes(path, -tree.dirs[path][1])  # re-counted below
+                script = "".join(
+                    f"echo '{DIR_MARKER}'{shlex.quote(p)}\n"
+                    f"find {shlex.quote(p)} -maxdepth 1 -type f -exec stat -c '%s %n' {{}} + 2>/dev/null\n"
+                    for p in batch)
+                self._stream_files(script, tree, on_update, should_stop, per_dir=True)
+                if stopped():
+                    break  # unfinished folders keep their old mtime and are re-read next time
+                for path in batch:
+                    tree.set_dir(path, current[path])
+        if not stopped():
+            tree.scanned_at = time.time()
+        tree.save()
+        if on_update: on_update()
+        return {"dirs": len(current), "changed": len(changed), "removed": len(removed)}
@@ -0,0 +1,248 @@
+# src/core/sync_engine.py
+"""
+Sync Engine - PC <-> device folder sync with delta transfer
+So sánh hai phía theo (size, mtime), tùy chọn xác nhận bằng hash tính hàng loạt
+trên máy, rồi chỉ chuyển file mới/thay đổi trên nhiều luồng song song.
+Không bao giờ xóa file ở phía nào.
+
+Headless:
+    python -m src.core.sync_engine <local_dir> <remote_dir> [--mode pull|push|two_way] [--dry-run]
+"""
+import hashlib
+import os
+import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.core.adb.adb_manager import sync_error
+from src.core.transfer_engine import TransferEngine, TransferError
+
+MODES = ("pull", "push", "two_way")
+MTIME_SLACK = 2                   # seconds; FAT/exFAT and adb round timestamps
+LARGE_FILE = 16 * 1024 * 1024     # above this: resumable TransferEngine, below: plain adb pull/push
+HASH_BATCH = 200
+
+FileMap = Dict[str, Tuple[int, int]]  # relpath -> (size, mtime)
+
+
+@dataclass
+class SyncPlan:
+    mode: str
+    local_root: str
+    remote_root: str
+    to_pull: List[str] = field(default_factory=list)
+    to_push: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    hash_matched: int = 0        # same content despite differing mtime
+    bytes_pull: int = 0
+    bytes_push: int = 0
+    local: FileMap = field(default_factory=dict, repr=False)
+    remote: FileMap = field(default_factory=dict, repr=False)
+
+    def summary(self) -> str:
+        mb = 1024 * 1024
+        return "\n".join([
+            f"Chế độ: {self.mode}",
+            f"Tải về PC: {len(self.to_pull)} file ({self.bytes_pull / mb:.1f} MB)",
+            f"Gửi lên máy: {len(self.to_push)} file ({self.bytes_push / mb:.1f} MB)",
+            f"Không đổi: {self.unchanged}" + (f" (trong đó {self.hash_matched} xác nhận bằng hash)" if self.hash_matched else ""),
+        ])
+
+
+def list_local(root: str) -> FileMap:
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(".part"):
+                continue
+            full = os.path.join(dirpath, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            rel = os.path.relpath(full, root).replace(os.sep, "/")
+            files[rel] = (st.st_size, int(st.st_mtime))
+    return files
+
+
+def list_remote(adb_manager, root: str) -> FileMap:
+    """One find pass: '<size> <mtime> <path>' per regular file"""
+    root = root.rstrip("/") or "/"
+    prefix = root.rstrip("/") + "/"
+    script = f"find {shlex.quote(root)} -type f -exec stat -c '%s %Y %n' {{}} + 2>/dev/null\n"
+    files = {}
+    for line in adb_manager.stream_script(script):
+        parts = line.split(" ", 2)
+        if len(parts) != 3 or not parts[0].isdigit() or not parts[1].isdigit() or not parts[2].startswith(prefix):
+            continue
+        rel = parts[2][len(prefix):]
+        if rel.endswith(".part"):
+            continue
+        files[rel] = (int(parts[0]), int(parts[1]))
+    return files
+
+
+def remote_md5(adb_manager, root: str, rels: List[str]) -> Dict[str, str]:
+    """Batched md5sum on the device (one session per HASH_BATCH files)"""
+    prefix = root.rstrip("/") + "/"
+    result = {}
+    for i in range(0, len(rels), HASH_BATCH):
+        batch = rels[i:i + HASH_BATCH]
+        script = "md5sum " + " ".join(shlex.quote(prefix + r) for r in batch) + " 2>/dev/null\n"
+        for line in adb_manager.stream_script(script):
+            digest, _, path = line.partition("  ")
+            if len(digest) == 32 and path.startswith(prefix):
+                result[path[len(prefix):]] = digest
+    return result
+
+
+def local_md5(path: str) -> str:
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SyncEngine:
+    def __init__(self, adb_manager, lanes: int = 3, verify_hash: bool = False):
+        self.adb = adb_manager
+        self.lanes = max(1, lanes)
+        self.verify_hash = verify_hash  # confirm same-size/different-mtime pairs by content
+
+    def plan(self, local_root: str, remote_root: str, mode: str = "pull") -> SyncPlan:
+        if mode not in MODES:
+            raise ValueError(f"Unknown sync mode: {mode}")
+        os.makedirs(local_root, exist_ok=True)
+        local = list_local(local_root)
+        remote = list_remote(self.adb, remote_root)
+        plan = SyncPlan(mode, local_root, remote_root.rstrip("/") or "/", local=local, remote=remote)
+
+        candidates = []  # same size, different mtime: maybe identical
+        for rel in set(local) | set(remote):
+            l, r = local.get(rel), remote.get(rel)
+            if l and r and l[0] == r[0] and abs(l[1] - r[1]) <= MTIME_SLACK:
+                plan.unchanged += 1
+            elif l and r and l[0] == r[0] and self.verify_hash:
+                candidates.append(rel)
+            else:
+                self._assign(plan, rel, l, r)
+
+        if candidates:
+            digests = remote_md5(self.adb, plan.remote_root, candidates)
+            for rel in candidates:
+                if digests.get(rel) == local_md5(os.path.join(local_root, rel)):
+                    plan.unchanged += 1
+                    plan.hash_matched += 1
+                else:
+                    self._assign(plan, rel, local[rel], remote[rel])
+
+        plan.to_pull.sort()
+        plan.to_push.sort()
+        plan.bytes_pull = sum(remote[r][0] for r in plan.to_pull)
+        plan.bytes_push = sum(local[r][0] for r in plan.to_push)
+        return plan
+
+    @staticmethod
+    def _assign(plan: SyncPlan, rel: str, l, r):
+        if plan.mode == "pull":
+            if r: plan.to_pull.append(rel)
+        elif plan.mode == "push":
+            if l: plan.to_push.append(rel)
+        else:
+            # Two-way: copy what is missing, newer side wins otherwise
+            if r and (not l or r[1] > l[1]): plan.to_pull.append(rel)
+            elif l: plan.to_push.append(rel)
+
+    def execute(self, plan: SyncPlan, on_progress: Optional[Callable] = None,
+                should_stop: Optional[Callable] = None) -> dict:
+        """on_progress(done_files, total_files, rel). Returns {'done', 'failed': [..], 'seconds'}."""
+        jobs = [("pull", rel) for rel in plan.to_pull] + [("push", rel) for rel in plan.to_push]
+        lock = threading.Lock()
+        state = {"done": 0, "failed": []}
+        start = time.time()
+        remote_prefix = plan.remote_root.rstrip("/") + "/"
+        made_dirs = set()
+
+        def run(job):
+            direction, rel = job
+            if should_stop and should_stop():
+                return
+            local = os.path.join(plan.local_root, *rel.split("/"))
+            remote = remote_prefix + rel
+            try:
+                if direction == "pull":
+                    os.makedirs(os.path.dirname(local), exist_ok=True)
+                    self._pull(remote, local, plan.remote[rel], should_stop)
+                else:
+                    parent = remote.rsplit("/", 1)[0]
+                    with lock:
+                        need = parent not in made_dirs
+                        made_dirs.add(parent)
+                    if need:
+                        self.adb.exec_out([f"mkdir -p {shlex.quote(parent)} 2>/dev/null"])
+                    self._push(local, remote, should_stop)
+                ok = True
+            except (TransferError, OSError) as e:
+                ok = False
+                err = f"{rel}: {e}"
+            with lock:
+                state["done"] += 1
+                if not ok: state["failed"].append(err)
+                if on_progress: on_progress(state["done"], len(jobs), rel)
+
+        # Largest first so lanes finish together
+        jobs.sort(key=lambda j: (plan.remote if j[0] == "pull" else plan.local)[j[1]][0], reverse=True)
+        with ThreadPoolExecutor(max_workers=self.lanes) as pool:
+            list(pool.map(run, jobs))
+        state["seconds"] = time.time() - start
+        return state
+
+    def _pull(self, remote: str, local: str, stat, should_stop):
+        size, mtime = stat
+        if size >= LARGE_FILE:
+            res = TransferEngine(self.adb, should_stop=should_stop).pull(remote, local)
+            if not res.ok: raise TransferError(res.detail)
+            os.utime(local, (mtime, mtime))
+        else:
+            out = self.adb.pull_file(remote, local)
+            if sync_error(out) or not os.path.exists(local): raise TransferError(sync_error(out) or out)
+
+    def _push(self, local: str, remote: str, should_stop):
+        if os.path.getsize(local) >= LARGE_FILE:
+            res = TransferEngine(self.adb, should_stop=should_stop).push(local, remote)
+            if not res.ok: raise TransferError(res.detail)
+            # Keep mtimes aligned so the next run sees the file as unchanged
+            self.adb.exec_out([f"touch -m -d @{int(os.path.getmtime(local))} {shlex.quote(remote)} 2>/dev/null"])
+        else:
+            out = self.adb.push_file(local, remote)
+            if sync_error(out): raise TransferError(sync_error(out))
+
+
+if __name__ == "__main__":
+    import argparse
+    from src.core.adb.adb_manager import ADBManager
+
+    parser = argparse.ArgumentParser(description="Sync a PC folder with a device folder")
+    parser.add_argument("local")
+    parser.add_argument("remote")
+    parser.add_argument("--mode", choices=MODES, default="pull")
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--lanes", type=int, default=3)
+    parser.add_argument("--hash", action="store_true", help="confirm same-size files by md5")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    adb = ADBManager()
+    if args.device: adb.select_device(args.device)
+    elif not adb.check_connection(): raise SystemExit("No device connected")
+    engine = SyncEngine(adb, lanes=args.lanes, verify_hash=args.hash)
+    sync_plan = engine.plan(args.local, args.remote, args.mode)
+    print(sync_plan.summary())
+    if not args.dry_run:
+        result = engine.execute(sync_plan, on_progress=lambda d, t, rel: print(f"[{d}/{t}] {rel}"))
+        print(f"Done {result['done']} in {result['seconds']:.1f}s, failed {len(result['failed'])}")
+        for line in result["failed"]: print("  " + line)
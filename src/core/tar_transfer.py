@@ -0,0 +1,185 @@
+# src/core/tar_transfer.py
+"""
+Tar Transfer - Bulk folder transfers as one tar stream
+Thư mục có hàng nghìn file nhỏ được gửi/nhận như một luồng tar duy nhất qua
+exec-out/exec-in và giải nén ngay trên đường đi, thay vì một lượt sync cho mỗi file.
+Không hỗ trợ tiếp tục giữa chừng (dùng TransferEngine cho file lớn).
+"""
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tarfile
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from src.core.transfer_engine import TransferError, TransferResult, _Rate
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+TAR_MIN_FILES = 50               # fewer files: per-file sync overhead does not matter
+TAR_AVG_SIZE = 512 * 1024        # bulk mode when the average file is smaller than this
+CHUNK = 256 * 1024
+STATUS_MARKER = "@@TAR_EXIT"
+
+
+def should_use_tar(file_count: int, total_bytes: int) -> bool:
+    return file_count >= TAR_MIN_FILES and total_bytes / max(file_count, 1) < TAR_AVG_SIZE
+
+
+def local_tree_stats(path: str) -> Tuple[int, int]:
+    """(file count, total bytes) of a local folder"""
+    count = total = 0
+    for dirpath, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+                count += 1
+            except OSError:
+                pass
+    return count, total
+
+
+def remote_tree_stats(adb_manager, path: str) -> Tuple[int, int]:
+    """(file count, total bytes) of a device folder: find | wc -l and du -sk in one call"""
+    q = shlex.quote(path)
+    out = adb_manager.exec_out([f"find {q} -type f 2>/dev/null | wc -l; du -sk {q} 2>/dev/null"])
+    parts = out.decode("utf-8", errors="replace").split()
+    if len(parts) >= 2 and parts[0].isdigit() and parts[1].isdigit():
+        return int(parts[0]), int(parts[1]) * 1024
+    return 0, 0
+
+
+def has_tar(adb_manager) -> bool:
+    """True when the device has a tar to extract/create streams with"""
+    return b"tar" in adb_manager.exec_out(["command -v tar 2>/dev/null"])
+
+
+def negotiate_codec(adb_manager, compress: bool) -> str:
+    """'' (plain tar), 'lz4' or 'gz' depending on what both the device and the host can do"""
+    if not compress:
+        return ""
+    out = adb_manager.exec_out(["for t in lz4 gzip; do command -v $t; done 2>/dev/null"]).decode("utf-8", errors="replace")
+    tools = {os.path.basename(line.strip()) for line in out.splitlines()}
+    if "lz4" in tools and lz4_frame is not None:
+        return "lz4"
+    return "gz" if "gzip" in tools else ""
+
+
+class TarTransfer:
+    """
+    pull(remote_dir, local_parent) / push(local_dir or [files and folders], remote_parent).
+    on_progress(done_bytes, total_bytes, bytes_per_sec) like TransferEngine.
+    """
+
+    def __init__(self, adb_manager, on_progress: Optional[Callable] = None,
+                 should_stop: Optional[Callable] = None, compress: bool = False):
+        self.adb = adb_manager
+        self.on_progress = on_progress
+        self.should_stop = should_stop
+        self.compress = compress
+
+    def _stopped(self) -> bool:
+        return bool(self.should_stop and self.should_stop())
+
+    # --- pull ---
+    def pull(self, remote_dir: str, local_parent: str) -> TransferResult:
+        remote_dir = remote_dir.rstrip("/")
+        parent, name = remote_dir.rsplit("/", 1)
+        _, total = remote_tree_stats(self.adb, remote_dir)
+        codec = negotiate_codec(self.adb, self.compress)
+        cmd = f"tar -cf - -C {shlex.quote(parent or '/')} {shlex.quote(name)} 2>/dev/null"
+        if codec == "gz": cmd += " | gzip -1"
+        elif codec == "lz4": cmd += " | lz4 -1 -c"
+
+        dest_root = os.path.abspath(local_parent)
+        os.makedirs(dest_root, exist_ok=True)
+        proc = self.adb.popen(["exec-out", cmd], stderr=subprocess.DEVNULL)  # binary stream: no adb messages
+        stream = lz4_frame.LZ4FrameFile(proc.stdout, "rb") if codec == "lz4" else proc.stdout
+        start, rate, done = time.time(), _Rate(), 0
+        try:
+            with tarfile.open(fileobj=stream, mode="r|gz" if codec == "gz" else "r|") as tar:
+                for m in tar:
+                    if self._stopped():
+                        return TransferResult(False, total, time.time() - start, detail="Cancelled")
+                    target = os.path.abspath(os.path.join(dest_root, m.name))
+                    if not target.startswith(dest_root + os.sep):
+                        continue  # refuse path traversal
+                    if m.isdir():
+                        os.makedirs(target, exist_ok=True)
+                        continue
+                    if not m.isfile():
+                        continue  # links/devices are not recreated on the PC
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with open(target, "wb") as out:
+                        shutil.copyfileobj(tar.extractfile(m), out, CHUNK)
+                    os.utime(target, (m.mtime, m.mtime))
+                    done += m.size
+                    if self.on_progress: self.on_progress(done, max(total, done), rate.add(done))
+        except (tarfile.TarError, EOFError, OSError) as e:
+            raise TransferError(f"Luồng tar bị lỗi ({remote_dir}): {e}")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+        return TransferResult(True, done, time.time() - start, detail="tar" + (f"+{codec}" if codec else ""))
+
+    # --- push ---
+    def push(self, sources, remote_parent: str) -> TransferResult:
+        sources = [os.path.abspath(p) for p in ([sources] if isinstance(sources, str) else sources)]
+        total = sum(local_tree_stats(p)[1] if os.path.isdir(p) else os.path.getsize(p) for p in sources)
+        codec = negotiate_codec(self.adb, self.compress)
+        extract = f"tar -xf - -C {shlex.quote(remote_parent)}"
+        if codec == "gz": extract = f"gzip -dc | {extract}"
+        elif codec == "lz4": extract = f"lz4 -dc | {extract}"
+
+        r, w = os.pipe()
+        reader, writer = os.fdopen(r, "rb"), os.fdopen(w, "wb")
+        error = []
+
+        def produce():
+            # Tar is written on a helper thread and streamed to exec-in as it is produced
+            try:
+                sink = lz4_frame.LZ4FrameFile(writer, "wb") if codec == "lz4" else writer
+                with tarfile.open(fileobj=sink, mode="w|gz" if codec == "gz" else "w|",
+                                  format=tarfile.PAX_FORMAT) as tar:
+                    for path in sources:
+                        tar.add(path, arcname=os.path.basename(path),
+                                filter=lambda ti: None if self._stopped() else ti)
+                if sink is not writer: sink.close()
+            except (BrokenPipeError, OSError) as e:
+                error.append(e)
+            finally:
+                try:
+                    writer.close()
+                except OSError:
+                    pass
+
+        class _Source:
+            def read(src, n): return b"" if self._stopped() else reader.read(n)
+
+        start, rate, sent = time.time(), _Rate(), [0]
+
+        def on_chunk(n):
+            sent[0] += n
+            if self.on_progress: self.on_progress(min(sent[0], total), total, rate.add(sent[0]))
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        # adb shell (not exec-in, which returns no device output) so tar's exit status comes back
+        out = self.adb.shell_in(f'{extract} 2>&1; echo "{STATUS_MARKER} $?"', _Source(),
+                                on_chunk=on_chunk, chunk_size=CHUNK)
+        reader.close()  # unblocks the producer if the device side stopped reading
+        producer.join()
+        if self._stopped():
+            return TransferResult(False, total, time.time() - start, detail="Cancelled")
+        status = re.search(rf"{STATUS_MARKER} (\d+)", out)
+        if error or not status or status.group(1) != "0":
+            detail = out.replace(status.group(0), "").strip() if status else out
+            raise TransferError(f"Giải nén trên thiết bị lỗi: {detail or (error[0] if error else 'no exit status')}")
+        return TransferResult(True, total, time.time() - start, detail="tar" + (f"+{codec}" if codec else ""))
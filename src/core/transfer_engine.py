@@ -0,0 +1,260 @@
+# src/core/transfer_engine.py
+"""
+Transfer Engine - Resumable, verified large-file transfers over exec-out/exec-in dd
+Dữ liệu đi theo khối 1 MiB; offset đã ghi được lưu vào journal nên khi mất kết
+nối (ADB Wi-Fi) chỉ cần tiếp tục từ chỗ dừng. Kết quả được so checksum với máy.
+"""
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+BLOCK = 1024 * 1024           # dd block size; resume offsets are aligned to it
+JOURNAL_EVERY = 8 * BLOCK     # persist progress every 8 MiB
+MAX_RETRIES = 5
+JOURNAL_DIR = os.path.join(tempfile.gettempdir(), "xiaomi_adb_cache", "transfers")
+
+
+class TransferError(Exception):
+    pass
+
+
+@dataclass
+class TransferResult:
+    ok: bool
+    size: int = 0
+    seconds: float = 0.0
+    resumed_from: int = 0
+    verified: bool = False
+    detail: str = ""
+
+    @property
+    def rate(self) -> float:
+        moved = self.size - self.resumed_from
+        return moved / self.seconds if self.seconds > 0 else 0.0
+
+
+class _Rate:
+    """Bytes/s over a short sliding window"""
+
+    def __init__(self, window: float = 3.0):
+        self.window = window
+        self.samples = []
+
+    def add(self, done: int) -> float:
+        now = time.time()
+        self.samples.append((now, done))
+        while len(self.samples) > 2 and now - self.samples[0][0] > self.window:
+            self.samples.pop(0)
+        t0, d0 = self.samples[0]
+        return (done - d0) / (now - t0) if now > t0 else 0.0
+
+
+class TransferJournal:
+    """{'offset': n, 'size': n, 'mtime': n} for one (device, direction, remote, local) transfer"""
+
+    def __init__(self, device: str, direction: str, remote: str, local: str):
+        key = hashlib.sha1(f"{device}|{direction}|{remote}|{os.path.abspath(local)}".encode("utf-8")).hexdigest()
+        self.path = os.path.join(JOURNAL_DIR, f"{key}.json")
+
+    def load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def save(self, **data):
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def local_hash(path: str, algo: str) -> str:
+    h = hashlib.new(algo)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(BLOCK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TransferEngine:
+    """
+    pull(remote, local) / push(local, remote), both resumable.
+    on_progress(done_bytes, total_bytes, bytes_per_sec); should_stop() aborts (journal kept).
+    """
+
+    def __init__(self, adb_manager, on_progress: Optional[Callable] = None,
+                 should_stop: Optional[Callable] = None, verify: bool = True):
+        self.adb = adb_manager
+        self.on_progress = on_progress
+        self.should_stop = should_stop
+        self.verify = verify
+
+    # --- device helpers ---
+    def remote_stat(self, remote: str):
+        """(size, mtime) or (None, None) if missing"""
+        out = self.adb.exec_out([f"stat -c '%s %Y' {shlex.quote(remote)} 2>/dev/null"])
+        parts = out.decode("utf-8", errors="replace").split()
+        if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+            return int(parts[0]), int(parts[1])
+        return None, None
+
+    def remote_hash(self, remote: str):
+        """('sha256'|'md5', hex) computed on the device"""
+        q = shlex.quote(remote)
+        script = f"if command -v sha256sum >/dev/null 2>&1; then echo sha256 $(sha256sum {q}); else echo md5 $(md5sum {q}); fi"
+        out = "\n".join(self.adb.stream_script(script + "\n")).split()
+        if len(out) >= 2 and len(out[1]) in (32, 64):
+            return out[0], out[1].lower()
+        return None, None
+
+    def _verify(self, local: str, remote: str) -> bool:
+        algo, digest = self.remote_hash(remote)
+        if not digest:
+            raise TransferError("Không tính được checksum trên thiết bị")
+        return local_hash(local, algo) == digest
+
+    def _stopped(self) -> bool:
+        return bool(self.should_stop and self.should_stop())
+
+    # --- pull ---
+    def pull(self, remote: str, local: str) -> TransferResult:
+        size, mtime = self.remote_stat(remote)
+        if size is None:
+            raise TransferError(f"Không tìm thấy: {remote}")
+        part = local + ".part"
+        journal = TransferJournal(self.adb.current_device, "pull", remote, local)
+        state = journal.load()
+        offset = 0
+        if state.get("size") == size and state.get("mtime") == mtime and os.path.exists(part):
+            # Trust only what both the journal and the file on disk agree on, block aligned
+            offset = min(state.get("offset", 0), os.path.getsize(part)) // BLOCK * BLOCK
+        resumed_from = offset
+        start = time.time()
+        rate = _Rate()
+
+        retries = 0
+        with open(part, "r+b" if offset and os.path.exists(part) else "wb") as f:
+            f.truncate(offset)
+            while offset < size:
+                if self._stopped():
+                    journal.save(offset=offset, size=size, mtime=mtime)
+                    return TransferResult(False, size, time.time() - start, resumed_from, detail="Cancelled")
+                f.seek(offset)
+                # One command string (adb escapes extra args); stderr kept out of the binary stream
+                proc = self.adb.popen(["exec-out", f"dd if={shlex.quote(remote)} bs={BLOCK} skip={offset // BLOCK} 2>/dev/null"],
+                                      stderr=subprocess.DEVNULL)
+                last_saved = offset
+                try:
+                    while offset < size:
+                        chunk = proc.stdout.read(min(BLOCK, size - offset))
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        offset += len(chunk)
+                        if offset - last_saved >= JOURNAL_EVERY:
+                            f.flush()
+                            journal.save(offset=offset, size=size, mtime=mtime)
+                            last_saved = offset
+                        if self.on_progress: self.on_progress(offset, size, rate.add(offset))
+                        if self._stopped():
+                            break
+                finally:
+                    if proc.poll() is None:
+                        proc.kill()
+                    proc.wait()
+                f.flush()
+                journal.save(offset=offset, size=size, mtime=mtime)
+                if offset < size and not self._stopped():
+                    # Link dropped mid-stream: resume from the last aligned block
+                    retries += 1
+                    if retries > MAX_RETRIES:
+                        raise TransferError(f"Mất kết nối khi tải {remote} ({offset}/{size} bytes, có thể tiếp tục)")
+                    offset = offset // BLOCK * BLOCK
+                    f.truncate(offset)
+                    time.sleep(min(2 ** retries, 10))
+                    self.adb.check_connection()
+
+        verified = False
+        if self.verify:
+            if not self._verify(part, remote):
+                journal.clear()
+                os.remove(part)
+                raise TransferError(f"Checksum không khớp: {remote}")
+            verified = True
+        os.replace(part, local)
+        journal.clear()
+        return TransferResult(True, size, time.time() - start, resumed_from, verified)
+
+    # --- push ---
+    def push(self, local: str, remote: str) -> TransferResult:
+        size = os.path.getsize(local)
+        mtime = int(os.path.getmtime(local))
+        part = remote + ".part"
+        journal = TransferJournal(self.adb.current_device, "push", remote, local)
+        state = journal.load()
+        offset = 0
+        if state.get("size") == size and state.get("mtime") == mtime:
+            remote_size, _ = self.remote_stat(part)
+            offset = min(state.get("offset", 0), remote_size or 0) // BLOCK * BLOCK
+        resumed_from = offset
+        start = time.time()
+        rate = _Rate()
+
+        class _Source:
+            """Local file reader that ends the stream early when cancelled"""
+            def __init__(src, f): src.f = f
+            def read(src, n): return b"" if self._stopped() else src.f.read(n)
+
+        def on_chunk(n):
+            sent[0] += n
+            if self.on_progress: self.on_progress(sent[0], size, rate.add(sent[0]))
+
+        retries = 0
+        with open(local, "rb") as f:
+            while True:
+                journal.save(offset=offset, size=size, mtime=mtime)
+                if self._stopped():
+                    return TransferResult(False, size, time.time() - start, resumed_from, detail="Cancelled")
+                f.seek(offset)
+                sent = [offset]
+                cmd = f"dd of={shlex.quote(part)} bs={BLOCK} seek={offset // BLOCK}"
+                if offset: cmd += " conv=notrunc"
+                self.adb.exec_in([f"{cmd} 2>/dev/null"], _Source(f), size=size - offset,
+                                 on_chunk=on_chunk, chunk_size=BLOCK)
+                # The device is the source of truth for how much actually landed
+                remote_size = self.remote_stat(part)[0] or 0
+                if remote_size == size:
+                    break
+                offset = remote_size // BLOCK * BLOCK if remote_size < size else 0
+                if self._stopped():
+                    continue
+                retries += 1
+                if retries > MAX_RETRIES:
+                    journal.save(offset=offset, size=size, mtime=mtime)
+                    raise TransferError(f"Mất kết nối khi gửi {local} ({offset}/{size} bytes, có thể tiếp tục)")
+                time.sleep(min(2 ** retries, 10))
+                self.adb.check_connection()
+
+        verified = False
+        if self.verify:
+            if not self._verify(local, part):
+                journal.clear()
+                self.adb.exec_out([f"rm -f {shlex.quote(part)}"])
+                raise TransferError(f"Checksum không khớp: {remote}")
+            verified = True
+        self.adb.exec_out([f"mv -f {shlex.quote(part)} {shlex.quote(remote)}"])
+        journal.clear()
+        return TransferResult(True, size, time.time() - start, resumed_from, verified)
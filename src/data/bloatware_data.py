@@ -34,7 +34,6 @@ BLOATWARE_DICT = {
         "com.xiaomi.midrop", 
         "com.miui.virtualsim",
         "com.xiaomi.payment",
-        "com.miui.micloudsync",
     ],
     "Partner Apps & Facebook 👎": [
         "com.facebook.appmanager",
@@ -47,3 +46,34 @@ BLOATWARE_DICT = {
         "com.duokan.phone.remotecontroller",
     ]
 }
+
+# Ad/analytics services turned off by OptimizationManager.disable_miui_ads
+ADS_PACKAGES = [
+    "com.miui.msa.global",
+    "com.miui.analytics",
+    "com.miui.systemadsolution",
+    "com.xiaomi.joyose",
+    "com.google.android.gms.location.history",
+]
+
+# Extra bloat preinstalled only on some devices (key: ro.product.device -> {category: [packages]}).
+# Only add lists verified against a real package dump of that device.
+MODEL_BLOATWARE = {}
+
+
+def get_bloatware(device: str = "") -> dict:
+    """
+    Bloat database for a device: BLOATWARE_DICT merged with MODEL_BLOATWARE,
+    deduplicated (a package only appears once, in its first category).
+    """
+    merged = {}
+    seen = set()
+    sources = [BLOATWARE_DICT, MODEL_BLOATWARE.get(device or "", {})]
+    for source in sources:
+        for category, packages in source.items():
+            bucket = merged.setdefault(category, [])
+            for pkg in packages:
+                if pkg not in seen:
+                    seen.add(pkg)
+                    bucket.append(pkg)
+    return merged
@@ -9,3 +9,11 @@ class FileEntry:
     size: str = ""
     date: str = ""
     permissions: str = ""
+    size_bytes: int = 0     # Numeric size (sorting, totals)
+    mtime: int = 0          # Epoch seconds
+    mode: int = 0           # Raw st_mode
+    link_target: str = ""   # Symlink target, "" if not a link
+
+    @property
+    def is_link(self) -> bool:
+        return bool(self.link_target)
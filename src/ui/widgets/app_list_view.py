@@ -0,0 +1,283 @@
+# src/ui/widgets/app_list_view.py
+"""
+App List View - Model/Delegate based app list
+Chỉ vẽ các dòng đang hiển thị: số widget không đổi dù có bao nhiêu package.
+"""
+import re
+from typing import List, Optional
+
+from PySide6.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView, QFrame
+from PySide6.QtCore import (
+    Qt, Signal, QAbstractListModel, QSortFilterProxyModel, QModelIndex, QRect, QRectF, QSize, QEvent
+)
+from PySide6.QtGui import QColor, QFont, QPainter, QPainterPath, QPen
+
+from src.ui.theme_manager import ThemeManager
+from src.data.app_data import AppInfo
+from src.core.app_search_index import AppSearchIndex, MODE_ALL
+
+APP_ROLE = Qt.UserRole + 1
+
+ICON_COLORS = ["#3498DB", "#E67E22", "#E74C3C", "#2ECC71", "#9B59B6", "#F1C40F"]
+
+
+def css_color(value: str) -> QColor:
+    """Convert theme color strings ('#RRGGBB' or 'rgba(r, g, b, a)') to QColor"""
+    match = re.match(r"rgba?\(([^)]*)\)", value.strip())
+    if not match:
+        return QColor(value)
+    parts = [p.strip() for p in match.group(1).split(',')]
+    r, g, b = (int(float(p)) for p in parts[:3])
+    alpha = float(parts[3]) if len(parts) > 3 else 1.0
+    return QColor(r, g, b, int(alpha * 255))
+
+
+class AppListModel(QAbstractListModel):
+    """Flat model holding AppInfo objects (no widgets per app)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._apps: List[AppInfo] = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._apps)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._apps):
+            return None
+        app = self._apps[index.row()]
+        if role == Qt.DisplayRole:
+            return app.name if app.name and app.name.strip() else app.package
+        if role == Qt.ToolTipRole:
+            return app.package
+        if role == APP_ROLE:
+            return app
+        return None
+
+    def set_apps(self, apps: List[AppInfo]):
+        self.beginResetModel()
+        self._apps = list(apps)
+        self.endResetModel()
+
+    def apps(self) -> List[AppInfo]:
+        return self._apps
+
+    def app_at(self, row: int) -> Optional[AppInfo]:
+        return self._apps[row] if 0 <= row < len(self._apps) else None
+
+    def update_app(self, app: AppInfo):
+        """Notify views that an app's state changed (repaint its row only)"""
+        try:
+            row = self._apps.index(app)
+        except ValueError:
+            return
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx)
+
+    def remove_app(self, app: AppInfo):
+        try:
+            row = self._apps.index(app)
+        except ValueError:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._apps.pop(row)
+        self.endRemoveRows()
+
+
+class AppFilterProxyModel(QSortFilterProxyModel):
+    """
+    Filter by search text and tab (1: all, 2: system, 3: user, 4: disabled).
+    Matching is answered by AppSearchIndex as one bitset per filter change.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._query = ""
+        self._mode = MODE_ALL
+        self._index = AppSearchIndex()
+        self._mask = 0
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelReset.connect(self.rebuild_index)
+        model.rowsRemoved.connect(self.rebuild_index)
+        self.rebuild_index()
+
+    def rebuild_index(self, *args):
+        self._index.build(self.sourceModel().apps())
+        self._apply()
+
+    def set_filter(self, query: str, mode: int):
+        query = query.strip().lower()
+        if query == self._query and mode == self._mode:
+            return
+        self._query = query
+        self._mode = mode
+        self._apply()
+
+    def app_state_changed(self, app: AppInfo):
+        """Update tab bitsets for an app toggled in place, then refilter"""
+        apps = self.sourceModel().apps()
+        if app in apps:
+            self._index.update_state(apps.index(app), app)
+        self._apply()
+
+    def _apply(self):
+        self._mask = self._index.search(self._query, self._mode)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return bool((self._mask >> source_row) & 1)
+
+
+class AppItemDelegate(QStyledItemDelegate):
+    """Paints one app row (icon, name, package, badges, action button)"""
+    action_triggered = Signal(str, object)  # action, AppInfo
+
+    ROW_HEIGHT = 85
+    ROW_SPACING = 12
+    MARGIN_H = 20
+    SPACING = 16
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT + self.ROW_SPACING)
+
+    # --- Geometry ---
+    def _card_rect(self, option) -> QRect:
+        r = option.rect
+        return QRect(r.x(), r.y() + self.ROW_SPACING // 2, r.width() - 1, self.ROW_HEIGHT)
+
+    def _button_rect(self, card: QRect) -> QRect:
+        return QRect(card.right() - self.MARGIN_H - 80, card.center().y() - 17, 80, 34)
+
+    @staticmethod
+    def _action_for(app: AppInfo):
+        """Return (label, action, color) like the old row buttons"""
+        if not app.is_enabled:
+            return "Khôi phục", "enable", "#2ecc71"
+        if app.is_system:
+            # System apps: "Xóa" - disable then uninstall via cascade
+            return "Xóa", "disable", "#e74c3c"
+        # User apps: "Gỡ" - cascade starting with uninstall
+        return "Gỡ", "disable", "#e74c3c"
+
+    # --- Painting ---
+    def paint(self, painter: QPainter, option, index):
+        app: AppInfo = index.data(APP_ROLE)
+        if app is None:
+            return
+        theme = ThemeManager.get_theme()
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        card = self._card_rect(option)
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        selected = bool(option.state & QStyle.State_Selected)
+
+        # Card background
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(card), 18, 18)
+        painter.fillPath(path, css_color(theme['COLOR_GLASS_HOVER' if hovered else 'COLOR_GLASS_WHITE']))
+        border = ThemeManager.COLOR_ACCENT if selected else theme['COLOR_BORDER' if hovered else 'COLOR_BORDER_LIGHT']
+        painter.setPen(QPen(css_color(border), 1))
+        painter.drawPath(path)
+
+        x = card.x() + self.MARGIN_H
+        cy = card.center().y()
+
+        # 1. Icon (initial letter)
+        icon_rect = QRect(x, cy - 24, 48, 48)
+        icon_path = QPainterPath()
+        icon_path.addRoundedRect(QRectF(icon_rect), 16, 16)
+        painter.fillPath(icon_path, QColor(ICON_COLORS[abs(hash(app.package)) % 6]))
+        font = QFont(option.font)
+        font.setPixelSize(20)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(QColor("white"))
+        painter.drawText(icon_rect, Qt.AlignCenter, app.name[0].upper() if app.name else "?")
+        x = icon_rect.right() + self.SPACING
+
+        # 4. Action button (right aligned)
+        btn_label, _, btn_color = self._action_for(app)
+        btn_rect = self._button_rect(card)
+        btn_path = QPainterPath()
+        btn_path.addRoundedRect(QRectF(btn_rect), 10, 10)
+        painter.fillPath(btn_path, QColor(btn_color))
+        font.setPixelSize(11)
+        painter.setFont(font)
+        painter.setPen(QColor("white"))
+        painter.drawText(btn_rect, Qt.AlignCenter, btn_label)
+
+        # 3. Badges
+        if app.is_enabled:
+            status_text, status_color = "ĐANG CHẠY", "#2ecc71"
+        else:
+            status_text, status_color = "ĐÃ TẮT", "#e74c3c"
+        status_rect = QRect(btn_rect.x() - 10 - 75, cy - 13, 75, 26)
+        self._draw_badge(painter, font, status_rect, status_text, status_color)
+
+        type_text = "HỆ THỐNG" if app.is_system else "NGƯỜI DÙNG"
+        type_color = "#f39c12" if app.is_system else "#3498db"
+        type_rect = QRect(status_rect.x() - self.SPACING - 65, cy - 13, 65, 26)
+        self._draw_badge(painter, font, type_rect, type_text, type_color)
+
+        # 2. Info (name + package)
+        text_width = max(0, type_rect.x() - self.SPACING - x)
+        disp_name = app.name if app.name and app.name.strip() else app.package
+        name_font = QFont(option.font)
+        name_font.setPixelSize(15)
+        name_font.setBold(True)
+        name_font.setStrikeOut(not app.is_enabled)
+        painter.setFont(name_font)
+        painter.setPen(css_color(theme['COLOR_TEXT_PRIMARY' if app.is_enabled else 'COLOR_TEXT_SECONDARY']))
+        name_rect = QRect(x, cy - 21, text_width, 22)
+        painter.drawText(name_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         painter.fontMetrics().elidedText(disp_name, Qt.ElideRight, text_width))
+
+        pkg_font = QFont("Consolas")
+        pkg_font.setPixelSize(12)
+        painter.setFont(pkg_font)
+        painter.setPen(css_color(theme['COLOR_TEXT_SECONDARY']))
+        pkg_rect = QRect(x, cy + 2, text_width, 18)
+        painter.drawText(pkg_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         painter.fontMetrics().elidedText(app.package, Qt.ElideMiddle, text_width))
+
+        painter.restore()
+
+    @staticmethod
+    def _draw_badge(painter, font, rect, text, color):
+        bg = QColor(color)
+        bg.setAlpha(0x20)
+        badge_path = QPainterPath()
+        badge_path.addRoundedRect(QRectF(rect), 10, 10)
+        painter.fillPath(badge_path, bg)
+        font.setPixelSize(10)
+        painter.setFont(font)
+        painter.setPen(QColor(color))
+        painter.drawText(rect, Qt.AlignCenter, text)
+
+    # --- Interaction ---
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            if self._button_rect(self._card_rect(option)).contains(event.position().toPoint()):
+                app = index.data(APP_ROLE)
+                if app is not None:
+                    _, action, _ = self._action_for(app)
+                    self.action_triggered.emit(action, app)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+
+class AppListView(QListView):
+    """QListView preconfigured for the app list (uniform rows, lazy painting)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setUniformItemSizes(True)
+        self.setMouseTracking(True)
+        self.setFrameShape(QFrame.NoFrame)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setStyleSheet("QListView { background: transparent; border: none; outline: none; }")
@@ -4,19 +4,19 @@ from typing import List
 
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, 
-    QMessageBox, QFrame, QButtonGroup, QScrollArea, QCheckBox, QDialog,
+    QMessageBox, QFrame, QButtonGroup, QCheckBox, QDialog,
     QApplication, QGraphicsDropShadowEffect, QProgressBar, QProgressDialog,
     QFileDialog
 )
-from PySide6.QtCore import Qt, QTimer, Signal, QSize, QPoint
+from PySide6.QtCore import Qt, QTimer, QSize, QPoint
 from PySide6.QtGui import QIcon, QColor, QFont, QPainter, QPainterPath
 
 from src.ui.theme_manager import ThemeManager
-from src.ui.performance_utils import widget_cache, BatchProcessor, debounce
+from src.ui.widgets.app_list_view import AppListModel, AppFilterProxyModel, AppItemDelegate, AppListView
 from src.core.adb.adb_manager import DeviceStatus
 from src.data.app_data import AppInfo
 from src.workers.app_worker import (
-    InstallerThread, BackupThread, AppScanner, SmartAppActionThread
+    InstallerThread, BackupThread, AppScanner, SmartAppActionThread, RestoreThread
 )
 from src.core.log_manager import LogManager
 
@@ -197,153 +197,23 @@ class BackupOptionsDialog(SoftDialog):
         self.set_content(layout)
 
 # ===========================
-# ROW & WIDGET
+# WIDGET
 # ===========================
-class ModernAppRow(QFrame):
-    action_triggered = Signal(str, object) 
-
-    def __init__(self, app: AppInfo, parent=None):
-        super().__init__(parent)
-        self.app = app
-        self.setFixedHeight(85)
-        self.setObjectName("ModernAppRow")
-        self.setStyleSheet(f"""
-            #ModernAppRow {{
-                background-color: {ThemeManager.COLOR_GLASS_WHITE};
-                border-radius: 18px; /* Softer */
-                border: 1px solid {ThemeManager.COLOR_BORDER_LIGHT};
-            }}
-            #ModernAppRow:hover {{
-                background-color: {ThemeManager.COLOR_GLASS_HOVER};
-                border: 1px solid {ThemeManager.COLOR_BORDER};
-            }}
-            QLabel {{
-                border: none;
-                background: transparent;
-            }}
-        """)
-        self.setup_ui()
-        
-    def setup_ui(self):
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(20, 12, 20, 12)
-        layout.setSpacing(16)
-        
-        # 1. Icon
-        icon_lbl = QLabel(self.app.name[0].upper() if self.app.name else "?")
-        icon_lbl.setAlignment(Qt.AlignCenter)
-        icon_lbl.setFixedSize(48, 48)
-        color_idx = abs(hash(self.app.package)) % 6
-        colors = ["#3498DB", "#E67E22", "#E74C3C", "#2ECC71", "#9B59B6", "#F1C40F"]
-        icon_lbl.setStyleSheet(f"""
-            background-color: {colors[color_idx]};
-            color: white;
-            border-radius: 16px; /* Softer */
-            font-size: 20px;
-            font-weight: bold;
-            border: none;
-        """)
-        layout.addWidget(icon_lbl)
-        
-        # 2. Info
-        info_layout = QVBoxLayout()
-        info_layout.setSpacing(2)
-        info_layout.setAlignment(Qt.AlignVCenter)
-        
-        disp_name = self.app.name if self.app.name and self.app.name.strip() else self.app.package
-        name_lbl = QLabel(disp_name)
-        name_lbl.setStyleSheet(f"font-weight: 700; font-size: 15px; color: {ThemeManager.COLOR_TEXT_PRIMARY}; background: transparent; border: none;")
-        
-        pkg_lbl = QLabel(self.app.package)
-        pkg_lbl.setStyleSheet(f"color: {ThemeManager.COLOR_TEXT_SECONDARY}; font-size: 12px; font-family: Consolas; background: transparent; border: none;")
-        
-        info_layout.addWidget(name_lbl)
-        info_layout.addWidget(pkg_lbl)
-        layout.addLayout(info_layout, 1)
-        
-        # 3. Badges
-        type_text = "HỆ THỐNG" if self.app.is_system else "NGƯỜI DÙNG"
-        type_bg = "#f39c12" if self.app.is_system else "#3498db"
-        
-        badge_type = QLabel(type_text)
-        badge_type.setFixedSize(65, 26)
-        badge_type.setAlignment(Qt.AlignCenter)
-        badge_type.setStyleSheet(f"""
-            background-color: {type_bg}20; color: {type_bg}; border-radius: 10px; font-size: 10px; font-weight: bold; border: none;
-        """)
-        layout.addWidget(badge_type)
-        
-        # Status
-        if self.app.is_enabled:
-            status_text = "ĐANG CHẠY"
-            status_color = "#2ecc71"
-        else:
-            status_text = "ĐÃ TẮT"
-            status_color = "#e74c3c"
-            name_lbl.setStyleSheet(f"font-weight: bold; font-size: 15px; color: {ThemeManager.COLOR_TEXT_SECONDARY}; text-decoration: line-through; background: transparent; border: none;")
-            
-        badge_status = QLabel(status_text)
-        badge_status.setFixedSize(75, 26)
-        badge_status.setAlignment(Qt.AlignCenter)
-        badge_status.setStyleSheet(f"""
-            background-color: {status_color}20; color: {status_color}; border-radius: 10px; font-size: 10px; font-weight: bold; border: none;
-        """)
-        layout.addWidget(badge_status)
-        
-        # 4. Actions
-        actions_layout = QHBoxLayout()
-        actions_layout.setSpacing(10)
-        
-        if not self.app.is_enabled:
-            # Disabled/Removed apps: Show Restore button
-            btn_enable = self.create_action_btn("Khôi phục", "#2ecc71")
-            btn_enable.clicked.connect(lambda: (print(f"DEBUG: Enable button clicked for {self.app.package}"), self.action_triggered.emit("enable", self.app)))
-            actions_layout.addWidget(btn_enable)
-        else:
-            # Enabled apps: Show single action button
-            if self.app.is_system:
-                # System apps: "Xóa" (Remove) - will try disable then uninstall via cascade
-                btn_remove = self.create_action_btn("Xóa", "#e74c3c")
-                btn_remove.clicked.connect(lambda: (print(f"DEBUG: Remove button clicked for {self.app.package}"), self.action_triggered.emit("disable", self.app)))
-                actions_layout.addWidget(btn_remove)
-            else:
-                # User apps: "Gỡ" (Uninstall) - will uninstall directly
-                btn_uninstall = self.create_action_btn("Gỡ", "#e74c3c")
-                btn_uninstall.clicked.connect(lambda: (print(f"DEBUG: Uninstall button clicked for {self.app.package}"), self.action_triggered.emit("disable", self.app)))  # Use disable mode for cascade
-                actions_layout.addWidget(btn_uninstall)
-                
-        layout.addLayout(actions_layout)
-
-    def create_action_btn(self, text, color):
-        btn = QPushButton(text)
-        btn.setFixedSize(80, 34)
-        btn.setCursor(Qt.PointingHandCursor)
-        btn.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {color};
-                color: white;
-                border: none;
-                border-radius: 10px; /* Softer */
-                font-weight: bold;
-                font-size: 11px;
-            }}
-            QPushButton:hover {{ opacity: 0.9; }}
-        """)
-        return btn
-
 class AppManagerWidget(QWidget):
     def __init__(self, adb_manager):
         super().__init__()
         self.adb = adb_manager
         self.apps_all: List[AppInfo] = []
         
-        # Optimized: Tăng debounce delay từ 300ms lên 500ms
+        # Debounce ngắn: lọc qua AppSearchIndex gần như tức thì
         self.search_timer = QTimer()
         self.search_timer.setSingleShot(True)
         self.search_timer.timeout.connect(self.filter_apps)
         
-        # Optimized: Batch processor cho rendering
-        self.batch_processor = BatchProcessor(batch_size=30)
+        # Model/View: chỉ vẽ các dòng đang hiển thị
+        self.app_model = AppListModel(self)
+        self.proxy_model = AppFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.app_model)
         
         self.setup_ui()
         QTimer.singleShot(500, self.refresh_data)
@@ -368,7 +238,7 @@ class AppManagerWidget(QWidget):
             }}
             QLineEdit:focus {{ border: 2px solid {ThemeManager.COLOR_ACCENT}; }}
         """)
-        self.search_input.textChanged.connect(lambda: self.search_timer.start(500))  # Increased from 300ms to 500ms
+        self.search_input.textChanged.connect(lambda: self.search_timer.start(120))
         
         btn_refresh = QPushButton("🔄")
         btn_refresh.setFixedSize(50, 50)
@@ -451,19 +321,13 @@ class AppManagerWidget(QWidget):
         pill_layout.addWidget(self.lbl_stats)
         main.addLayout(pill_layout)
         
-        # List
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setFrameShape(QFrame.NoFrame)
-        self.scroll.setStyleSheet("background: transparent;")
-        
-        self.list_container = QWidget()
-        self.list_layout = QVBoxLayout(self.list_container)
-        self.list_layout.setAlignment(Qt.AlignTop)
-        self.list_layout.setSpacing(12)
-        
-        self.scroll.setWidget(self.list_container)
-        main.addWidget(self.scroll)
+        # List (virtualized: one view + delegate, no widget per app)
+        self.list_view = AppListView()
+        self.list_view.setModel(self.proxy_model)
+        self.delegate = AppItemDelegate(self.list_view)
+        self.delegate.action_triggered.connect(self.handle_row_action)
+        self.list_view.setItemDelegate(self.delegate)
+        main.addWidget(self.list_view)
 
     def refresh_data(self):
         if not self.adb.is_online():
@@ -487,71 +351,21 @@ class AppManagerWidget(QWidget):
 
     def on_scan_done(self, apps):
         self.apps_all = apps
+        self.app_model.set_apps(apps)
         self.filter_apps()
 
     def clear_list(self):
-        # IMPORTANT: Clear cache because we are destroying the widgets
-        # If we don't, render_app_row will try to reuse deleted widgets
-        widget_cache.clear()
-        
-        while self.list_layout.count():
-            item = self.list_layout.takeAt(0)
-            if item.widget(): 
-                item.widget().deleteLater()
+        self.app_model.set_apps([])
 
     def filter_apps(self):
-        """Filter and display apps (optimized with batch rendering)"""
-        # Note: clear_list() is called at the start of filter_apps in the original code? 
-        # Yes, line 462 calls self.clear_list().
-        # So we just improved clear_list to wipe the cache.
-        
-        self.clear_list()
-        query = self.search_input.text().strip().lower()
+        """Filter apps through the proxy model (no widgets are rebuilt)"""
+        query = self.search_input.text()
         mode = self.tab_group.checkedId()
-        
-        filtered = []
-        for app in self.apps_all:
-            # Safe logic for filtering
-            if query:
-                name_match = app.name and query in app.name.lower()
-                pkg_match = query in app.package.lower()
-                if not (name_match or pkg_match): continue
-                
-            if mode == 2 and not app.is_system: continue
-            if mode == 3 and app.is_system: continue
-            if mode == 4 and app.is_enabled: continue
-            filtered.append(app)
-        
-        # Optimized: Batch render apps để tránh UI freeze với danh sách lớn
-        def render_app_row(app):
-            # Check cache first
-            cache_key = f"app_row_{app.package}"
-            row = widget_cache.get(cache_key)
-            
-            if row is None:
-                row = ModernAppRow(app)
-                row.action_triggered.connect(self.handle_row_action)
-                widget_cache.put(cache_key, row)
-            
-            self.list_layout.addWidget(row)
-        
-        # Render first 30 immediately, rest in batches
-        if len(filtered) <= 30:
-            for app in filtered:
-                render_app_row(app)
-        else:
-            # Render first batch immediately
-            for app in filtered[:30]:
-                render_app_row(app)
-            
-            # Rest in background batches
-            self.batch_processor.process(
-                filtered[30:],
-                render_app_row,
-                lambda: self.lbl_stats.setText(f"Hiển thị {len(filtered)}/{len(self.apps_all)}")
-            )
-            
-        self.lbl_stats.setText(f"Hiển thị {len(filtered)}/{len(self.apps_all)}")
+        self.proxy_model.set_filter(query, mode)
+        self.update_stats()
+
+    def update_stats(self):
+        self.lbl_stats.setText(f"Hiển thị {self.proxy_model.rowCount()}/{len(self.apps_all)}")
 
     def handle_row_action(self, action, app: AppInfo):
         print(f"DEBUG: handle_row_action called. Action={action}, App={app.package}")
@@ -569,9 +383,48 @@ class AppManagerWidget(QWidget):
                 print("DEBUG: User cancelled")
                 return
 
+        if action == "enable":
+            # "Khôi phục" with several phones attached: offer the same restore on all of them
+            serials = [s for s, st in self.adb.get_devices() if st == DeviceStatus.ONLINE]
+            if len(serials) > 1:
+                choice = QMessageBox.question(
+                    self, "Khôi phục",
+                    f"Khôi phục {app.name} trên tất cả {len(serials)} thiết bị đang kết nối?\n"
+                    "Chọn 'No' để chỉ khôi phục trên thiết bị hiện tại.",
+                    QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+                )
+                if choice == QMessageBox.Cancel:
+                    return
+                if choice == QMessageBox.Yes:
+                    self.restore_on_devices([app.package], serials)
+                    return
+
         print(f"DEBUG: About to call execute_action")
         self.execute_action(app, action)
 
+    def restore_on_devices(self, packages: List[str], serials: List[str]):
+        """install-existing + unsuspend + enable on every serial concurrently"""
+        self.restore_pd = QProgressDialog("Đang khôi phục...", "Hủy", 0, 0, self)
+        self.restore_pd.setWindowTitle("Khôi phục trên nhiều thiết bị")
+        self.restore_pd.setWindowModality(Qt.WindowModal)
+        self.restore_pd.show()
+
+        self.restorer = RestoreThread(self.adb, packages, devices=serials)
+        self.restorer.progress.connect(self.restore_pd.setLabelText)
+        self.restore_pd.canceled.connect(self.restorer.stop)
+        self.restorer.finished.connect(self.on_restore_finished)
+        self.restorer.start()
+
+    def on_restore_finished(self, success, msg):
+        self.restore_pd.close()
+        if success:
+            LogManager.log("App Manager", "✓ Khôi phục thành công trên mọi thiết bị", "success")
+            QMessageBox.information(self, "Thành công", msg)
+        else:
+            LogManager.log("App Manager", f"✗ Khôi phục chưa hoàn tất: {msg}", "error")
+            QMessageBox.warning(self, "Thất bại", msg)
+        self.refresh_data()
+
     def execute_action(self, app: AppInfo, action):
         print(f"DEBUG: execute_action {action} on {app.package}")
         # Progress Feedback
@@ -619,7 +472,11 @@ class AppManagerWidget(QWidget):
                 elif action == "enable": app.is_enabled = True
                 elif action == "uninstall" and app in self.apps_all: self.apps_all.remove(app)
                 
-                self.filter_apps()
+                if action == "uninstall": self.app_model.remove_app(app)
+                else:
+                    self.app_model.update_app(app)
+                    self.proxy_model.app_state_changed(app)
+                self.update_stats()
             else:
                 # Only show error if truly failed (no success at all)
                 LogManager.log("App Manager", f"✗ Không thể xử lý {app.name}: {msg}", "error")
@@ -636,13 +493,24 @@ class AppManagerWidget(QWidget):
             QMessageBox.warning(self, "Lỗi", "Thiết bị mất kết nối!")
             return
             
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Chọn file APK", "", "Android Package (*.apk)"
+        files, _ = QFileDialog.getOpenFileNames(
+            self, "Chọn file APK", "", "Android Package (*.apk *.apks *.xapk)"
         )
         
-        if not file_path:
+        if not files:
             return
             
+        # Several .apk files: either the splits of one app or separate apps
+        apks = [f for f in files if f.lower().endswith(".apk")]
+        is_split = False
+        if len(apks) > 1 and len(apks) == len(files):
+            is_split = QMessageBox.question(
+                self, "Cài đặt nhiều APK",
+                f"Đã chọn {len(apks)} file APK.\n\nĐây là các phần (split APK) của CÙNG một ứng dụng?\n"
+                "Chọn 'No' để cài từng ứng dụng riêng biệt.",
+                QMessageBox.Yes | QMessageBox.No
+            ) == QMessageBox.Yes
+            
         # Progress Dialog
         self.install_pd = QProgressDialog("Đang cài đặt APK...", "Hủy", 0, 0, self)
         self.install_pd.setWindowTitle("Cài đặt")
@@ -650,7 +518,7 @@ class AppManagerWidget(QWidget):
         self.install_pd.show()
         
         # Start Installer Thread
-        self.installer = InstallerThread(self.adb, [file_path])
+        self.installer = InstallerThread(self.adb, files, is_split=is_split)
         self.installer.progress.connect(self.install_pd.setLabelText)
         self.installer.finished.connect(self.on_install_finished)
         self.installer.start()
@@ -7,18 +7,43 @@ from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTreeWidget, QTreeWidgetItem,
     QLabel, QPushButton, QLineEdit, QMenu, QMessageBox, QFileDialog,
     QProgressDialog, QHeaderView, QFrame, QSplitter, QListWidget, QListWidgetItem,
-    QAbstractItemView, QStyle, QApplication, QStackedWidget, QScrollArea, QDialog,
+    QAbstractItemView, QStyle, QStackedWidget, QScrollArea, QDialog,
     QProgressBar, QGridLayout, QToolButton
 )
 from PySide6.QtCore import Qt, Signal, QSize, QTimer, QMimeData, QPoint
-from PySide6.QtGui import QIcon, QAction, QColor, QFont, QPixmap, QCursor, QDrag, QPainter, QBrush, QPen
+from PySide6.QtGui import QIcon, QAction, QColor, QFont, QPixmap, QCursor, QDrag, QPainter, QBrush, QPen, QImageReader
 import os
 import tempfile
 import math
 from src.ui.theme_manager import ThemeManager
-from src.workers.file_worker import FileWorker
+from src.workers.file_worker import FileWorker, FolderSizeWorker
+from src.core.file_index import FileIndex
+from src.core.media_store import MediaStoreSource
+from src.core.storage_tree import StorageTree
+from src.ui.widgets.storage_analyzer import StorageAnalyzerDialog
+from src.workers.media_worker import GalleryWorker
+from src.workers.storage_worker import IndexWorker, DuplicateWorker
+from src.workers.transfer_worker import TransferThread, UploadThread, SyncThread
+from src.workers.thumbnail_worker import ThumbnailService
+from src.workers.watch_worker import WatchWorker
+from src.core.stat_listing import format_size
+from src.core.listing_cache import norm_path
 from src.data.file_data import FileEntry
 
+SYNC_MODES = {
+    "Thiết bị → Máy tính": "pull",
+    "Máy tính → Thiết bị": "push",
+    "Hai chiều (bản mới hơn thắng)": "two_way",
+}
+WATCH_RECENT = 4     # recently visited folders kept live besides the open one
+GALLERY_PAGE = 200  # media items added to the grid per page
+GALLERY_SORTS = {
+    "Ngày chụp (mới nhất)": ("date", True),
+    "Ngày chụp (cũ nhất)": ("date", False),
+    "Kích thước (lớn nhất)": ("size", True),
+    "Tên": ("name", False),
+}
+
 # --- Helper Classes ---
 
 class GlassFrame(QFrame):
@@ -117,21 +142,162 @@ class ImagePreviewDialog(QDialog):
         scroll.setStyleSheet("border: none; background: transparent;")
         self.img_lbl = QLabel()
         self.img_lbl.setAlignment(Qt.AlignCenter)
-        pixmap = QPixmap(image_path)
+        # Decode straight to display size instead of full-resolution then scale
+        reader = QImageReader(image_path)
+        reader.setAutoTransform(True)
+        full = reader.size()
+        if full.isValid() and (full.width() > 1600 or full.height() > 1200):
+            reader.setScaledSize(full.scaled(QSize(1600, 1200), Qt.KeepAspectRatio))
+        pixmap = QPixmap.fromImage(reader.read())
         if not pixmap.isNull():
-            if pixmap.width() > 1600 or pixmap.height() > 1200:
-                 pixmap = pixmap.scaled(1600, 1200, Qt.KeepAspectRatio, Qt.SmoothTransformation)
             self.img_lbl.setPixmap(pixmap)
         else:
             self.img_lbl.setText("Không thể tải ảnh")
         scroll.setWidget(self.img_lbl)
         layout.addWidget(scroll)
 
+
+class LargestFoldersDialog(QDialog):
+    """Fills progressively from du results; double-click opens the folder"""
+    folder_chosen = Signal(str)
+
+    def __init__(self, size_worker, root, depth=3, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Thư mục lớn nhất: {root}")
+        self.resize(720, 520)
+        self.setStyleSheet(f"background-color: {ThemeManager.get_theme()['COLOR_BG_MAIN']}; color: {ThemeManager.COLOR_TEXT_PRIMARY};")
+        self.root = norm_path(root)
+        self.size_worker = size_worker
+        layout = QVBoxLayout(self)
+        self.status = QLabel("Đang tính dung lượng...")
+        layout.addWidget(self.status)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["THƯ MỤC", "KÍCH THƯỚC"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setColumnWidth(0, 540)
+        self.tree.itemDoubleClicked.connect(self.on_double_click)
+        layout.addWidget(self.tree)
+
+        size_worker.size_ready.connect(self.on_size)
+        size_worker.scan_finished.connect(self.on_finished)
+        size_worker.scan(root, depth)
+
+    def on_size(self, path, size):
+        if path == self.root: return
+        item = SizeTreeItem(self.tree)
+        item.setText(0, path)
+        item.setText(1, format_size(size))
+        item.setData(1, Qt.UserRole, size)
+        self.status.setText(f"Đang tính dung lượng... {self.tree.topLevelItemCount()} thư mục")
+
+    def on_finished(self, root):
+        if norm_path(root) != self.root: return
+        self.tree.sortItems(1, Qt.DescendingOrder)
+        self.status.setText(f"{self.tree.topLevelItemCount()} thư mục | {self.root}")
+
+    def on_double_click(self, item, col=0):
+        self.folder_chosen.emit(item.text(0))
+        self.accept()
+
+    def done(self, result):
+        self.size_worker.size_ready.disconnect(self.on_size)
+        self.size_worker.scan_finished.disconnect(self.on_finished)
+        super().done(result)
+
+class DuplicatesDialog(QDialog):
+    """Duplicate groups with reclaimable bytes; checked copies can be deleted"""
+    delete_requested = Signal(list)  # Remote paths
+    STAGES = {"scan": "Đang quét file", "partial": "Đang so sánh 64 KB đầu", "full": "Đang so sánh toàn bộ nội dung"}
+
+    def __init__(self, adb_manager, root, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"File trùng lặp: {root}")
+        self.resize(820, 560)
+        self.setStyleSheet(f"background-color: {ThemeManager.get_theme()['COLOR_BG_MAIN']}; color: {ThemeManager.COLOR_TEXT_PRIMARY};")
+        layout = QVBoxLayout(self)
+        self.status = QLabel("Đang quét...")
+        layout.addWidget(self.status)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["FILE", "KÍCH THƯỚC", "CÓ THỂ GIẢI PHÓNG"])
+        self.tree.setColumnWidth(0, 540)
+        layout.addWidget(self.tree)
+        buttons = QHBoxLayout()
+        self.btn_select = QPushButton("Chọn các bản sao (giữ bản đầu)")
+        self.btn_select.clicked.connect(self.select_copies)
+        self.btn_delete = QPushButton("🗑️ Xóa mục đã chọn")
+        self.btn_delete.clicked.connect(self.delete_checked)
+        buttons.addWidget(self.btn_select)
+        buttons.addStretch()
+        buttons.addWidget(self.btn_delete)
+        layout.addLayout(buttons)
+
+        self.worker = DuplicateWorker(adb_manager, root)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.finished.connect(self.on_finished)
+        self.worker.start()
+
+    def on_progress(self, stage, done, total):
+        label = self.STAGES.get(stage, stage)
+        self.status.setText(f"{label}... {done}/{total}" if total else f"{label}... {done}")
+
+    def on_finished(self, groups):
+        self.tree.setUpdatesEnabled(False)
+        for group in groups:
+            parent = QTreeWidgetItem(self.tree)
+            parent.setText(0, f"{len(group.paths)} bản giống nhau ({group.md5[:8]})")
+            parent.setText(1, format_size(group.size))
+            parent.setText(2, format_size(group.reclaimable))
+            for path in group.paths:
+                child = QTreeWidgetItem(parent)
+                child.setText(0, path)
+                child.setCheckState(0, Qt.Unchecked)
+            parent.setExpanded(True)
+        self.tree.setUpdatesEnabled(True)
+        total = sum(g.reclaimable for g in groups)
+        self.status.setText(f"{len(groups)} nhóm trùng lặp | có thể giải phóng {format_size(total)}")
+
+    def select_copies(self):
+        for i in range(self.tree.topLevelItemCount()):
+            parent = self.tree.topLevelItem(i)
+            for j in range(parent.childCount()):
+                parent.child(j).setCheckState(0, Qt.Checked if j else Qt.Unchecked)
+
+    def delete_checked(self):
+        paths, whole_group = [], False
+        for i in range(self.tree.topLevelItemCount()):
+            parent = self.tree.topLevelItem(i)
+            checked = [parent.child(j) for j in range(parent.childCount())
+                       if parent.child(j).checkState(0) == Qt.Checked]
+            whole_group |= len(checked) == parent.childCount()
+            paths.extend(item.text(0) for item in checked)
+        if not paths: return
+        warn = "\nCảnh báo: có nhóm bị chọn xóa tất cả các bản!" if whole_group else ""
+        if QMessageBox.question(self, "Xóa", f"Xóa {len(paths)} file?{warn}") != QMessageBox.Yes: return
+        self.delete_requested.emit(paths)
+        for i in reversed(range(self.tree.topLevelItemCount())):
+            parent = self.tree.topLevelItem(i)
+            for j in reversed(range(parent.childCount())):
+                if parent.child(j).checkState(0) == Qt.Checked: parent.removeChild(parent.child(j))
+            if parent.childCount() < 2: self.tree.takeTopLevelItem(i)
+
+    def done(self, result):
+        self.worker.stop()
+        super().done(result)
+
+class SizeTreeItem(QTreeWidgetItem):
+    def __lt__(self, other):
+        return (self.data(1, Qt.UserRole) or 0) < (other.data(1, Qt.UserRole) or 0)
+
 class DriveUsageWidget(QWidget):
-    """Bottom Sidebar Widget: Drive Usage"""
+    """Bottom Sidebar Widget: Drive Usage (click opens the storage analyzer)"""
+    analyze_requested = Signal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFixedHeight(70)
+        self.setCursor(Qt.PointingHandCursor)
+        self.setToolTip("Nhấn để phân tích dung lượng")
         self.setStyleSheet(f"""
             QWidget {{
                 background-color: {ThemeManager.get_theme()['COLOR_BG_SECONDARY']};
@@ -168,6 +334,11 @@ class DriveUsageWidget(QWidget):
         self.lbl_desc.setStyleSheet(f"font-size: 10px; color: {ThemeManager.get_theme()['COLOR_TEXT_SECONDARY']};")
         layout.addWidget(self.lbl_desc)
 
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.analyze_requested.emit()
+        super().mousePressEvent(event)
+
     def update_data(self, total_gb, used_gb):
         if total_gb <= 0: return
         
@@ -230,6 +401,25 @@ class ExplorerTree(QTreeWidget):
         else:
             super().dropEvent(event)
 
+class FileTreeItem(QTreeWidgetItem):
+    """Sorts by numeric size/mtime (not display text); folders stay on top"""
+    SORT_KEYS = {1: lambda e: e.mtime, 3: lambda e: e.size_bytes}
+
+    def sort_value(self, entry, col):
+        if col == 3 and entry.is_dir:
+            return self.data(3, Qt.UserRole) or 0  # folder size from du, once known
+        return self.SORT_KEYS.get(col, lambda e: e.name.lower())(entry)
+
+    def __lt__(self, other):
+        a, b = self.data(0, Qt.UserRole), other.data(0, Qt.UserRole)
+        if a is None or b is None:
+            return super().__lt__(other)
+        col = self.treeWidget().sortColumn() if self.treeWidget() else 0
+        ascending = not self.treeWidget() or self.treeWidget().header().sortIndicatorOrder() == Qt.AscendingOrder
+        if a.is_dir != b.is_dir:
+            return a.is_dir == ascending
+        return (self.sort_value(a, col), a.name.lower()) < (other.sort_value(b, col), b.name.lower())
+
 class ExplorerGrid(QListWidget):
     """Grid/Icon View"""
     files_dropped = Signal(list)
@@ -275,6 +465,7 @@ class FileManagerWidget(QWidget):
         self.current_path = self.internal_root
         self.history = []
         self.history_index = -1
+        self.visit_counts = {}  # path -> visits, ranks prefetch candidates
         self.cache_dir = os.path.join(tempfile.gettempdir(), "xiaomi_adb_cache")
         os.makedirs(self.cache_dir, exist_ok=True)
         self.view_mode = "list" # 'list' or 'grid'
@@ -282,18 +473,44 @@ class FileManagerWidget(QWidget):
         
         # Worker
         self.worker = FileWorker(self.adb)
+        self.size_worker = FolderSizeWorker(self.adb, self.worker.sizes)
+        self.file_index = None     # per-device SQLite index (offline search)
+        self.index_worker = None
+        self._index_refreshed = False
+        self.search_active = False
+        self._tree_items = {}  # path -> tree item, for late folder sizes
+        self._grid_items = {}  # path -> grid item, for async thumbnails
+        self._pending_preview = None
+        self.gallery = MediaStoreSource(self.adb)  # MediaStore table, queried once per device
+        self.gallery_worker = None
+        self.gallery_active = False
+        self.gallery_folder = ""
+        self.gallery_sort = ("date", True)
+        self.gallery_offset = 0
+        self.storage_tree = None   # per-device usage tree, cached on disk between sessions
+        self.watch_worker = None   # inotifyd stream for the open + recent folders
+        self.thumbs = ThumbnailService(self.adb, self.cache_dir)
+        self.thumb_timer = QTimer(self)
+        self.thumb_timer.setSingleShot(True)
+        self.thumb_timer.setInterval(150)
+        self.thumb_timer.timeout.connect(self.request_visible_thumbnails)
         self.setup_ui()
 
         # Connect Signals after UI creation
         self.worker.listing_ready.connect(self.on_listing_ready)
         self.worker.storages_ready.connect(self.on_storages_ready)
         self.worker.usage_ready.connect(self.usage_widget.update_data)
+        self.usage_widget.analyze_requested.connect(self.show_storage_analyzer)
         self.worker.op_finished.connect(self.on_op_finished)
-        
-        # Initial Load
+        self.size_worker.size_ready.connect(self.on_folder_size)
+        self.thumbs.thumb_ready.connect(self.on_thumb_ready)
+        self.thumbs.preview_ready.connect(self.on_preview_ready)
+        self.grid.verticalScrollBar().valueChanged.connect(self.thumb_timer.start)
+        self.grid.verticalScrollBar().valueChanged.connect(self.on_grid_scrolled)
         
         # Initial Load
         if self.adb.current_device and self.adb.is_online():
+            self.start_watching()
             self.load_path(self.internal_root)
             self.worker.list_storages()
             self.worker.get_usage()
@@ -419,6 +636,11 @@ class FileManagerWidget(QWidget):
             }}
         """)
         top_layout.addWidget(self.search_bar)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_bar.textChanged.connect(self.search_timer.start)
         
         top_layout.addStretch() 
 
@@ -508,6 +730,8 @@ class FileManagerWidget(QWidget):
         self.tree.setHeaderLabels(["TÊN", "NGÀY SỬA ĐỔI", "LOẠI", "KÍCH THƯỚC"])
         self.tree.setRootIsDecorated(False)
         self.tree.setUniformRowHeights(True)
+        self.tree.setSortingEnabled(True)
+        self.tree.sortByColumn(0, Qt.AscendingOrder)
         self.tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_context_menu)
@@ -634,7 +858,8 @@ class FileManagerWidget(QWidget):
             self.stack.setCurrentIndex(1)
             self.btn_view_list.setChecked(False)
             self.btn_view_grid.setChecked(True)
-        self.refresh()
+        self.worker.list_files(self.current_path)
+        self.thumb_timer.start()
 
     def create_action_btn(self, layout, text, icon, primary=False):
         btn = QPushButton(f" {icon}  {text} ")
@@ -710,6 +935,8 @@ class FileManagerWidget(QWidget):
         self.sidebar.addItem(item)
         
     def update_listing_ui(self):
+        self.clear_search()
+        self.gallery_active = False
         # Update Nav Buttons
         self.btn_back.setEnabled(self.history_index > 0)
         self.btn_forward.setEnabled(self.history_index < len(self.history) - 1)
@@ -727,6 +954,7 @@ class FileManagerWidget(QWidget):
         self.tree.clear()
         self.grid.clear()
         self.worker.list_files(self.current_path)
+        self.update_watch()
 
     def on_storages_ready(self, entries):
         # Update Sidebar Drives
@@ -741,51 +969,293 @@ class FileManagerWidget(QWidget):
            if entry.name not in current_names:
                self.add_sidebar_item(entry.name, "💾" if "Thẻ" in entry.name or "ngoài" in entry.name else "📱", entry.path)
 
-    def on_listing_ready(self, entries):
+    def on_listing_ready(self, path, entries):
+        # Ignore late listings for a folder we already navigated away from
+        if norm_path(path) != norm_path(self.current_path) or self.search_active or self.gallery_active: return
         # Normal File Listing
+        missing_sizes = self.populate_views(entries)
+        self.status_bar.setText(f"{len(entries)} mục | {self.current_path}")
+        self.schedule_prefetch(entries)
+        # Folder sizes fill in as du finishes each subtree (separate lane)
+        if missing_sizes:
+            self.size_worker.scan(self.current_path)
+
+    def populate_views(self, entries):
+        """Fill list + grid views; returns True if some folder sizes are not cached yet"""
         self.tree.setUpdatesEnabled(False)
+        self.tree.setSortingEnabled(False)  # sort once after insert, not per row
         self.grid.setUpdatesEnabled(False)
         
         # CLEAR VIEWS BEFORE POPULATING TO PREVENT DUPLICATES
         self.tree.clear()
         self.grid.clear()
         
-        count = 0
+        self._tree_items = {}
+        self._grid_items = {}
+        missing_sizes = False
         for entry in entries:
-            count += 1
-            # Determine Icon
-            icon_char = "📄"
-            if entry.is_dir: icon_char = "📁"
-            else:
-                ext = entry.name.split('.')[-1].lower() if '.' in entry.name else ""
-                if ext in ['jpg', 'png', 'jpeg', 'webp', 'gif']: icon_char = "🖼️"
-                elif ext in ['mp4', 'avi', 'mkv', 'mov']: icon_char = "🎬"
-                elif ext in ['mp3', 'wav', 'flac']: icon_char = "🎵"
-                elif ext in ['apk']: icon_char = "🤖"
-                elif ext in ['zip', 'rar', '7z']: icon_char = "📦"
-                elif ext in ['pdf', 'doc', 'txt', 'xml', 'json']: icon_char = "📝"
-            
-            # 1. Populate List/Tree
-            t_item = QTreeWidgetItem(self.tree)
-            t_item.setText(0, f"  {icon_char}  {entry.name}")
-            t_item.setText(1, entry.date)
-            t_item.setText(2, "Thư mục" if entry.is_dir else "Tập tin")
-            t_item.setText(3, entry.size)
-            t_item.setData(0, Qt.UserRole, entry)
-            
-            # 2. Populate Grid
-            g_item = QListWidgetItem(entry.name)
-            g_item.setTextAlignment(Qt.AlignCenter)
-            # Create a simple pixmap from char for now (In real app, use Svg/Png)
-            # We can use a helper to draw text to pixmap
-            pix = self.emoji_to_pixmap(icon_char, 64)
-            g_item.setIcon(QIcon(pix))
-            g_item.setData(Qt.UserRole, entry)
-            self.grid.addItem(g_item)
+            missing_sizes |= self.add_entry_items(entry)
 
+        self.tree.setSortingEnabled(True)
         self.tree.setUpdatesEnabled(True)
         self.grid.setUpdatesEnabled(True)
-        self.status_bar.setText(f"{count} mục | {self.current_path}")
+        self.thumbs.cancel()
+        self.thumb_timer.start()
+        return missing_sizes
+
+    def add_entry_items(self, entry):
+        """One row in the list view + one tile in the grid; True if the folder size is unknown"""
+        # Determine Icon
+        icon_char = "📄"
+        if entry.is_dir: icon_char = "📁"
+        else:
+            ext = entry.name.split('.')[-1].lower() if '.' in entry.name else ""
+            if ext in ['jpg', 'png', 'jpeg', 'webp', 'gif']: icon_char = "🖼️"
+            elif ext in ['mp4', 'avi', 'mkv', 'mov']: icon_char = "🎬"
+            elif ext in ['mp3', 'wav', 'flac']: icon_char = "🎵"
+            elif ext in ['apk']: icon_char = "🤖"
+            elif ext in ['zip', 'rar', '7z']: icon_char = "📦"
+            elif ext in ['pdf', 'doc', 'txt', 'xml', 'json']: icon_char = "📝"
+        
+        # 1. Populate List/Tree
+        missing_size = False
+        t_item = FileTreeItem(self.tree)
+        t_item.setText(0, f"  {icon_char}  {entry.name}")
+        t_item.setText(1, entry.date)
+        t_item.setText(2, "Thư mục" if entry.is_dir else "Tập tin")
+        t_item.setText(3, entry.size)
+        t_item.setData(0, Qt.UserRole, entry)
+        t_item.setToolTip(0, entry.path)
+        self._tree_items[norm_path(entry.path)] = t_item
+        if entry.is_dir:
+            known = self.worker.sizes.get(self.adb.current_device, entry.path)
+            if known is not None: self.set_item_size(t_item, known)
+            else: missing_size = True
+        
+        # 2. Populate Grid
+        g_item = QListWidgetItem(entry.name)
+        g_item.setTextAlignment(Qt.AlignCenter)
+        # Create a simple pixmap from char for now (In real app, use Svg/Png)
+        # We can use a helper to draw text to pixmap
+        # Thumbnails (cached or not) arrive via request_visible_thumbnails for visible tiles only
+        g_item.setIcon(QIcon(self.emoji_to_pixmap(icon_char, 64)))
+        g_item.setData(Qt.UserRole, entry)
+        self.grid.addItem(g_item)
+        self._grid_items[entry.path] = g_item
+        return missing_size
+
+    def request_visible_thumbnails(self):
+        """Only images currently visible in the grid are fetched"""
+        if self.view_mode != 'grid': return
+        viewport = self.grid.viewport().rect()
+        visible = []
+        for i in range(self.grid.count()):
+            item = self.grid.item(i)
+            if self.grid.visualItemRect(item).intersects(viewport):
+                visible.append(item.data(Qt.UserRole))
+        self.thumbs.request(visible)
+
+    def on_thumb_ready(self, path, image):
+        item = self._grid_items.get(path)
+        if item is not None:
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+
+    def set_item_size(self, item, size):
+        item.setText(3, format_size(size))
+        item.setData(3, Qt.UserRole, size)
+
+    def on_folder_size(self, path, size):
+        item = self._tree_items.get(path)
+        if item is not None:
+            self.set_item_size(item, size)
+        elif path == norm_path(self.current_path):
+            self.status_bar.setText(f"{self.tree.topLevelItemCount()} mục | {self.current_path} | {format_size(size)}")
+
+    # --- Whole-storage search ---
+    def get_file_index(self):
+        device = self.adb.current_device
+        if not device: return self.file_index  # offline: keep searching the last index
+        if self.file_index is None or self.file_index.device != device:
+            if self.file_index: self.close_file_index(self.file_index)
+            self.file_index = FileIndex(device)
+            self._index_refreshed = False
+        return self.file_index
+
+    def close_file_index(self, index):
+        """Close an index once no IndexWorker is writing to it any more"""
+        worker = self.index_worker
+        if worker and worker.isRunning() and worker.index is index:
+            worker.stop()
+            worker.finished.connect(lambda _stats: index.close())
+        else:
+            index.close()
+
+    def start_indexing(self):
+        if (self.index_worker and self.index_worker.isRunning()) or not self.adb.is_online(): return
+        self.index_worker = IndexWorker(self.adb, self.get_file_index())
+        self.index_worker.progress.connect(
+            lambda done, total: self.status_bar.setText(f"Đang lập chỉ mục: {done}/{total} thư mục thay đổi..."))
+        self.index_worker.finished.connect(self.on_index_finished)
+        self._index_refreshed = True
+        self.index_worker.start()
+
+    def on_index_finished(self, stats):
+        if self.search_active: self.run_search()
+        else: self.status_bar.setText(f"Đã cập nhật chỉ mục ({stats.get('changed', 0)} thư mục thay đổi)")
+
+    def run_search(self):
+        text = self.search_bar.text().strip()
+        if not text:
+            if self.search_active:
+                self.search_active = False
+                self.worker.list_files(self.current_path)
+            return
+        index = self.get_file_index()
+        if index is None: return
+        self.search_active = True
+        if not self._index_refreshed:
+            self.start_indexing()  # incremental: only folders whose mtime changed
+        results = index.search(text)
+        self.populate_views(results)
+        indexing = " (đang lập chỉ mục...)" if self.index_worker and self.index_worker.isRunning() else ""
+        self.status_bar.setText(f"{len(results)} kết quả cho '{text}'{indexing}")
+
+    def clear_search(self):
+        if not self.search_active and not self.search_bar.text(): return
+        self.search_active = False
+        self.search_bar.blockSignals(True)
+        self.search_bar.clear()
+        self.search_bar.blockSignals(False)
+
+    # --- MediaStore gallery ---
+    def show_gallery(self, folder=""):
+        """Photos/videos under `folder` from MediaStore: dimensions, date taken, paged into the grid"""
+        if not self.adb.is_online(): return
+        self.clear_search()
+        self.gallery_active = True
+        self.gallery_folder = folder
+        self.set_view_mode('grid')
+        if self.gallery.device != self.adb.current_device:
+            self.reload_gallery()
+        else:
+            self.render_gallery()
+
+    def reload_gallery(self):
+        if self.gallery_worker and self.gallery_worker.isRunning(): return
+        self.status_bar.setText("Đang đọc thư viện ảnh (MediaStore)...")
+        self.gallery_worker = GalleryWorker(self.gallery)
+        self.gallery_worker.loaded.connect(lambda n: self.render_gallery() if self.gallery_active else None)
+        self.gallery_worker.start()
+
+    def set_gallery_sort(self, label):
+        self.gallery_sort = GALLERY_SORTS[label]
+        self.render_gallery()
+
+    def render_gallery(self):
+        self.gallery_offset = 0
+        self.populate_views([])
+        self.append_gallery_page()
+
+    def append_gallery_page(self):
+        sort, descending = self.gallery_sort
+        items = self.gallery.page(self.gallery_offset, GALLERY_PAGE, self.gallery_folder, sort, descending)
+        if not items and self.gallery_offset: return
+        self.tree.setSortingEnabled(False)
+        self.grid.setUpdatesEnabled(False)
+        for media in items:
+            self.add_entry_items(media.to_entry())
+            info = f"{media.width}x{media.height}" if media.width else ""
+            if media.duration: info += f" | {media.duration // 1000}s"
+            self._grid_items[media.path].setToolTip(f"{media.path}\n{info}" if info else media.path)
+        self.gallery_offset += len(items)
+        self.grid.setUpdatesEnabled(True)
+        self.tree.setSortingEnabled(True)
+        self.thumb_timer.start()
+        total = self.gallery.count(self.gallery_folder)
+        where = self.gallery_folder or "toàn bộ bộ nhớ"
+        self.status_bar.setText(f"Thư viện: {self.gallery_offset}/{total} ảnh/video | {where}")
+
+    def on_grid_scrolled(self, value):
+        # Next gallery page when the grid is scrolled near its end
+        bar = self.grid.verticalScrollBar()
+        if self.gallery_active and value >= bar.maximum() - bar.pageStep() // 2:
+            self.append_gallery_page()
+
+    def show_duplicates(self):
+        dlg = DuplicatesDialog(self.adb, self.current_path, parent=self)
+        dlg.delete_requested.connect(self.worker.delete_items)
+        dlg.exec()
+
+    def show_storage_analyzer(self):
+        device = self.adb.current_device
+        if not device or not self.adb.is_online(): return
+        if self.storage_tree is None or self.storage_tree.device != device:
+            self.storage_tree = StorageTree.load(device, self.internal_root)
+        dlg = StorageAnalyzerDialog(self.adb, self.storage_tree, parent=self)
+        dlg.folder_chosen.connect(self.load_path)
+        dlg.exec()
+
+    def show_largest_folders(self):
+        dlg = LargestFoldersDialog(self.size_worker, self.current_path, parent=self)
+        dlg.folder_chosen.connect(self.load_path)
+        dlg.exec()
+
+    def schedule_prefetch(self, entries):
+        # Likely next hops: most visited subfolders first, then view order
+        dirs = [e.path for e in entries if e.is_dir]
+        dirs.sort(key=lambda p: -self.visit_counts.get(norm_path(p), 0))
+        self.worker.prefetch(dirs)
+
+    # --- Live change notifications ---
+    def start_watching(self):
+        self.stop_watching()
+        self.watch_worker = WatchWorker(self.adb, self.worker)
+        self.watch_worker.changed.connect(self.on_dir_changed)
+        self.watch_worker.start()
+
+    def stop_watching(self):
+        if self.watch_worker:
+            self.watch_worker.changed.disconnect(self.on_dir_changed)
+            self.watch_worker.stop()
+            self.watch_worker = None
+
+    def update_watch(self):
+        """Watch the open folder plus the last few visited ones (their cache stays fresh)"""
+        if not self.watch_worker: return
+        paths = [norm_path(self.current_path)]
+        for p in reversed(self.history):
+            if len(paths) > WATCH_RECENT: break
+            if norm_path(p) not in paths: paths.append(norm_path(p))
+        self.watch_worker.watch(paths)
+
+    def on_dir_changed(self, change):
+        """Patch the open folder's views in place (cache was already updated by the watcher)"""
+        if norm_path(change.path) != norm_path(self.current_path) or self.search_active or self.gallery_active: return
+        if change.gone:
+            self.status_bar.setText(f"Thư mục đã bị xóa hoặc di chuyển: {self.current_path}")
+            self.go_up()
+            return
+        if change.listing is not None:
+            missing_sizes = self.populate_views(change.listing)
+        else:
+            names = set(change.removed) | {e.name for e in change.upserts}
+            self.tree.setSortingEnabled(False)
+            for path, item in list(self._tree_items.items()):
+                if item.data(0, Qt.UserRole).name in names:
+                    self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(item))
+                    del self._tree_items[path]
+            for path, item in list(self._grid_items.items()):
+                if item.data(Qt.UserRole).name in names:
+                    self.grid.takeItem(self.grid.row(item))
+                    del self._grid_items[path]
+            missing_sizes = False
+            for entry in change.upserts:
+                missing_sizes |= self.add_entry_items(entry)
+            self.tree.setSortingEnabled(True)
+            self.thumb_timer.start()
+        self.status_bar.setText(f"{self.tree.topLevelItemCount()} mục | {self.current_path}")
+        if missing_sizes:
+            self.size_worker.scan(self.current_path)
 
     def emoji_to_pixmap(self, icon_char, size):
         pix = QPixmap(size, size)
@@ -799,7 +1269,7 @@ class FileManagerWidget(QWidget):
     def load_path(self, path):
         if not path: return
         path = path.replace('//', '/')
-        if self.current_path == path and self.tree.topLevelItemCount() > 0: return # Already there
+        if self.current_path == path and self.tree.topLevelItemCount() > 0 and not self.search_active: return # Already there
         
         # History
         if self.history_index == -1 or self.history[self.history_index] != path:
@@ -809,6 +1279,7 @@ class FileManagerWidget(QWidget):
             self.history_index += 1
             
         self.current_path = path
+        self.visit_counts[norm_path(path)] = self.visit_counts.get(norm_path(path), 0) + 1
         self.update_listing_ui()
         self.worker.get_usage(path)
 
@@ -830,7 +1301,11 @@ class FileManagerWidget(QWidget):
         self.load_path(parent)
         
     def refresh(self):
-        self.worker.list_files(self.current_path)
+        if self.gallery_active:
+            self.reload_gallery()
+            return
+        # Explicit refresh always bypasses the listing cache
+        self.worker.list_files(self.current_path, force=True)
         
     def on_sidebar_click(self, item):
         if isinstance(item, SidebarItem) and item.path:
@@ -852,28 +1327,32 @@ class FileManagerWidget(QWidget):
              QMessageBox.information(self, "Thông tin", f"Mở: {entry.name}\n(Tính năng mở file khác đang phát triển)")
 
     def preview_image(self, entry):
-        local_path = os.path.join(self.cache_dir, entry.name)
-        progress = QProgressDialog("Đang tải ảnh...", None, 0, 0, self)
-        progress.setWindowModality(Qt.WindowModal)
-        progress.show()
-        # Force event loop to show dialog
-        QApplication.processEvents()
-        
-        try:
-             self.adb.pull_file(entry.path, self.cache_dir)
-             progress.close()
-             if os.path.exists(local_path):
-                 dlg = ImagePreviewDialog(local_path, entry.name, self)
-                 dlg.exec()
-        except Exception as e:
-             progress.close()
-             QMessageBox.critical(self, "Lỗi", str(e))
+        # Pulled on a background pool into a path+size+mtime keyed cache file
+        self._pending_preview = entry.path
+        self.status_bar.setText(f"Đang tải ảnh: {entry.name}...")
+        self.thumbs.fetch_preview(entry)
+
+    def on_preview_ready(self, path, local_path):
+        if path != self._pending_preview: return
+        self._pending_preview = None
+        if not local_path or not os.path.exists(local_path):
+            QMessageBox.critical(self, "Lỗi", f"Không thể tải ảnh: {os.path.basename(path)}")
+            return
+        self.status_bar.setText(f"{self.tree.topLevelItemCount()} mục | {self.current_path}")
+        dlg = ImagePreviewDialog(local_path, os.path.basename(path), self)
+        dlg.exec()
 
     def reset(self):
         """Reset to initial state"""
         self.history = []
         self.history_index = -1
+        self.stop_watching()
+        self.worker.cache.clear(self.adb.current_device)
+        self.worker.cancel_prefetch()
+        self.size_worker.cancel()
+        self.worker.sizes.clear(self.adb.current_device)
         if self.adb.current_device and self.adb.is_online():
+            self.start_watching()
             self.load_path(self.internal_root)
             self.worker.list_storages()
             self.worker.get_usage()
@@ -883,7 +1362,8 @@ class FileManagerWidget(QWidget):
             self.status_bar.setText("Chưa kết nối thiết bị")
 
     def on_op_finished(self, success, msg):
-        self.refresh()
+        # The worker already invalidated the touched folders: cache hit if unaffected
+        self.worker.list_files(self.current_path)
         if not success:
              # Suppress specific connection errors
              msg_low = msg.lower()
@@ -911,6 +1391,19 @@ class FileManagerWidget(QWidget):
             menu = QMenu()
             menu.addAction("➕ Tạo thư mục mới", self.create_folder)
             menu.addAction("🔄 Làm mới", self.refresh)
+            menu.addAction("📊 Thư mục lớn nhất", self.show_largest_folders)
+            menu.addAction("🧬 Tìm file trùng lặp", self.show_duplicates)
+            menu.addAction("🗺 Phân tích bộ nhớ", self.show_storage_analyzer)
+            menu.addAction("🔁 Đồng bộ với máy tính...", lambda: self.sync_folder(self.current_path))
+            menu.addSeparator()
+            if self.gallery_active:
+                sort_menu = menu.addMenu("↕ Sắp xếp thư viện")
+                for label in GALLERY_SORTS:
+                    sort_menu.addAction(label, lambda label=label: self.set_gallery_sort(label))
+                menu.addAction("📁 Thoát chế độ thư viện", self.update_listing_ui)
+            else:
+                menu.addAction("🖼 Thư viện ảnh/video của thư mục này", lambda: self.show_gallery(self.current_path))
+                menu.addAction("🖼 Toàn bộ thư viện ảnh/video", lambda: self.show_gallery(""))
             if hasattr(self, 'clipboard_data') and self.clipboard_data:
                 menu.addSeparator()
                 menu.addAction(f"📋 Dán ({self.clipboard_data.get('action')})", self.paste_item)
@@ -928,6 +1421,8 @@ class FileManagerWidget(QWidget):
         menu.addAction("🗑️ Xóa", lambda: self.delete_item(entry))
         menu.addSeparator()
         menu.addAction("⬇ Tải về máy tính", lambda: self.download_item(entry))
+        if entry.is_dir:
+            menu.addAction("🔁 Đồng bộ với máy tính...", lambda: self.sync_folder(entry.path))
         menu.exec(sender.mapToGlobal(pos))
 
     # --- Actions (Same as before) ---
@@ -948,11 +1443,97 @@ class FileManagerWidget(QWidget):
     def download_item(self, entry):
         target = QFileDialog.getExistingDirectory(self, "Chọn nơi lưu")
         if target:
-            try:
-                self.adb.pull_file(entry.path, target)
-                QMessageBox.information(self, "Thành công", f"Đã tải {entry.name}")
-            except Exception as e:
-                QMessageBox.critical(self, "Lỗi", str(e))
+            self.start_transfer([("pull", entry.path, os.path.join(target, entry.name))], f"Đang tải {entry.name}...")
+
+    def start_transfer(self, jobs, title):
+        """Background resumable transfer with bytes/s progress"""
+        pushed = any(direction == "push" for direction, _, _ in jobs)
+        self.run_transfer(TransferThread(self.adb, jobs), title, pushed)
+
+    def run_transfer(self, thread, title, pushed):
+        """Progress dialog for a TransferThread/UploadThread"""
+        progress = QProgressDialog(title, "Hủy", 0, 1000, self)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+
+        def on_progress(done, total, rate, name):
+            progress.setValue(int(done * 1000 / total) if total else 1000)
+            progress.setLabelText(f"{name}\n{done / (1024 * 1024):.1f}/{total / (1024 * 1024):.1f} MB - {rate / (1024 * 1024):.1f} MB/s")
+
+        def on_finished(success, msg):
+            progress.close()
+            if pushed:
+                self.worker.cache.invalidate(self.adb.current_device, self.current_path)
+                self.worker.sizes.invalidate(self.adb.current_device, self.current_path)
+                self.refresh()
+            if success: QMessageBox.information(self, "Hoàn tất", msg)
+            else: QMessageBox.warning(self, "Thông báo", msg)
+
+        def on_measured(name, method, rate):
+            self.status_bar.setText(f"{name}: {rate / (1024 * 1024):.1f} MB/s ({method})")
+
+        thread.progress.connect(on_progress)
+        thread.measured.connect(on_measured)
+        thread.finished.connect(on_finished)
+        progress.canceled.connect(thread.stop)
+        self._transfer = thread  # keep a reference while running
+        thread.start()
+        progress.show()
+
+    def sync_folder(self, remote):
+        """Dry run first (delta report), then transfer only new/changed files"""
+        from PySide6.QtWidgets import QInputDialog
+        local = QFileDialog.getExistingDirectory(self, f"Thư mục trên máy tính để đồng bộ với {remote}")
+        if not local: return
+        label, ok = QInputDialog.getItem(self, "Đồng bộ", "Chiều đồng bộ:", list(SYNC_MODES), 0, False)
+        if not ok: return
+        verify = QMessageBox.question(
+            self, "Đồng bộ", "So sánh nội dung (md5) với file cùng kích thước nhưng khác thời gian sửa?\n"
+            "Chậm hơn nhưng tránh chép lại file không đổi.") == QMessageBox.Yes
+        mode = SYNC_MODES[label]
+        self.status_bar.setText(f"Đang so sánh {remote} với {local}...")
+        thread = SyncThread(self.adb, local, remote, mode, verify_hash=verify, dry_run=True)
+
+        def on_planned(plan):
+            if not plan.to_pull and not plan.to_push:
+                self.status_bar.setText("Hai bên đã giống nhau")
+                return
+            if QMessageBox.question(self, "Đồng bộ", plan.summary() + "\n\nTiếp tục?") == QMessageBox.Yes:
+                self.run_sync(plan)
+
+        def on_finished(success, msg):
+            if not success: QMessageBox.warning(self, "Thông báo", msg)
+
+        thread.planned.connect(on_planned)
+        thread.finished.connect(on_finished)
+        self._sync = thread
+        thread.start()
+
+    def run_sync(self, plan):
+        progress = QProgressDialog("Đang đồng bộ...", "Hủy", 0, len(plan.to_pull) + len(plan.to_push), self)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        thread = SyncThread(self.adb, plan.local_root, plan.remote_root, plan.mode, plan=plan)
+
+        def on_progress(done, total, name):
+            progress.setValue(done)
+            progress.setLabelText(f"{done}/{total}: {name}")
+
+        def on_finished(success, msg):
+            progress.close()
+            if plan.to_push:
+                self.worker.cache.invalidate_tree(self.adb.current_device, plan.remote_root)
+                self.worker.sizes.invalidate(self.adb.current_device, plan.remote_root)
+                self.refresh()
+            if success: QMessageBox.information(self, "Hoàn tất", msg)
+            else: QMessageBox.warning(self, "Thông báo", msg)
+
+        thread.progress.connect(on_progress)
+        thread.finished.connect(on_finished)
+        progress.canceled.connect(thread.stop)
+        self._sync = thread
+        thread.start()
+        progress.show()
 
     def upload_dialog(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Chọn tập tin để tải lên")
@@ -962,25 +1543,10 @@ class FileManagerWidget(QWidget):
         self.upload_files(files)
 
     def upload_files(self, files):
+        """All dropped/selected files and folders in one batched upload (not one adb call per file)"""
         if not files: return
-        progress = QProgressDialog(f"Đang tải lên {len(files)} tập tin...", "Hủy", 0, len(files), self)
-        progress.setWindowModality(Qt.WindowModal)
-        progress.show()
-        
-        try:
-            for i, local_path in enumerate(files):
-                if progress.wasCanceled(): break
-                filename = os.path.basename(local_path)
-                dest = f"{self.current_path}/{filename}".replace('//', '/')
-                self.adb.push_file(local_path, dest)
-                progress.setValue(i+1)
-            
-            QMessageBox.information(self, "Hoàn tất", f"Đã tải lên {len(files)} tập tin.")
-            self.refresh()
-        except Exception as e:
-            QMessageBox.critical(self, "Lỗi", str(e))
-        finally:
-            progress.close()
+        thread = UploadThread(self.adb, files, self.current_path)
+        self.run_transfer(thread, f"Đang tải lên {len(files)} mục...", pushed=True)
 
     def set_clipboard(self, action, entry):
         self.clipboard_data = {"action": action, "path": entry.path, "name": entry.name}
@@ -0,0 +1,204 @@
+# src/ui/widgets/storage_analyzer.py
+"""
+Storage Analyzer - Treemap drill-down of storage usage
+Cây dung lượng được vẽ lại liên tục trong lúc quét; nhấn vào ô để đi sâu vào thư mục,
+chuột phải để quay lên.
+"""
+from PySide6.QtWidgets import QDialog, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
+from PySide6.QtCore import Qt, Signal, QRectF
+from PySide6.QtGui import QPainter, QColor, QPen, QFont
+from src.ui.theme_manager import ThemeManager
+from src.workers.storage_worker import StorageScanWorker
+from src.core.stat_listing import format_size
+from src.core.listing_cache import norm_path, parent_path
+
+MAX_TILES = 60          # the rest is drawn as one "other" tile
+OTHER_KEY = "…"
+PALETTE = ["#4E79A7", "#F28E2B", "#E15759", "#76B7B2", "#59A14F",
+           "#EDC948", "#B07AA1", "#FF9DA7", "#9C755F", "#BAB0AC"]
+
+
+def squarify(items, x, y, w, h):
+    """Squarified treemap: [(key, value)] (largest first) -> [(key, (x, y, w, h))]"""
+    items = [(k, v) for k, v in items if v > 0]
+    total = sum(v for _, v in items)
+    if total <= 0 or w <= 0 or h <= 0:
+        return []
+    scale = w * h / total
+    areas = [(k, v * scale) for k, v in items]
+    out, row = [], []
+
+    def worst(cells, side):
+        s = sum(a for _, a in cells)
+        return max(max(side * side * a / (s * s), (s * s) / (side * side * a)) for _, a in cells)
+
+    def flush(cells, x, y, w, h):
+        s = sum(a for _, a in cells)
+        if w >= h:  # column on the left
+            strip = s / h
+            cy = y
+            for key, area in cells:
+                out.append((key, (x, cy, strip, area / strip)))
+                cy += area / strip
+            return x + strip, y, w - strip, h
+        strip = s / w  # row on top
+        cx = x
+        for key, area in cells:
+            out.append((key, (cx, y, area / strip, strip)))
+            cx += area / strip
+        return x, y + strip, w, h - strip
+
+    for cell in areas:
+        side = min(w, h)
+        if row and worst(row + [cell], side) > worst(row, side):
+            x, y, w, h = flush(row, x, y, w, h)
+            row = []
+        row.append(cell)
+    if row:
+        flush(row, x, y, w, h)
+    return out
+
+
+class TreemapWidget(QWidget):
+    """Tiles for the children of `path`; left click drills into a folder, right click goes up"""
+    drill = Signal(str)
+    up = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tree = None
+        self.path = "/"
+        self._tiles = []
+        self._sizes = {}
+        self.setMinimumSize(400, 300)
+        self.setMouseTracking(True)
+
+    def set_tree(self, tree, path):
+        self.tree = tree
+        self.path = norm_path(path)
+        self.update()
+
+    def _items(self):
+        items = self.tree.children(self.path) if self.tree else []
+        if len(items) > MAX_TILES:
+            rest = sum(size for _, size in items[MAX_TILES:])
+            items = items[:MAX_TILES] + [(OTHER_KEY, rest)]
+        return items
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.rect().adjusted(2, 2, -2, -2)
+        items = self._items()
+        self._sizes = dict(items)
+        self._tiles = squarify(items, rect.x(), rect.y(), rect.width(), rect.height())
+        painter.setFont(QFont("Segoe UI", 9))
+        for i, (key, (x, y, w, h)) in enumerate(self._tiles):
+            tile = QRectF(x, y, w, h)
+            own_files = key.endswith("/") or key == OTHER_KEY
+            color = QColor("#9AA5B1" if own_files else PALETTE[i % len(PALETTE)])
+            painter.fillRect(tile.adjusted(1, 1, -1, -1), color)
+            painter.setPen(QPen(QColor(255, 255, 255, 180), 1))
+            painter.drawRect(tile)
+            if w > 60 and h > 30:
+                name = "(các file)" if key.endswith("/") else key.rsplit("/", 1)[-1]
+                painter.setPen(Qt.white)
+                painter.drawText(tile.adjusted(6, 4, -6, -4), Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap,
+                                 f"{name}\n{format_size(self._size_of(key))}")
+        if not self._tiles:
+            painter.setPen(QColor(ThemeManager.get_theme()['COLOR_TEXT_SECONDARY']))
+            painter.drawText(self.rect(), Qt.AlignCenter, "Đang quét...")
+        painter.end()
+
+    def _size_of(self, key):
+        return self._sizes.get(key, 0)
+
+    def _tile_at(self, pos):
+        for key, (x, y, w, h) in self._tiles:
+            if x <= pos.x() < x + w and y <= pos.y() < y + h:
+                return key
+        return None
+
+    def mouseMoveEvent(self, event):
+        key = self._tile_at(event.position())
+        self.setToolTip(f"{key}\n{format_size(self._size_of(key))}" if key else "")
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.RightButton:
+            self.up.emit()
+            return
+        key = self._tile_at(event.position())
+        if key and not key.endswith("/") and key != OTHER_KEY:
+            self.drill.emit(key)
+
+
+class StorageAnalyzerDialog(QDialog):
+    """Treemap of a device's storage; refresh re-reads only folders whose mtime changed"""
+    folder_chosen = Signal(str)
+
+    def __init__(self, adb_manager, tree, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Phân tích bộ nhớ")
+        self.resize(960, 640)
+        self.setStyleSheet(f"background-color: {ThemeManager.get_theme()['COLOR_BG_MAIN']}; color: {ThemeManager.COLOR_TEXT_PRIMARY};")
+        self.adb = adb_manager
+        self.tree = tree
+        self.path = tree.root
+        layout = QVBoxLayout(self)
+
+        bar = QHBoxLayout()
+        self.btn_up = QPushButton("⬆ Lên")
+        self.btn_up.clicked.connect(self.go_up)
+        self.lbl_path = QLabel()
+        self.btn_open = QPushButton("📂 Mở trong trình quản lý")
+        self.btn_open.clicked.connect(lambda: (self.folder_chosen.emit(self.path), self.accept()))
+        self.btn_rescan = QPushButton("🔄 Quét lại")
+        self.btn_rescan.clicked.connect(self.start_scan)
+        bar.addWidget(self.btn_up)
+        bar.addWidget(self.lbl_path, 1)
+        bar.addWidget(self.btn_open)
+        bar.addWidget(self.btn_rescan)
+        layout.addLayout(bar)
+
+        self.treemap = TreemapWidget()
+        self.treemap.drill.connect(self.set_path)
+        self.treemap.up.connect(self.go_up)
+        layout.addWidget(self.treemap, 1)
+        self.status = QLabel()
+        layout.addWidget(self.status)
+
+        self.worker = None
+        self.set_path(self.path)
+        self.start_scan()
+
+    def set_path(self, path):
+        self.path = norm_path(path)
+        self.lbl_path.setText(f"{self.path}  ({format_size(self.tree.size(self.path))})")
+        self.btn_up.setEnabled(self.path != self.tree.root)
+        self.treemap.set_tree(self.tree, self.path)
+
+    def go_up(self):
+        if self.path != self.tree.root:
+            self.set_path(parent_path(self.path))
+
+    def start_scan(self):
+        if self.worker and self.worker.isRunning(): return
+        cached = " (từ bộ nhớ đệm)" if self.tree.scanned_at else ""
+        self.status.setText(f"Đang quét thay đổi...{cached}")
+        self.worker = StorageScanWorker(self.adb, self.tree)
+        self.worker.updated.connect(self.on_updated)
+        self.worker.finished.connect(self.on_finished)
+        self.worker.start()
+
+    def on_updated(self):
+        self.lbl_path.setText(f"{self.path}  ({format_size(self.tree.size(self.path))})")
+        self.treemap.update()
+
+    def on_finished(self, stats):
+        self.on_updated()
+        self.status.setText(f"Tổng {format_size(self.tree.size(self.tree.root))} | {stats.get('dirs', 0)} thư mục, "
+                            f"{stats.get('changed', 0)} thay đổi, {stats.get('removed', 0)} đã xóa")
+
+    def done(self, result):
+        if self.worker: self.worker.stop()
+        super().done(result)
@@ -21,7 +21,7 @@ from PySide6.QtWidgets import QDialog
 from src.workers.debloat_worker import DebloatWorker
 from src.workers.optimization_worker import OptimizationWorker
 from src.workers.generic_worker import GenericShellWorker
-from src.data.bloatware_data import BLOATWARE_DICT
+from src.data.bloatware_data import BLOATWARE_DICT, get_bloatware
 from src.ui.widgets.system_tweaks import SystemTweaksWidget
 from src.ui.widgets.ota_downloader import OTADownloaderWidget, HyperOSAppsWidget
 from src.ui.widgets.app_manager import AppManagerWidget
@@ -450,6 +450,7 @@ class XiaomiDebloaterWidget(XiaomiBaseWidget):
     def refresh_state(self):
         """Called when widget becomes visible"""
         self.check_device(self.status_label)
+        self.refresh_model_apps()
         
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -496,17 +497,7 @@ class XiaomiDebloaterWidget(XiaomiBaseWidget):
         self.content_layout.setSpacing(10)
         self.content_layout.setAlignment(Qt.AlignTop)
 
-        # Build App Cards from Data
-        from src.data.bloatware_data import BLOATWARE_DICT
-        for category, apps in BLOATWARE_DICT.items():
-            cat_lbl = QLabel(category.upper())
-            cat_lbl.setStyleSheet(f"font-size: 11px; font-weight: 800; color: {ThemeManager.COLOR_TEXT_SECONDARY}; margin-top: 15px; margin-left: 5px;")
-            self.content_layout.addWidget(cat_lbl)
-            
-            for app in apps:
-                card = AppItemCard(app)
-                self.content_layout.addWidget(card)
-                self.app_cards[app] = card
+        self.populate_apps()
         
         scroll.setWidget(self.content)
         layout.addWidget(scroll)
@@ -543,6 +534,30 @@ class XiaomiDebloaterWidget(XiaomiBaseWidget):
         
         layout.addWidget(actions_bar)
 
+    def populate_apps(self, device=""):
+        """Build App Cards from the deduplicated bloat database of this device model"""
+        self.bloat_device = device
+        while self.content_layout.count():
+            item = self.content_layout.takeAt(0)
+            if item.widget(): item.widget().deleteLater()
+        self.app_cards = {}
+        for category, apps in get_bloatware(device).items():
+            cat_lbl = QLabel(category.upper())
+            cat_lbl.setStyleSheet(f"font-size: 11px; font-weight: 800; color: {ThemeManager.COLOR_TEXT_SECONDARY}; margin-top: 15px; margin-left: 5px;")
+            self.content_layout.addWidget(cat_lbl)
+            
+            for app in apps:
+                card = AppItemCard(app)
+                self.content_layout.addWidget(card)
+                self.app_cards[app] = card
+
+    def refresh_model_apps(self):
+        """Rebuild the list when a different device model is connected"""
+        device = self.adb.get_prop("ro.product.device")
+        if device != self.bloat_device:
+            self.populate_apps(device)
+            self.filter_apps(self.search_input.text())
+
     def filter_apps(self, text):
         search_text = text.lower()
         for app_name, card in self.app_cards.items():
@@ -555,19 +570,32 @@ class XiaomiDebloaterWidget(XiaomiBaseWidget):
             LogManager.log("Cảnh báo", "Vui lòng chọn ít nhất một ứng dụng", "warning")
             return
             
+        # Dry run first: fetch package state once and show only the needed delta
+        self.stats_lbl.setText("Đang lập kế hoạch...")
+        self.plan_worker = DebloatWorker(self.adb, selected, dry_run=True)
+        self.plan_worker.plan_ready.connect(self.confirm_debloat_plan)
+        self.plan_worker.start()
+        
+    def confirm_debloat_plan(self, plan):
+        self.stats_lbl.setText(f"{len(plan.actions)} ứng dụng cần gỡ")
+        if not plan.actions:
+            QMessageBox.information(self, "Kế hoạch gỡ bỏ", "Không còn gì để gỡ.\n\n" + plan.summary())
+            return
+            
         confirm = QMessageBox.warning(
             self, "Xác nhận",
-            f"Bạn sắp gỡ bỏ {len(selected)} ứng dụng rác.\nLưu ý: Một số app hệ thống quan trọng có thể gây treo logo if gỡ nhầm.\nBạn có chắc chắn?",
+            f"{plan.summary()}\n\nLưu ý: Một số app hệ thống quan trọng có thể gây treo logo nếu gỡ nhầm.\nBạn có chắc chắn?",
             QMessageBox.Yes | QMessageBox.No
         )
         
         if confirm == QMessageBox.Yes:
-            self.opt_worker = DebloatWorker(self.adb, selected)
+            self.opt_worker = DebloatWorker(self.adb, plan.actions, plan=plan)
             self.opt_worker.progress.connect(lambda m: LogManager.log("Debloater", m, "info"))
             self.opt_worker.start()
             
     def reset(self):
         self.check_device(self.status_label)
+        self.refresh_model_apps()
         for card in self.app_cards.values():
             card.setChecked(False)
         self.stats_lbl.setText("0 ứng dụng được chọn")
@@ -1,69 +1,71 @@
 from PySide6.QtCore import QThread, Signal
 from typing import List, Optional
 import os
-import re
 import shutil
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from src.data.app_data import AppInfo
+from src.core.bulk_actions import BulkActionEngine, cascade_key
+from src.core.install_session import StreamingInstaller, InstallError, BUNDLE_EXTS, extract_bundle
+from src.core.install_planner import InstallPlanner
+from src.core.backup_store import BackupStore
 
 class InstallerThread(QThread):
     progress = Signal(str)
+    bytes_progress = Signal(object, object)  # done bytes, total bytes (may exceed 2 GB)
     finished = Signal(bool, str)
     
-    def __init__(self, adb_manager, paths: List[str], is_split: bool = False, cleanup_paths: List[str] = None):
+    def __init__(self, adb_manager, paths: List[str], is_split: bool = False, cleanup_paths: List[str] = None,
+                 packages: List[List[str]] = None, skip_installed: Optional[bool] = None, lanes: int = 3):
         super().__init__()
         self.adb = adb_manager
         self.paths = paths
         self.is_split = is_split
         self.cleanup_paths = cleanup_paths or []
+        # Several split groups -> one atomic install-multi-package session
+        self.packages = packages or ([paths] if is_split else [])
+        # Re-provisioning a folder: skip APKs whose versionCode is already on the device
+        self.skip_installed = len(paths) > 1 if skip_installed is None else skip_installed
+        self.lanes = lanes
+        self._is_running = True
+        
+    def _on_bytes(self, done, total, label):
+        self.bytes_progress.emit(done, total)
+        pct = int(done * 100 / total) if total else 100
+        self.progress.emit(f"Streaming {label}... {pct}% ({done // (1024 * 1024)}/{total // (1024 * 1024)} MB)")
         
     def run(self):
         try:
-            if not self.paths:
+            if not self.paths and not self.packages:
                 self.finished.emit(False, "No files provided")
                 return
 
-            if self.is_split:
-                self.progress.emit("Pushing files...")
-                remote_paths = []
-                for local_path in self.paths:
-                    fname = os.path.basename(local_path)
-                    remote = f"/data/local/tmp/{fname}"
-                    self.adb.push_file(local_path, remote)
-                    remote_paths.append(remote)
-                
+            bundles = [p for p in self.paths if p.lower().endswith(BUNDLE_EXTS)]
+            if bundles:
+                # .apks/.xapk: unpack the splits; every package goes into one multi-package session
+                self.progress.emit("Extracting APK bundles...")
+                for bundle in bundles:
+                    dest = tempfile.mkdtemp(prefix="apk_bundle_")
+                    self.cleanup_paths.append(dest)
+                    self.packages.append(extract_bundle(bundle, dest))
+                self.packages += [[p] for p in self.paths if p not in bundles]
+
+            if self.packages:
+                # Splits are streamed straight into the pm session (no /data/local/tmp copy)
                 self.progress.emit("Installing Split APKs...")
-                session_out = self.adb.shell("pm install-create -r") 
-                session_id = 0
-                match = re.search(r'(\d+)', session_out)
-                if match: session_id = match.group(1)
-                else: raise Exception(f"Failed to create session: {session_out}")
-                
-                total = len(remote_paths)
-                for i, remote in enumerate(remote_paths):
-                    self.progress.emit(f"Writing apk {i+1}/{total}...")
-                    size = os.path.getsize(self.paths[i])
-                    self.adb.shell(f"pm install-write -S {size} {session_id} {i}.apk {remote}")
-                
-                self.progress.emit("Committing...")
-                res = self.adb.shell(f"pm install-commit {session_id}")
-                
-                for remote in remote_paths: self.adb.shell(f"rm {remote}")
-                    
-                if "Success" in res: self.finished.emit(True, "Success!")
-                else: self.finished.emit(False, f"Error: {res}")
+                installer = StreamingInstaller(
+                    self.adb, on_progress=self._on_bytes, should_stop=lambda: not self._is_running
+                )
+                try:
+                    installer.install(self.packages)
+                    self.finished.emit(True, "Success!")
+                except InstallError as ie:
+                    self.finished.emit(False, f"Error: {ie}")
             
             else:
-                for path in self.paths:
-                    self.progress.emit(f"Installing {os.path.basename(path)}...")
-                    try:
-                        res = self.adb.execute(["install", "-r", "-d", "-g", path])
-                    except Exception as ie: res = str(ie)
-                    
-                    if "Success" not in res:
-                         self.finished.emit(False, f"Install Failed: {res}")
-                         return
-                self.finished.emit(True, "Success!")
+                self._install_files()
                 
         except Exception as e:
             self.finished.emit(False, str(e))
@@ -74,6 +76,53 @@ class InstallerThread(QThread):
                     elif os.path.isfile(path): os.remove(path)
                 except: pass
 
+    def _install_files(self):
+        if not self.skip_installed:
+            lanes = [list(self.paths)]
+            skipped, bytes_saved = [], 0
+        else:
+            self.progress.emit("Checking installed versions...")
+            plan = InstallPlanner(self.adb).plan(self.paths, lanes=self.lanes)
+            lanes = [[apk.path for apk in lane] for lane in plan.lanes]
+            skipped, bytes_saved = plan.skipped, plan.bytes_saved
+
+        total = sum(len(lane) for lane in lanes)
+        failures = []
+        done = [0]
+        installed_bytes = [0]
+        lock = threading.Lock()
+
+        def run_lane(lane):
+            for path in lane:
+                if not self._is_running: return
+                try:
+                    res = self.adb.execute(["install", "-r", "-d", "-g", path])
+                except Exception as ie: res = str(ie)
+                with lock:
+                    done[0] += 1
+                    if "Success" in res: installed_bytes[0] += os.path.getsize(path)
+                    else: failures.append(f"{os.path.basename(path)}: {res}")
+                    self.progress.emit(f"Installed {done[0]}/{total}: {os.path.basename(path)}")
+
+        start = time.time()
+        threads = [threading.Thread(target=run_lane, args=(lane,), daemon=True) for lane in lanes]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        elapsed = time.time() - start
+
+        if failures:
+            self.finished.emit(False, "Install Failed: " + "\n".join(failures[:3]))
+            return
+        msg = "Success!"
+        if skipped:
+            # Estimate time saved from this run's measured install throughput
+            rate = installed_bytes[0] / elapsed if elapsed > 0 and installed_bytes[0] else 0
+            saved_s = f", ~{bytes_saved / rate:.0f}s" if rate else ""
+            msg += f"\nSkipped {len(skipped)} up-to-date APK(s) ({bytes_saved / (1024 * 1024):.1f} MB{saved_s} saved)"
+        self.finished.emit(True, msg)
+                
+    def stop(self): self._is_running = False
+
 class BackupThread(QThread):
     progress = Signal(str)
     finished = Signal(bool, str)
@@ -89,13 +138,11 @@ class BackupThread(QThread):
         
     def run(self):
         try:
-            total = len(self.apps)
+            store = BackupStore(self.adb, self.dest_folder)
+            batch_folder = store.new_backup_folder()
             success = 0
             fail = 0
-            import datetime
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            batch_folder = os.path.join(self.dest_folder, f"Backup_{timestamp}")
-            os.makedirs(batch_folder, exist_ok=True)
+            reused = 0
             
             if self.backup_data:
                 self.progress.emit("Backing up data (Check phone)...")
@@ -105,46 +152,67 @@ class BackupThread(QThread):
                 self.adb.execute(cmd, timeout=300)
                 if os.path.exists(backup_file): self.progress.emit("Data backup done.")
             
-            if self.backup_apk:
-                for i, app in enumerate(self.apps):
-                    if not self._is_running: break
-                    self.progress.emit(f"Extracting ({i+1}/{total}): {app.name}...")
-                    try:
-                        out = self.adb.shell(f"pm path {app.package}")
-                        paths = [l.replace("package:", "").strip() for l in out.splitlines() if l.startswith("package:")]
-                        if not paths: raise Exception("No path found")
-                        
-                        app_dir = os.path.join(batch_folder, f"{app.name}_{app.package}")
-                        os.makedirs(app_dir, exist_ok=True)
-                        
-                        for src in paths:
-                            dst = os.path.join(app_dir, os.path.basename(src) if len(paths)>1 else "base.apk")
-                            self.adb.pull_file(src, dst)
-                        success += 1
-                    except: fail += 1
+            if self.backup_apk and self._is_running:
+                # Content-addressed: only APKs not already in the blob store are pulled
+                self.progress.emit("Hashing APKs on device...")
+                manifest = store.backup(
+                    [(app.package, app.name) for app in self.apps],
+                    folder=batch_folder,
+                    on_progress=lambda done, total, name: self.progress.emit(f"Extracting ({done}/{total}): {name}..."),
+                    should_stop=lambda: not self._is_running
+                )
+                success = len(manifest["apps"])
+                fail = len(manifest["failed"])
+                reused = manifest["reused"]
             
-            self.finished.emit(True, f"Backup Complete.\nSuccess: {success}, Failed: {fail}\nSaved to: {batch_folder}")
+            self.finished.emit(True, f"Backup Complete.\nSuccess: {success}, Failed: {fail}, Reused APKs: {reused}\nSaved to: {batch_folder}")
         except Exception as e:
             self.finished.emit(False, str(e))
         self._is_running = False
 
+    def stop(self): self._is_running = False
+
 class RestoreThread(QThread):
     progress = Signal(str)
     finished = Signal(bool, str)
-    def __init__(self, adb_manager, packages):
+    def __init__(self, adb_manager, packages, devices: Optional[List[str]] = None):
         super().__init__()
         self.adb = adb_manager
         self.packages = packages
+        self.devices = devices or []  # serials; empty = current device only
         self._is_running = True
+    def _restore_on(self, adb, tag: str):
+        """One shell session per device: install-existing + unsuspend + enable, each step checked"""
+        failed = []
+        def on_result(res, done, total):
+            state = "OK" if res.ok else f"FAIL {res.detail}"
+            if not res.ok: failed.append(f"{res.package}: {res.detail}")
+            self.progress.emit(f"{tag}Restoring ({done}/{total}): {res.package} [{state}]")
+        results = BulkActionEngine(adb).run(
+            [(pkg, "restore") for pkg in self.packages],
+            on_result=on_result,
+            should_stop=lambda: not self._is_running
+        )
+        return sum(1 for r in results if r.ok), failed
     def run(self):
         try:
-             count = 0
-             for pkg in self.packages:
-                 if not self._is_running: break
-                 self.progress.emit(f"Restoring {pkg}...")
-                 self.adb.shell(f"cmd package install-existing {pkg}")
-                 count += 1
-             self.finished.emit(True, f"Restored {count} apps.")
+            total = len(self.packages)
+            if len(self.devices) <= 1:
+                adb = self.adb.for_device(self.devices[0]) if self.devices else self.adb
+                count, failed = self._restore_on(adb, "")
+                msg = f"Restored {count}/{total} apps."
+                if failed: msg += "\n" + "\n".join(failed[:5])
+                self.finished.emit(count == total, msg)
+                return
+            # Same list onto every device at once; each serial gets its own device-bound manager
+            with ThreadPoolExecutor(max_workers=len(self.devices)) as pool:
+                outcomes = list(pool.map(
+                    lambda serial: self._restore_on(self.adb.for_device(serial), f"[{serial}] "), self.devices))
+            lines = []
+            for serial, (count, failed) in zip(self.devices, outcomes):
+                lines.append(f"{serial}: {count}/{total}")
+                lines += [f"  {f}" for f in failed[:3]]
+            self.finished.emit(all(count == total for count, _ in outcomes), "Restored apps.\n" + "\n".join(lines))
         except Exception as e: self.finished.emit(False, str(e))
     def stop(self): self._is_running = False
 
@@ -225,95 +293,27 @@ class SmartAppActionThread(QThread):
         self._is_running = True
 
     def run(self):
-        print(f"DEBUG: SmartAppActionThread.run started. Mode={self.mode}, Apps={[a.package for a in self.apps]}")
         try:
             total = len(self.apps)
-            success_count = 0
-            failed = []
-            
-            for i, app in enumerate(self.apps):
-                if not self._is_running: break
-                self.progress.emit(f"Handling ({i+1}/{total}): {app.name}...")
-                
-                result_msg = ""
-                is_ok = False
-                
-                if self.mode == "uninstall":
-                    # Method 1: Standard Uninstall
-                    res = self.adb.shell(f"pm uninstall {app.package}")
-                    if "Success" in res: is_ok = True
-                    else:
-                        # Method 2: Uninstall User (Keep Data/System)
-                        res = self.adb.shell(f"pm uninstall -k --user 0 {app.package}")
-                        if "Success" in res: is_ok = True
-                
-                elif self.mode == "disable":
-                    # AGGRESSIVE CASCADE for Xiaomi/HyperOS stubborn apps
-                    is_system = app.is_system if hasattr(app, 'is_system') else False
-                    
-                    if is_system:
-                        # System apps: Try disable first, then uninstall, then aggressive methods
-                        methods = [
-                            (f"pm disable-user --user 0 {app.package}", "Disable User", ["disabled", "new state"]),
-                            (f"pm uninstall -k --user 0 {app.package}", "Uninstall User", ["Success", "uninstalled"]),
-                            (f"pm disable {app.package}", "Disable (Root)", ["disabled", "new state"]),
-                            (f"pm hide {app.package}", "Hide", ["true", "hidden"]),
-                            (f"pm clear {app.package}", "Clear Data", ["Success"]),
-                            (f"am force-stop {app.package}", "Force Stop", [""])  # force-stop doesn't output success
-                        ]
-                    else:
-                        # User apps: Prioritize uninstall
-                        methods = [
-                            (f"pm uninstall {app.package}", "Uninstall", ["Success"]),
-                            (f"pm uninstall -k --user 0 {app.package}", "Uninstall User", ["Success", "uninstalled"]),
-                            (f"pm disable-user --user 0 {app.package}", "Disable User", ["disabled", "new state"])
-                        ]
-                    
-                    for cmd, label, success_keywords in methods:
-                        try:
-                            print(f"DEBUG: Trying {label}: {cmd}")
-                            res = self.adb.shell(cmd, check=False, log_error=False)  # Don't log errors for cascade attempts
-                            print(f"DEBUG: {label} response: {res[:150]}")
-                            
-                            # Check for success - look for any success keyword in response
-                            res_lower = res.lower()
-                            if any(keyword.lower() in res_lower for keyword in success_keywords if keyword):
-                                is_ok = True
-                                result_msg = f"Success via {label}"
-                                print(f"DEBUG: ✓ {label} succeeded")
-                                break
-                            
-                            # For force-stop, if no error then consider success
-                            if label == "Force Stop" and "error" not in res_lower and "exception" not in res_lower:
-                                is_ok = True
-                                result_msg = f"Success via {label}"
-                                print(f"DEBUG: ✓ {label} succeeded (no error)")
-                                break
-                                 
-                            result_msg = res
-                            print(f"DEBUG: ✗ {label} did not succeed, trying next method...")
-                            
-                        except Exception as e:
-                            error_str = str(e)
-                            print(f"DEBUG: ✗ {label} raised exception: {error_str[:100]}")
-                            result_msg = error_str
-                            continue
-                
-                elif self.mode == "enable":
-                    self.adb.shell(f"cmd package unsuspend --user 0 {app.package}")
-                    res = self.adb.shell(f"pm enable {app.package}")
-                    if "enabled" in res.lower() or "new state" in res.lower(): is_ok = True
-                    else:
-                        res = self.adb.shell(f"cmd package install-existing {app.package}")
-                        if "installed" in res.lower(): is_ok = True
+            names = {app.package: app.name for app in self.apps}
+            # One device-side script covers every app and its whole fallback cascade
+            items = [(app.package, cascade_key(self.mode, getattr(app, 'is_system', False))) for app in self.apps]
+
+            def on_result(res, done, total_):
+                state = f"✓ {res.label}" if res.ok else "✗"
+                self.progress.emit(f"Handling ({done}/{total_}): {names.get(res.package, res.package)} {state}")
 
-                if is_ok: success_count += 1
-                else: failed.append(f"{app.name}: {result_msg.strip()}")
+            results = BulkActionEngine(self.adb).run(
+                items, on_result=on_result, should_stop=lambda: not self._is_running
+            )
+            ok = [r for r in results if r.ok]
+            failed = [f"{names.get(r.package, r.package)}: {r.detail}" for r in results if not r.ok]
 
-            summary = f"Success: {success_count}/{total}"
+            summary = f"Success: {len(ok)}/{total}"
+            if total == 1 and ok: summary += f"\nSuccess via {ok[0].label}"
             if failed: summary += "\nFailed: " + ", ".join(failed[:2])
             
-            self.finished.emit(success_count > 0, summary)
+            self.finished.emit(len(ok) > 0, summary)
             
         except Exception as e:
             self.finished.emit(False, str(e))
@@ -1,57 +1,58 @@
 from PySide6.QtCore import QThread, Signal
+from src.core.debloat_planner import DebloatPlanner
+from src.core.bulk_actions import BulkActionEngine
 
 class DebloatWorker(QThread):
-    """Background worker for debloating"""
+    """
+    Background worker for debloating.
+    Fetches package state once, builds a DebloatPlan (dry run) and, unless
+    dry_run is set, executes only the packages that still need work.
+    """
     progress = Signal(str)
+    plan_ready = Signal(object)  # DebloatPlan
     finished = Signal()
     
-    def __init__(self, adb, packages):
+    def __init__(self, adb, packages, plan=None, dry_run=False):
         super().__init__()
         self.adb = adb
         self.packages = packages
+        self.plan = plan
+        self.dry_run = dry_run
         self._is_running = True
         
     def run(self):
-        for package in self.packages:
-            if not self._is_running:
-                break
+        try:
+            if self.plan is None:
+                self.progress.emit("Đang đọc trạng thái ứng dụng...")
+                self.plan = DebloatPlanner(self.adb).plan(self.packages)
+            self.plan_ready.emit(self.plan)
             
-            try:
-                self.progress.emit(f"Đang xử lý: {package}...")
-                # Uninstall for user 0 (safe removal - Archive)
-                result = self.adb.shell(f"pm uninstall --user 0 {package}")
+            if self.dry_run or not self._is_running:
+                return
                 
-                if "success" in result.lower():
-                    self.progress.emit(f"✅ Đã gỡ: {package}")
-                elif "not installed" in result.lower():
-                    self.progress.emit(f"👌 Đã gỡ trước đó: {package}")
+            for pkg in self.plan.already_done:
+                self.progress.emit(f"👌 Đã gỡ trước đó: {pkg}")
+            for pkg in self.plan.absent:
+                self.progress.emit(f"➖ Không có trên máy: {pkg}")
+                
+            def on_result(res, done, total):
+                if not res.ok:
+                    if "SecurityException" in res.detail:
+                        self.progress.emit(f"🔒 App hệ thống được bảo vệ: {res.package}")
+                    else:
+                        self.progress.emit(f"❌ Không thể gỡ/tắt: {res.package}")
+                elif res.label == "Disable User":
+                    self.progress.emit(f"⚠️ Đã tắt: {res.package}")
                 else:
-                    # Try disable if uninstall fails (rarely needed if uninstall failed, but sometimes meaningful)
-                    # But on HyperOS, disable is often more restricted than uninstall.
-                    
-                    # Check if System app
-                    # If uninstall failed, it might be a protected system app that CANNOT be uninstalled or disabled without root.
+                    self.progress.emit(f"✅ Đã gỡ: {res.package}")
                     
-                    try:
-                        res_disable = self.adb.shell(f"pm disable-user --user 0 {package}")
-                        if "new state" in res_disable.lower() or "disabled" in res_disable.lower():
-                             self.progress.emit(f"⚠️ Đã tắt: {package}")
-                        else:
-                             # Check for specific security error
-                             if "SecurityException" in res_disable:
-                                 self.progress.emit(f"🔒 App hệ thống được bảo vệ: {package}")
-                             else:
-                                 self.progress.emit(f"❌ Không thể gỡ/tắt: {package}")
-                    except Exception as e_dis:
-                         if "SecurityException" in str(e_dis):
-                             self.progress.emit(f"🔒 App hệ thống được bảo vệ: {package}")
-                         else:
-                             self.progress.emit(f"❌ Lỗi khi tắt: {package}")
-                    
-            except Exception as e:
-                self.progress.emit(f"❌ Lỗi {package}: {e}")
-                
-        self.finished.emit()
+            BulkActionEngine(self.adb).run(
+                self.plan.items(), on_result=on_result, should_stop=lambda: not self._is_running
+            )
+        except Exception as e:
+            self.progress.emit(f"❌ Lỗi: {e}")
+        finally:
+            self.finished.emit()
         
     def stop(self):
         self._is_running = False
@@ -1,15 +1,35 @@
 from PySide6.QtCore import QThread, Signal, QMutex, QWaitCondition
 import os
 import re
+import shlex
+import threading
 from src.data.file_data import FileEntry
+from src.core.adb.shell_session import ShellSession
+from src.core.listing_cache import ListingCache, parent_path
+from src.core.folder_size import FolderSizeCache, FolderSizeEngine
+from src.core.stat_listing import listing_script, parse_listing, iter_listings, format_size, LINKS_MARKER
+
+PREFETCH_LIMIT = 6  # folders per speculative batch
+BULK_ACTIONS = {"mkdir", "delete", "rename", "copy", "move"}  # write ops: own lane
+
+class _BulkLane(QThread):
+    """Second lane for write operations, so a long cp -r never blocks listings"""
+    def __init__(self, worker):
+        super().__init__()
+        self.worker = worker
+
+    def run(self):
+        self.worker._run_lane(self.worker._bulk_queue, self.worker._bulk_session)
 
 class FileWorker(QThread):
     """
     Worker thread to handle ADB file operations.
-    Supports operation queueing and detailed file listing.
+    Two lanes, each with its own persistent shell session: this thread runs
+    interactive work (listings, storage info, idle prefetch); write operations
+    run on a bulk lane. A newer listing request cancels superseded ones.
     """
     # Signals
-    listing_ready = Signal(list)     # Returns List[FileEntry]
+    listing_ready = Signal(str, list) # Path, List[FileEntry]
     storages_ready = Signal(list)    # Returns List[FileEntry]
     usage_ready = Signal(float, float) # Total GB, Used GB
     op_finished = Signal(bool, str)  # Success, Message
@@ -21,10 +41,64 @@ class FileWorker(QThread):
         self._queue = []
         self._running = False
         self._mutex = QMutex()
+        self.cache = ListingCache()
+        self.sizes = FolderSizeCache()  # shared with FolderSizeWorker
+        self._prefetch = []
+        self._prefetch_abort = False
+        self._list_gen = 0
+        self._bulk_queue = []
+        self._session = ShellSession(adb_manager)
+        self._bulk_session = ShellSession(adb_manager)
+        self._bulk = _BulkLane(self)
+        self._tls = threading.local()
+
+    @property
+    def _params(self):
+        # Per lane (thread-local): both lanes run _do_* methods concurrently
+        return self._tls.params
+
+    @_params.setter
+    def _params(self, value):
+        self._tls.params = value
+
+    def _shell(self, command, *args, **kwargs):
+        """Run on the current lane's persistent session"""
+        return self._tls.session.run(command)
         
-    def list_files(self, path):
+    def list_files(self, path, force=False):
+        """Serve from cache when possible; stale hits are shown then revalidated"""
+        if not force:
+            entries, fresh = self.cache.get(self.adb.current_device, path)
+            if entries is not None:
+                self.listing_ready.emit(path, entries)
+                if fresh: return
+                self.run_action("list", path=path, revalidate=True)
+                return
         self.run_action("list", path=path)
             
+    def prefetch(self, paths):
+        """
+        Low priority: list likely next folders in ONE shell session, only while
+        no user action is queued. A newer request replaces the pending one.
+        """
+        device = self.adb.current_device
+        todo = []
+        for p in paths:
+            _, fresh = self.cache.get(device, p)
+            if not fresh and p not in todo: todo.append(p)
+        self._mutex.lock()
+        self._prefetch = todo[:PREFETCH_LIMIT]
+        self._prefetch_abort = False
+        self._mutex.unlock()
+        if todo and not self.isRunning():
+            self.start()
+
+    def cancel_prefetch(self):
+        self._mutex.lock()
+        self._prefetch = []
+        self._prefetch_abort = True
+        self._mutex.unlock()
+
     def list_storages(self):
         self.run_action("list_storages")
 
@@ -35,7 +109,11 @@ class FileWorker(QThread):
         self.run_action("mkdir", path=path)
         
     def delete_item(self, path):
-        self.run_action("delete", path=path)
+        self.run_action("delete", paths=[path])
+
+    def delete_items(self, paths):
+        """Many paths in one queued operation (one rm per 100 paths)"""
+        self.run_action("delete", paths=list(paths))
         
     def rename_item(self, src, dst):
         self.run_action("rename", src=src, dst=dst)
@@ -47,43 +125,67 @@ class FileWorker(QThread):
         self.run_action("move", src=src, dst=dst)
 
     def run_action(self, action, **kwargs):
+        bulk = action in BULK_ACTIONS
         self._mutex.lock()
-        self._queue.append((action, kwargs))
+        if bulk:
+            self._bulk_queue.append((action, kwargs))
+        else:
+            if action == "list":
+                # Only the newest listing matters: drop queued ones, abort the running one
+                self._list_gen += 1
+                kwargs["gen"] = self._list_gen
+                self._queue[:] = [q for q in self._queue if q[0] != "list"]
+            self._queue.append((action, kwargs))
         self._mutex.unlock()
         
-        if not self.isRunning():
-            self.start()
+        lane = self._bulk if bulk else self
+        if not lane.isRunning():
+            lane.start()
         
     def run(self):
-        """Execute queued actions one by one"""
+        """Interactive lane"""
+        self._run_lane(self._queue, self._session, idle=self._run_prefetch)
+
+    def _run_prefetch(self):
+        # Idle: run speculative listings, never ahead of user actions
+        self._mutex.lock()
+        prefetch, self._prefetch = self._prefetch, []
+        self._mutex.unlock()
+        if not prefetch:
+            return False
+        try: self._do_prefetch(prefetch)
+        except Exception as e: print(f"FileWorker: prefetch failed: {e}")
+        return True
+
+    def _run_lane(self, queue, session, idle=None):
+        """Execute a lane's queued actions one by one"""
+        self._tls.session = session
+        handlers = {
+            "list": self._do_list,
+            "list_storages": self._do_list_storages,
+            "get_usage": self._do_get_usage,
+            "mkdir": self._do_mkdir,
+            "delete": self._do_delete,
+            "rename": self._do_rename,
+            "copy": self._do_copy,
+            "move": self._do_move,
+        }
         while True:
             self._mutex.lock()
-            if not self._queue:
+            if not queue:
                 self._mutex.unlock()
+                if idle and idle():
+                    continue
                 break
-            action, params = self._queue.pop(0)
+            action, params = queue.pop(0)
             self._mutex.unlock()
             
-            self._params = params # Legacy support for internal methods
+            self._params = params
             self._running = True
             
             try:
-                if action == "list":
-                    self._do_list()
-                elif action == "list_storages":
-                    self._do_list_storages()
-                elif action == "get_usage":
-                    self._do_get_usage()
-                elif action == "mkdir":
-                    self._do_mkdir()
-                elif action == "delete":
-                    self._do_delete()
-                elif action == "rename":
-                    self._do_rename()
-                elif action == "copy":
-                    self._do_copy()
-                elif action == "move":
-                    self._do_move()
+                handler = handlers.get(action)
+                if handler: handler()
             except Exception as e:
                 self.op_finished.emit(False, str(e))
             finally:
@@ -100,7 +202,7 @@ class FileWorker(QThread):
 
         # 2. Check for SD Card / OTG via 'df'
         # df output: Filesystem 1K-blocks Used Available Use% Mounted on
-        df_out = self.adb.shell("df")
+        df_out = self._shell("df")
         if df_out and "error" not in df_out.lower():
             lines = df_out.strip().split('\n')
             for line in lines:
@@ -120,7 +222,7 @@ class FileWorker(QThread):
         # 3. Fallback: ls /storage if df missed something or failed
         # Only add if not already present
         existing_paths = [e.path for e in entries]
-        ls_out = self.adb.shell("ls /storage")
+        ls_out = self._shell("ls /storage")
         if ls_out and "No such" not in ls_out and "permission denied" not in ls_out.lower():
             for line in ls_out.split():
                 line = line.strip()
@@ -137,7 +239,7 @@ class FileWorker(QThread):
              if not path: path = "/data"
              
              # df <path>
-             out = self.adb.shell(f"df \"{path}\"")
+             out = self._shell(f"df {shlex.quote(path)}")
              if out and "error" not in out.lower():
                  lines = out.strip().split('\n')
                  # Last line usually contains the data
@@ -181,21 +283,51 @@ class FileWorker(QThread):
 
     def _do_list(self):
         path = self._params["path"]
-        # Use ls -l to get details.
-        
-        # FIX: Handle spaces in path for the command itself
-        cmd = f"ls -l \"{path}\""
-        output = self.adb.shell(cmd, log_error=False)
-        
-        entries = []
-        
-        # Error handling: If ls -l fails (e.g. Permission denied on the folder itself, or empty), we might get empty output.
-        if not output or "No such" in output:
-             # Just emit empty list or handle specific errors if needed
-             # If it's a "No such file", maybe path is wrong.
-             self.listing_ready.emit([]) 
-             return
+        # Machine-readable stat listing (one session); ls -l heuristics only without stat
+        gen = self._params.get("gen")
+        lines = []
+        stream = self._tls.session.stream_script(listing_script(path))
+        try:
+            for line in stream:
+                if gen is not None and gen != self._list_gen:
+                    return  # superseded: the user already opened another folder
+                lines.append(line)
+        finally:
+            stream.close()
+        output = "\n".join(lines) + "\n"
+        entries = parse_listing(path, output)
+        if entries is not None and LINKS_MARKER not in output:
+            # cd failed: missing folder, permission denied or no device
+            self.cache.invalidate(self.adb.current_device, path)
+            self.listing_ready.emit(path, [])
+            return
+
+        if entries is None:
+            # FIX: Handle spaces in path for the command itself
+            output = self._shell(f"ls -l {shlex.quote(path)}")
+            # Error handling: If ls -l fails (e.g. Permission denied on the folder itself, or empty), we might get empty output.
+            if not output or "No such" in output:
+                self.cache.invalidate(self.adb.current_device, path)
+                self.listing_ready.emit(path, [])
+                return
+            entries = self._parse_ls(path, output)
 
+        cached, _ = self.cache.get(self.adb.current_device, path)
+        self.cache.put(self.adb.current_device, path, entries)
+        # Revalidation of a stale hit: only repaint if something actually changed
+        if self._params.get("revalidate") and cached == entries:
+            return
+        self.listing_ready.emit(path, entries)
+
+    def _do_prefetch(self, paths):
+        """List all folders in one session; abandon as soon as user work arrives"""
+        device = self.adb.current_device
+        for path, entries in iter_listings(self._tls.session, paths, should_stop=lambda: bool(self._queue) or self._prefetch_abort):
+            self.cache.put(device, path, entries)
+
+    def _parse_ls(self, path, output):
+        """Parse `ls -l <path>` output into sorted FileEntry list"""
+        entries = []
         lines = output.strip().split('\n')
         for line in lines:
             line = line.strip()
@@ -264,15 +396,9 @@ class FileWorker(QThread):
             
             # Size formatting
             size_str = ""
+            size_bytes = int(size) if size.isdigit() else 0
             if not is_dir:
-                try:
-                    sz = int(size)
-                    if sz < 1024: size_str = f"{sz} B"
-                    elif sz < 1024*1024: size_str = f"{sz/1024:.1f} KB"
-                    elif sz < 1024*1024*1024: size_str = f"{sz/(1024*1024):.1f} MB"
-                    else: size_str = f"{sz/(1024*1024*1024):.1f} GB"
-                except:
-                    size_str = size
+                size_str = format_size(size_bytes) if size.isdigit() else size
             
             entries.append(FileEntry(
                 name=name,
@@ -280,52 +406,131 @@ class FileWorker(QThread):
                 is_dir=is_dir,
                 size=size_str,
                 date=date,
-                permissions=perms
+                permissions=perms,
+                size_bytes=size_bytes
             ))
 
         # Sort: Dirs first, then Files
         entries.sort(key=lambda x: (not x.is_dir, x.name.lower()))
-        self.listing_ready.emit(entries)
+        return entries
         
     def _do_mkdir(self):
         path = self._params["path"]
-        res = self.adb.shell(f"mkdir \"{path}\"")
+        res = self._shell(f"mkdir {shlex.quote(path)}")
         if "error" in res.lower():
              self.op_finished.emit(False, f"Lỗi tạo thư mục: {res}")
         else:
+             self.cache.invalidate(self.adb.current_device, parent_path(path))
+             self.sizes.invalidate(self.adb.current_device, path)
              self.op_finished.emit(True, "Đã tạo thư mục")
 
     def _do_delete(self):
-        path = self._params["path"]
-        res = self.adb.shell(f"rm -rf \"{path}\"")
+        paths = self._params["paths"]
+        res = "\n".join(self._shell("rm -rf " + " ".join(shlex.quote(p) for p in paths[i:i + 100]))
+                        for i in range(0, len(paths), 100))
+        for path in paths:
+            self.cache.invalidate_tree(self.adb.current_device, path)
+            self.cache.invalidate(self.adb.current_device, parent_path(path))
+            self.sizes.invalidate(self.adb.current_device, path)
         if "error" in res.lower() or "permission denied" in res.lower():
             self.op_finished.emit(False, f"Lỗi xóa: {res}")
         else:
-            self.op_finished.emit(True, "Đã xóa thành công")
+            self.op_finished.emit(True, "Đã xóa thành công" if len(paths) == 1 else f"Đã xóa {len(paths)} mục")
             
     def _do_rename(self):
         src = self._params["src"]
         dst = self._params["dst"]
-        res = self.adb.shell(f"mv \"{src}\" \"{dst}\"")
+        res = self._shell(f"mv {shlex.quote(src)} {shlex.quote(dst)}")
         if "error" in res.lower():
             self.op_finished.emit(False, f"Lỗi đổi tên: {res}")
         else:
+            self._invalidate_move(src, dst)
             self.op_finished.emit(True, "Đã đổi tên")
 
     def _do_copy(self):
         src = self._params["src"]
         dst = self._params["dst"]
-        res = self.adb.shell(f"cp -r \"{src}\" \"{dst}\"")
+        res = self._shell(f"cp -r {shlex.quote(src)} {shlex.quote(dst)}")
         if "error" in res.lower():
             self.op_finished.emit(False, f"Lỗi sao chép: {res}")
         else:
+            # dst may be an existing folder the copy landed inside
+            self.cache.invalidate_tree(self.adb.current_device, dst)
+            self.cache.invalidate(self.adb.current_device, parent_path(dst))
+            self.sizes.invalidate(self.adb.current_device, dst)
             self.op_finished.emit(True, "Đã sao chép")
 
     def _do_move(self):
         src = self._params["src"]
         dst = self._params["dst"]
-        res = self.adb.shell(f"mv \"{src}\" \"{dst}\"")
+        res = self._shell(f"mv {shlex.quote(src)} {shlex.quote(dst)}")
         if "error" in res.lower():
             self.op_finished.emit(False, f"Lỗi di chuyển: {res}")
         else:
+            self._invalidate_move(src, dst)
             self.op_finished.emit(True, "Đã di chuyển")
+
+    def _invalidate_move(self, src, dst):
+        """mv: both parents change, the moved subtree's cached paths are gone"""
+        device = self.adb.current_device
+        self.cache.invalidate_tree(device, src)
+        self.cache.invalidate_tree(device, dst)
+        self.cache.invalidate(device, parent_path(src), parent_path(dst))
+        self.sizes.invalidate(device, src, dst)
+
+
+class FolderSizeWorker(QThread):
+    """
+    Background lane for recursive folder sizes (du), separate from FileWorker
+    so navigation is never queued behind a scan. A new scan supersedes the running one.
+    """
+    size_ready = Signal(str, object)  # Path, bytes (may exceed 2 GB)
+    scan_finished = Signal(str)       # Root path
+
+    def __init__(self, adb_manager, cache=None):
+        super().__init__()
+        self.engine = FolderSizeEngine(adb_manager, cache)
+        self._pending = None
+        self._cancel = False
+        self._active = False  # run() owns the queue; decided under _mutex together with _pending
+        self._mutex = QMutex()
+
+    @property
+    def cache(self):
+        return self.engine.cache
+
+    def scan(self, path, depth=1):
+        self._mutex.lock()
+        self._pending = (path, depth)
+        self._cancel = True
+        start = not self._active
+        self._active = True
+        self._mutex.unlock()
+        if start:
+            # run() already gave up the queue; the thread may still be unwinding
+            self.wait()
+            self.start()
+
+    def cancel(self):
+        self._mutex.lock()
+        self._pending = None
+        self._cancel = True
+        self._mutex.unlock()
+
+    def run(self):
+        while True:
+            self._mutex.lock()
+            job, self._pending = self._pending, None
+            self._cancel = False
+            if job is None:
+                self._active = False
+                self._mutex.unlock()
+                break
+            self._mutex.unlock()
+            path, depth = job
+            try:
+                self.engine.scan(path, depth, on_result=self.size_ready.emit, should_stop=lambda: self._cancel)
+            except Exception as e:
+                print(f"FolderSizeWorker: {e}")
+            if not self._cancel:
+                self.scan_finished.emit(path)
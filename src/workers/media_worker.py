@@ -0,0 +1,14 @@
+from PySide6.QtCore import QThread, Signal
+from src.core.media_store import MediaStoreSource
+
+
+class GalleryWorker(QThread):
+    """Runs the MediaStore query once (images + videos) off the UI thread"""
+    loaded = Signal(int)  # Number of media rows
+
+    def __init__(self, source: MediaStoreSource):
+        super().__init__()
+        self.source = source
+
+    def run(self):
+        self.loaded.emit(self.source.load())
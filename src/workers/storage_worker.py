@@ -0,0 +1,74 @@
+from PySide6.QtCore import QThread, Signal
+from src.core.file_index import FileIndexer, DEFAULT_ROOT
+from src.core.duplicate_finder import DuplicateFinder
+from src.core.storage_tree import StorageScanner
+
+
+class IndexWorker(QThread):
+    """Incremental refresh of the whole-storage search index"""
+    progress = Signal(int, int)  # Changed folders done, total
+    finished = Signal(dict)      # Stats
+
+    def __init__(self, adb_manager, index, root=DEFAULT_ROOT):
+        super().__init__()
+        self.adb = adb_manager
+        self.index = index
+        self.root = root
+        self._is_running = True
+
+    def run(self):
+        try:
+            stats = FileIndexer(self.adb, self.index).refresh(
+                self.root, on_progress=self.progress.emit, should_stop=lambda: not self._is_running)
+        except Exception as e:
+            print(f"IndexWorker: {e}")
+            stats = {}
+        self.finished.emit(stats)
+
+    def stop(self): self._is_running = False
+
+
+class DuplicateWorker(QThread):
+    """Duplicate scan: size buckets, then partial and full md5 on the device"""
+    progress = Signal(str, int, int)  # Stage, done, total
+    finished = Signal(list)           # List[DuplicateGroup]
+
+    def __init__(self, adb_manager, root=DEFAULT_ROOT):
+        super().__init__()
+        self.adb = adb_manager
+        self.root = root
+        self._is_running = True
+
+    def run(self):
+        try:
+            groups = DuplicateFinder(self.adb).scan(
+                self.root, on_progress=self.progress.emit, should_stop=lambda: not self._is_running)
+        except Exception as e:
+            print(f"DuplicateWorker: {e}")
+            groups = []
+        self.finished.emit(groups)
+
+    def stop(self): self._is_running = False
+
+
+class StorageScanWorker(QThread):
+    """Storage tree scan; `updated` fires while sizes stream in so the treemap can repaint"""
+    updated = Signal()
+    finished = Signal(dict)  # Stats
+
+    def __init__(self, adb_manager, tree):
+        super().__init__()
+        self.adb = adb_manager
+        self.tree = tree
+        self._is_running = True
+
+    def run(self):
+        try:
+            stats = StorageScanner(self.adb).scan(
+                self.tree, on_update=self.updated.emit, should_stop=lambda: not self._is_running)
+        except Exception as e:
+            print(f"StorageScanWorker: {e}")
+            stats = {}
+        self.finished.emit(stats)
+
+    def stop(self): self._is_running = False
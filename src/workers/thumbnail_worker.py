@@ -0,0 +1,125 @@
+from PySide6.QtCore import QObject, Signal, QByteArray, QBuffer, QIODevice, QSize, Qt
+from PySide6.QtGui import QImage, QImageReader
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import shlex
+import threading
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.heic')
+
+
+def is_image(entry):
+    return not entry.is_dir and entry.name.lower().endswith(IMAGE_EXTS)
+
+
+class ThumbnailService(QObject):
+    """
+    Thumbnails for the grid view: visible images are fetched over exec-out on a
+    bounded pool, decoded downscaled (QImageReader.setScaledSize) and cached on
+    disk keyed by device + path + size + mtime, so a changed file gets a new thumbnail.
+    """
+    thumb_ready = Signal(str, QImage)   # Remote path, thumbnail
+    preview_ready = Signal(str, str)    # Remote path, local file ('' on failure)
+
+    def __init__(self, adb_manager, cache_dir, thumb_size=96, workers=4):
+        super().__init__()
+        self.adb = adb_manager
+        self.thumb_size = thumb_size
+        self.thumb_dir = os.path.join(cache_dir, "thumbs")
+        self.preview_dir = os.path.join(cache_dir, "previews")
+        os.makedirs(self.thumb_dir, exist_ok=True)
+        os.makedirs(self.preview_dir, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._preview_pool = ThreadPoolExecutor(max_workers=1)  # never queued behind thumbnails
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self._generation = 0
+
+    def _key(self, entry, extra=""):
+        raw = f"{self.adb.current_device}|{entry.path}|{entry.size_bytes}|{entry.mtime}|{extra}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def thumb_path(self, entry):
+        return os.path.join(self.thumb_dir, f"{self._key(entry, self.thumb_size)}.png")
+
+    def cached(self, entry):
+        """Disk-cached thumbnail or None (hash + PNG decode: call from the pool, not per row on the UI thread)"""
+        path = self.thumb_path(entry)
+        if os.path.exists(path):
+            img = QImage(path)
+            if not img.isNull(): return img
+        return None
+
+    def request(self, entries):
+        """Queue thumbnails for these (visible) entries; older pending requests are dropped"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        for entry in entries:
+            if not is_image(entry): continue
+            with self._lock:
+                if entry.path in self._inflight: continue
+                self._inflight.add(entry.path)
+            self._pool.submit(self._make_thumb, entry, generation)
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+
+    def _read(self, remote):
+        return self.adb.exec_out([f"cat {shlex.quote(remote)} 2>/dev/null"])
+
+    def _make_thumb(self, entry, generation):
+        try:
+            if generation != self._generation:
+                return  # scrolled/navigated away before this job started
+            img = self.cached(entry)
+            if img is not None:
+                self.thumb_ready.emit(entry.path, img)
+                return
+            data = self._read(entry.path)
+            buf = QBuffer()
+            buf.setData(QByteArray(data))
+            buf.open(QIODevice.ReadOnly)
+            reader = QImageReader(buf)
+            reader.setAutoTransform(True)
+            full = reader.size()
+            if full.isValid():
+                # Decoder downsamples while reading: far less memory/CPU than scaling a full QImage
+                reader.setScaledSize(full.scaled(QSize(self.thumb_size, self.thumb_size), Qt.KeepAspectRatio))
+            img = reader.read()
+            if img.isNull():
+                return
+            img.save(self.thumb_path(entry), "PNG")
+            self.thumb_ready.emit(entry.path, img)
+        except Exception as e:
+            print(f"ThumbnailService: {entry.path}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.discard(entry.path)
+
+    def fetch_preview(self, entry):
+        """Full image for the preview dialog, pulled off the UI thread into a keyed cache file"""
+        local = os.path.join(self.preview_dir, f"{self._key(entry)}_{entry.name}")
+        if os.path.exists(local) and (not entry.size_bytes or os.path.getsize(local) == entry.size_bytes):
+            self.preview_ready.emit(entry.path, local)
+            return
+        self._preview_pool.submit(self._pull_preview, entry, local)
+
+    def _pull_preview(self, entry, local):
+        tmp = local + ".part"
+        try:
+            self.adb.pull_file(entry.path, tmp)
+            if os.path.exists(tmp):
+                os.replace(tmp, local)
+                self.preview_ready.emit(entry.path, local)
+                return
+        except Exception as e:
+            print(f"ThumbnailService: preview {entry.path}: {e}")
+        self.preview_ready.emit(entry.path, "")
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.shutdown(wait=False)
+        self._preview_pool.shutdown(wait=False)
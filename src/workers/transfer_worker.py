@@ -0,0 +1,219 @@
+from PySide6.QtCore import QThread, Signal
+import os
+import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.core.adb.adb_manager import parse_sync_stats, sync_error
+from src.core.transfer_engine import TransferEngine, TransferError, TransferResult
+from src.core.sync_engine import SyncEngine, LARGE_FILE
+from src.core.tar_transfer import TarTransfer, has_tar, should_use_tar, local_tree_stats, remote_tree_stats
+
+
+class TransferThread(QThread):
+    """
+    Resumable, checksum-verified transfers. jobs: list of ("pull"|"push", src, dst).
+    Folders of many small files go as one tar stream, other folders via adb pull/push.
+    Over wireless links compressible files use adb's compressed sync when both ends support it.
+    """
+    progress = Signal(object, object, float, str)  # Done bytes, total bytes, bytes/s, file name
+    measured = Signal(str, str, float)             # File name, method, effective bytes/s
+    finished = Signal(bool, str)
+
+    def __init__(self, adb_manager, jobs, compress=None):
+        super().__init__()
+        self.adb = adb_manager
+        self.jobs = jobs
+        # Compress tar streams / prefer compressed sync; default: only over wireless
+        self.compress = adb_manager.is_wireless() if compress is None else compress
+        self._is_running = True
+
+    def run(self):
+        engine = TransferEngine(self.adb, should_stop=lambda: not self._is_running)
+        done, failures = 0, []
+        totals = {}  # method -> [bytes, seconds]
+        for direction, src, dst in self.jobs:
+            if not self._is_running: break
+            name = os.path.basename(src.rstrip("/"))
+            engine.on_progress = lambda d, t, r, name=name: self.progress.emit(d, t, r, name)
+            try:
+                if direction == "push" and os.path.isdir(src):
+                    res = self._push_dir(src, dst, engine.on_progress)
+                elif direction == "pull" and self._is_dir(src):
+                    res = self._pull_dir(src, dst, engine.on_progress)
+                elif self.compress and self.adb.sync_compression(src)[:1] == ["-z"]:
+                    res = self._sync(direction, src, dst)
+                else:
+                    res = engine.pull(src, dst) if direction == "pull" else engine.push(src, dst)
+                    res.detail = "dd"
+                if not res.ok: break  # cancelled; dd journal kept for resume
+                done += 1
+                if res.seconds > 0 and res.size:
+                    moved = res.size - res.resumed_from
+                    self.measured.emit(name, res.detail, moved / res.seconds)
+                    acc = totals.setdefault(res.detail, [0, 0.0])
+                    acc[0] += moved
+                    acc[1] += res.seconds
+            except TransferError as e:
+                failures.append(str(e))
+        rates = ", ".join(f"{m}: {b / t / (1024 * 1024):.1f} MB/s" for m, (b, t) in totals.items() if t > 0)
+        rate = f" ({rates})" if rates else ""
+        if failures:
+            self.finished.emit(False, f"Hoàn tất {done}/{len(self.jobs)}. Lỗi:\n" + "\n".join(failures[:3]))
+        elif not self._is_running:
+            self.finished.emit(False, f"Đã dừng ({done}/{len(self.jobs)}), có thể tiếp tục lần sau")
+        else:
+            self.finished.emit(True, f"Đã chuyển {done} mục{rate}")
+
+    def _sync(self, direction, src, dst):
+        """Plain adb push/pull (compressed when negotiated), timed by adb's own summary"""
+        flags = self.adb.sync_compression(src)
+        out = self.adb.push_file(src, dst) if direction == "push" else self.adb.pull_file(src, dst)
+        if sync_error(out):  # adb's own "adb: error:" lines, not file names that contain "error"
+            raise TransferError(sync_error(out))
+        size, seconds = parse_sync_stats(out)
+        return TransferResult(True, size, seconds, detail="sync" + (f"+{flags[1]}" if flags[:1] == ["-z"] else ""))
+
+    def _tar(self, on_progress):
+        return TarTransfer(self.adb, on_progress, should_stop=lambda: not self._is_running, compress=self.compress)
+
+    def _pull_dir(self, src, dst, on_progress):
+        if not should_use_tar(*remote_tree_stats(self.adb, src)):
+            return self._sync("pull", src, dst)
+        return self._tar(on_progress).pull(src, os.path.dirname(dst))
+
+    def _push_dir(self, src, dst, on_progress):
+        if not should_use_tar(*local_tree_stats(src)):
+            return self._sync("push", src, dst)
+        return self._tar(on_progress).push(src, dst.rsplit("/", 1)[0] or "/")
+
+    def _is_dir(self, remote):
+        return "dir" in self.adb.exec_out([f"[ -d {shlex.quote(remote)} ] && echo dir"]).decode(errors="replace")
+
+    def stop(self): self._is_running = False
+
+
+class UploadThread(QThread):
+    """
+    Batched upload of dropped files/folders into one device folder. Small files and
+    folders travel together in one tar stream (one multi-source adb push when the device has no tar),
+    large files go resumable over a few parallel lanes. Progress is aggregated.
+    """
+    progress = Signal(object, object, float, str)  # Done bytes (all lanes), total bytes, bytes/s, label
+    measured = Signal(str, str, float)             # Name, method, effective bytes/s
+    finished = Signal(bool, str)
+
+    def __init__(self, adb_manager, sources, remote_dir, lanes=3, compress=None):
+        super().__init__()
+        self.adb = adb_manager
+        self.sources = list(sources)
+        self.remote_dir = remote_dir.rstrip("/") or "/"
+        self.lanes = max(1, lanes)
+        self.compress = adb_manager.is_wireless() if compress is None else compress
+        self._is_running = True
+
+    def run(self):
+        large = [p for p in self.sources if os.path.isfile(p) and os.path.getsize(p) >= LARGE_FILE]
+        small = [p for p in self.sources if p not in large]
+        small_total = sum(local_tree_stats(p)[1] if os.path.isdir(p) else os.path.getsize(p) for p in small)
+        total = small_total + sum(os.path.getsize(p) for p in large)
+        stop = lambda: not self._is_running
+        lock = threading.Lock()
+        lane_done, failures = {}, []
+        start = time.time()
+
+        def report(key, n, label):
+            with lock:
+                lane_done[key] = n
+                done = sum(lane_done.values())
+            self.progress.emit(done, total, done / max(time.time() - start, 1e-3), label)
+
+        def push_small():
+            label = f"{len(small)} mục nhỏ"
+            if has_tar(self.adb):
+                try:
+                    res = TarTransfer(self.adb, lambda d, t, r: report("small", d, label), should_stop=stop,
+                                      compress=self.compress).push(small, self.remote_dir)
+                except TransferError as e:
+                    # Extraction failed on the device (disk full, permissions...): report, don't resend
+                    with lock: failures.append(str(e))
+                    return
+            else:
+                # No tar on the device: one adb push carrying every source
+                t0 = time.time()
+                out = self.adb.push_many(small, self.remote_dir)
+                res = TransferResult(not sync_error(out), small_total, time.time() - t0, detail="sync")
+                if not res.ok:
+                    with lock: failures.append(sync_error(out).splitlines()[-1])
+                    return
+            if not res.ok:
+                return  # cancelled: progress stays where the stream stopped
+            report("small", small_total, label)
+            if res.seconds > 0: self.measured.emit(label, res.detail, res.size / res.seconds)
+
+        def push_large(path):
+            name = os.path.basename(path)
+            engine = TransferEngine(self.adb, on_progress=lambda d, t, r: report(path, d, name), should_stop=stop)
+            try:
+                res = engine.push(path, f"{self.remote_dir.rstrip('/')}/{name}")
+                if res.ok and res.seconds > 0:
+                    self.measured.emit(name, "dd", (res.size - res.resumed_from) / res.seconds)
+            except TransferError as e:
+                with lock: failures.append(str(e))
+
+        with ThreadPoolExecutor(max_workers=self.lanes) as pool:
+            futures = ([pool.submit(push_small)] if small else []) + [pool.submit(push_large, p) for p in large]
+            for future in futures:
+                future.result()
+
+        seconds = time.time() - start
+        if failures:
+            self.finished.emit(False, "Lỗi khi tải lên:\n" + "\n".join(failures[:3]))
+        elif not self._is_running:
+            self.finished.emit(False, "Đã dừng, file lớn có thể tiếp tục lần sau")
+        else:
+            rate = f" ({total / seconds / (1024 * 1024):.1f} MB/s)" if seconds > 0 and total else ""
+            self.finished.emit(True, f"Đã tải lên {len(self.sources)} mục{rate}")
+
+    def stop(self): self._is_running = False
+
+
+class SyncThread(QThread):
+    """
+    Folder sync. Without a plan: compute it (planned) and stop if dry_run.
+    With a plan: transfer only the delta over parallel lanes.
+    """
+    planned = Signal(object)           # SyncPlan
+    progress = Signal(int, int, str)   # Done files, total files, current file
+    finished = Signal(bool, str)
+
+    def __init__(self, adb_manager, local, remote, mode="pull", verify_hash=False, plan=None, dry_run=False):
+        super().__init__()
+        self.engine = SyncEngine(adb_manager, verify_hash=verify_hash)
+        self.local, self.remote, self.mode = local, remote, mode
+        self.plan = plan
+        self.dry_run = dry_run
+        self._is_running = True
+
+    def run(self):
+        try:
+            if self.plan is None:
+                self.plan = self.engine.plan(self.local, self.remote, self.mode)
+                self.planned.emit(self.plan)
+                if self.dry_run:
+                    self.finished.emit(True, self.plan.summary())
+                    return
+            result = self.engine.execute(self.plan, on_progress=self.progress.emit,
+                                         should_stop=lambda: not self._is_running)
+        except Exception as e:
+            self.finished.emit(False, f"Lỗi đồng bộ: {e}")
+            return
+        failed = result["failed"]
+        if failed:
+            self.finished.emit(False, f"Hoàn tất {result['done'] - len(failed)}/{result['done']}. Lỗi:\n" + "\n".join(failed[:3]))
+        elif not self._is_running:
+            self.finished.emit(False, f"Đã dừng sau {result['done']} file")
+        else:
+            self.finished.emit(True, f"Đã đồng bộ {result['done']} file trong {result['seconds']:.1f}s")
+
+    def stop(self): self._is_running = False
@@ -0,0 +1,44 @@
+from PySide6.QtCore import QThread, Signal
+from src.core.listing_cache import parent_path
+from src.core.dir_watcher import DirWatcher
+
+
+class WatchWorker(QThread):
+    """
+    Live change notifications for the open folder (and a few recent ones).
+    Changes are applied to the FileWorker caches here, then emitted for the views.
+    """
+    changed = Signal(object)  # DirChange
+
+    def __init__(self, adb_manager, file_worker):
+        super().__init__()
+        self.adb = adb_manager
+        self.cache = file_worker.cache
+        self.sizes = file_worker.sizes
+        self.device = adb_manager.current_device
+        self.watcher = DirWatcher(adb_manager, self._on_change)
+        self._is_running = True
+
+    def watch(self, paths):
+        self.watcher.set_paths(paths)
+
+    def _on_change(self, change):
+        if change.gone:
+            self.cache.invalidate_tree(self.device, change.path)
+            self.cache.invalidate(self.device, parent_path(change.path))
+        elif change.listing is not None:
+            self.cache.put(self.device, change.path, change.listing)
+        else:
+            self.cache.patch(self.device, change.path, change.upserts, change.removed)
+        self.sizes.invalidate(self.device, change.path)
+        self.changed.emit(change)
+
+    def run(self):
+        try:
+            self.watcher.run(lambda: not self._is_running)
+        except Exception as e:
+            print(f"WatchWorker: {e}")
+
+    def stop(self):
+        self._is_running = False
+        self.watcher.set_paths([])